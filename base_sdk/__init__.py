@@ -0,0 +1,8 @@
+from .errors import *
+from .retry import *
+from .rate_limit import *
+from .decoding import *
+from .projection import *
+from .transport import *
+from .pagination import *
+from .batching import *
@@ -0,0 +1,105 @@
+import asyncio
+
+from typing import Awaitable, Callable, Optional, Sequence, TypeVar
+
+# Количество частей списочного запроса, выполняемых одновременно.
+BATCH_CONCURRENCY = 4
+
+R = TypeVar('R')
+
+
+def split_params(size: Optional[int], **values: Optional[Sequence]) -> list[dict[str, Optional[list]]]:
+    """
+        Разбиение списочных параметров запроса по ограничению endpoint'а.
+
+        Если все значения помещаются в один запрос, параметры возвращаются без изменений.
+        Иначе каждая часть содержит не более `size` значений одного параметра, остальные
+        списочные параметры в ней не заданы.
+
+        Args:
+            size (int, optional): Максимальное количество значений в запросе. None — без ограничения.
+            **values (Sequence, optional): Списочные параметры запроса.
+
+        Returns:
+            list[dict[str, list]]: Параметры запросов.
+    """
+    if not size or sum(len(items) for items in values.values() if items) <= size:
+        return [values]
+
+    parts = []
+    for name, items in values.items():
+        items = list(items or [])
+        for i in range(0, len(items), size):
+            parts.append({**dict.fromkeys(values), name: items[i:i + size]})
+    return parts
+
+
+async def gather_params(fetch: Callable[..., Awaitable[R]], parts: list[dict],
+                        concurrency: int = BATCH_CONCURRENCY) -> list[R]:
+    """
+        Одновременное выполнение запросов по частям параметров (см. `split_params`).
+
+        Лимиты запросов endpoint'а соблюдаются транспортом, `concurrency` ограничивает
+        количество ожидающих ответа запросов.
+
+        Args:
+            fetch (Callable[..., Awaitable[R]]): Запрос с параметрами части.
+            parts (list[dict]): Параметры частей.
+            concurrency (int, optional): Количество одновременных запросов.
+
+        Returns:
+            list[R]: Ответы в порядке частей.
+    """
+    if len(parts) == 1:
+        return [await fetch(**parts[0])]
+
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+    async def run(part: dict) -> R:
+        async with semaphore:
+            return await fetch(**part)
+
+    return list(await asyncio.gather(*[run(part) for part in parts]))
+
+
+def merge_responses(responses: list[Optional[R]], *paths: str) -> Optional[R]:
+    """
+        Объединение ответов частей запроса в один ответ.
+
+        Списки по указанным путям (например, `result.items`) объединяются по порядку частей,
+        остальные поля берутся из первого ответа, в котором путь заполнен. Пустые ответы пропускаются.
+
+        Args:
+            responses (list[R]): Ответы частей.
+            *paths (str): Пути к спискам в ответе через точку.
+
+        Returns:
+            R: Объединённый ответ или None, если все ответы пустые.
+    """
+    responses = [response for response in responses if response is not None]
+    if len(responses) <= 1:
+        return responses[0] if responses else None
+
+    merged = responses[0]
+    for path in paths:
+        names = path.split('.')
+        items = [item for response in responses for item in _get(response, names) or []]
+        base = next((response for response in responses if _get(response, names[:-1]) is not None), None)
+        if base is None:
+            continue
+        merged = _replace(merged if _get(merged, names[:-1]) is not None else base, names, items)
+    return merged
+
+
+def _get(obj, names: list[str]):
+    for name in names:
+        if obj is None:
+            return None
+        obj = getattr(obj, name, None)
+    return obj
+
+
+def _replace(obj, names: list[str], value):
+    if len(names) == 1:
+        return obj.model_copy(update={names[0]: value})
+    return obj.model_copy(update={names[0]: _replace(getattr(obj, names[0]), names[1:], value)})
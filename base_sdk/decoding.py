@@ -0,0 +1,96 @@
+import re
+import json
+
+from typing import Any, Callable, Optional, Type
+
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Объект верхнего уровня, все ключи которого — числа (статистика Ozon Performance), либо пустой объект.
+_DIGIT_KEYS = re.compile(rb'\s*\{\s*(?:"\d|})')
+
+# Декодер JSON для ответов. Если None, модели валидируются из байтов через `model_validate_json`:
+# без orjson это быстрее, чем `json.loads` и `model_validate`.
+_json_loads: Optional[Callable[[bytes], Any]] = orjson.loads if orjson is not None else None
+
+
+def set_json_decoder(decoder: Optional[Callable[[bytes], Any]]) -> None:
+    """
+        Замена декодера JSON для ответов маркетплейсов.
+
+        Args:
+            decoder (Callable[[bytes], Any] or None): Функция разбора JSON из байтов.
+                None — валидировать модели ответов напрямую из байтов средствами pydantic.
+    """
+    global _json_loads
+    _json_loads = decoder
+
+
+def json_loads(content: bytes) -> Any:
+    """
+        Разбор JSON текущим декодером (по умолчанию orjson, если установлен, иначе json).
+
+        Args:
+            content (bytes): Тело ответа.
+
+        Returns:
+            Any: Разобранные данные.
+    """
+    if _json_loads is None:
+        return json.loads(content)
+    return _json_loads(content)
+
+
+class RawResponse:
+    """
+        Необработанное тело JSON-ответа.
+
+        Передаётся из движка в API-обёртку без разбора, чтобы модель ответа валидировалась
+        один раз выбранным способом: декодером JSON (orjson) или напрямую из байтов.
+    """
+    __slots__ = ('content',)
+
+    def __init__(self, content: bytes):
+        self.content = content
+
+    def json(self) -> Any:
+        """Разобранное тело ответа."""
+        return json_loads(self.content)
+
+    def has_key(self, key: str) -> bool:
+        """
+            Быстрая проверка наличия ключа в ответе на любом уровне вложенности.
+
+            Args:
+                key (str): Название ключа.
+
+            Returns:
+                bool: False, если ключа в ответе точно нет.
+        """
+        return f'"{key}"'.encode() in self.content
+
+    def has_digit_keys(self) -> bool:
+        """Ответ — объект с числовыми ключами либо пустой объект."""
+        return _DIGIT_KEYS.match(self.content) is not None
+
+    def validate(self, response_type: Type[BaseModel]) -> BaseModel:
+        """
+            Валидация ответа в модель.
+
+            Args:
+                response_type (Type[BaseModel]): Модель ответа.
+
+            Returns:
+                BaseModel: Экземпляр модели ответа.
+        """
+        if _json_loads is None:
+            return response_type.model_validate_json(self.content)
+        return response_type.model_validate(_json_loads(self.content))
+
+    def is_list(self) -> bool:
+        """Ответ — массив верхнего уровня."""
+        return self.content.lstrip()[:1] == b'['
@@ -0,0 +1,22 @@
+class TransportError(Exception):
+    """Исключение, возникающее при исчерпании попыток запроса."""
+    def __init__(self, message: str = 'Превышено количество попыток запроса'):
+        self.message = message
+        super().__init__(self.message)
+
+
+class ResponseError(TransportError):
+    """Исключение, возникающее при ответе, который не имеет смысла повторять."""
+    def __init__(self, status: int, message: str = ''):
+        self.status = status
+        super().__init__(message or f'Получен ответ {status}')
+
+
+class RetryRequest(Exception):
+    """Сигнал транспорту о необходимости повторить запрос."""
+    def __init__(self, message: str = '', delay: float = None, status: int = None, headers=None):
+        self.message = message
+        self.delay = delay
+        self.status = status
+        self.headers = headers
+        super().__init__(self.message)
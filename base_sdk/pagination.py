@@ -0,0 +1,164 @@
+import asyncio
+
+from collections import deque
+from typing import Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Iterable, Optional, TypeVar
+
+# Количество страниц, запрашиваемых одновременно после первой.
+PAGE_CONCURRENCY = 4
+# Количество страниц, загружаемых заранее, пока обрабатывается текущая.
+PREFETCH_PAGES = 1
+
+T = TypeVar('T')
+Item = TypeVar('Item')
+
+_DONE = object()
+
+
+async def iter_numbered_pages(fetch: Callable[[int], Awaitable[T]],
+                              page_count: Callable[[T], int],
+                              first_page: int = 1,
+                              concurrency: int = PAGE_CONCURRENCY) -> AsyncIterator[T]:
+    """
+        Постраничное получение ответа с известным количеством страниц.
+
+        Первая страница запрашивается отдельно, чтобы узнать количество страниц, остальные
+        запрашиваются одновременно (не более `concurrency` запросов, с учётом лимитов endpoint'а
+        в транспорте) и возвращаются по порядку. Время загрузки определяется задержкой
+        ответа, а не количеством страниц.
+
+        Args:
+            fetch (Callable[[int], Awaitable[T]]): Запрос страницы по номеру.
+            page_count (Callable[[T], int]): Количество страниц из ответа.
+            first_page (int, optional): Номер первой страницы.
+            concurrency (int, optional): Количество одновременных запросов страниц.
+
+        Yields:
+            T: Ответы в порядке номеров страниц.
+    """
+    answer = await fetch(first_page)
+    last_page = first_page + (page_count(answer) or 1) - 1
+    yield answer
+
+    next_page = first_page + 1
+    pending = deque()
+    try:
+        while pending or next_page <= last_page:
+            while next_page <= last_page and len(pending) < max(concurrency, 1):
+                pending.append(asyncio.ensure_future(fetch(next_page)))
+                next_page += 1
+            yield await pending.popleft()
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def iter_cursor_pages(fetch: Callable[[Any], Awaitable[T]],
+                            next_cursor: Callable[[T, Any], Optional[Any]],
+                            cursor: Any = None,
+                            prefetch: int = PREFETCH_PAGES) -> AsyncIterator[T]:
+    """
+        Постраничное получение ответа по курсору (`last_id`, `offset`, `page_token`, `rrdid`).
+
+        Следующая страница зависит от предыдущей, поэтому страницы запрашиваются по очереди,
+        но заранее: пока вызывающий обрабатывает страницу, загружается до `prefetch` следующих.
+
+        Args:
+            fetch (Callable[[Any], Awaitable[T]]): Запрос страницы по курсору.
+            next_cursor (Callable[[T, Any], Any]): Курсор следующей страницы по ответу и текущему курсору
+                или None, если страница последняя.
+            cursor (Any, optional): Курсор первой страницы.
+            prefetch (int, optional): Количество страниц, загружаемых заранее. 0 — без предзагрузки.
+
+        Yields:
+            T: Ответы по порядку.
+    """
+    if prefetch <= 0:
+        while True:
+            answer = await fetch(cursor)
+            yield answer
+            cursor = next_cursor(answer, cursor)
+            if cursor is None:
+                return
+
+    queue = asyncio.Queue(maxsize=prefetch)
+
+    async def produce(cursor: Any) -> None:
+        try:
+            while True:
+                answer = await fetch(cursor)
+                await queue.put(answer)
+                cursor = next_cursor(answer, cursor)
+                if cursor is None:
+                    break
+        except Exception as e:
+            await queue.put(_Failure(e))
+            return
+        await queue.put(_DONE)
+
+    producer = asyncio.ensure_future(produce(cursor))
+    try:
+        while (answer := await queue.get()) is not _DONE:
+            if isinstance(answer, _Failure):
+                raise answer.error
+            yield answer
+    finally:
+        producer.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
+
+
+async def iter_items(pages: AsyncIterable[T],
+                     items: Callable[[T], Optional[Iterable[Item]]]) -> AsyncIterator[Item]:
+    """
+        Элементы страниц по одному, без накопления всего результата.
+
+        Args:
+            pages (AsyncIterable[T]): Страницы ответа.
+            items (Callable[[T], Iterable[Item]]): Элементы страницы.
+
+        Yields:
+            Item: Элементы страниц по порядку.
+    """
+    async for page in pages:
+        for item in items(page) or ():
+            yield item
+
+
+async def batches(items: AsyncIterable[Item], size: int) -> AsyncIterator[list[Item]]:
+    """
+        Группировка потока элементов в пачки.
+
+        Args:
+            items (AsyncIterable[Item]): Элементы.
+            size (int): Размер пачки.
+
+        Yields:
+            list[Item]: Пачки не более `size` элементов.
+    """
+    batch = []
+    async for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def next_offset(offset: int, items: Optional[list], limit: int) -> Optional[int]:
+    """Смещение следующей страницы или None, если страница неполная."""
+    return offset + limit if items and len(items) >= limit else None
+
+
+def next_last_id(last_id: Optional[str], items: Optional[list], limit: int) -> Optional[str]:
+    """
+        `last_id` следующей страницы или None, если страница неполная.
+
+        Не полагается на `total`: в разных методах он означает размер страницы или общее количество.
+    """
+    return last_id if last_id and items and len(items) >= limit else None
+
+
+class _Failure:
+    def __init__(self, error: Exception) -> None:
+        self.error = error
@@ -0,0 +1,83 @@
+from copy import copy
+from typing import Any, Type, Union, get_args, get_origin
+
+from pydantic import BaseModel, create_model
+
+# Описание проекции: {поле: None — поле целиком, список полей или вложенная проекция}.
+ProjectionSpec = Union[dict[str, Any], list[str], tuple[str, ...]]
+
+_projections: dict[tuple, Type[BaseModel]] = {}
+
+
+def project(model: Type[BaseModel], spec: ProjectionSpec, name: str = None) -> Type[BaseModel]:
+    """
+        Облегчённая модель ответа, содержащая только перечисленные поля.
+
+        Остальные поля ответа не валидируются и не хранятся. Для вложенных моделей (в том числе
+        внутри `Optional[...]` и `list[...]`) можно указать собственную проекцию.
+
+        Пример:
+            project(FinanceTransactionListResponse, {'result': {'operations': ['operation_type', 'items'],
+                                                                'page_count': None}})
+
+        Args:
+            model (Type[BaseModel]): Исходная модель.
+            spec (ProjectionSpec): Поля проекции. Список — поля целиком, словарь — поле с вложенной проекцией
+                (None — поле целиком).
+            name (str, optional): Название модели проекции.
+
+        Returns:
+            Type[BaseModel]: Модель проекции.
+    """
+    spec = _normalize(spec)
+    key = (model, _freeze(spec))
+    projection = _projections.get(key)
+    if projection is not None:
+        return projection
+
+    fields = {}
+    for field_name, sub_spec in spec.items():
+        field = model.model_fields.get(field_name)
+        if field is None:
+            raise ValueError(f"Поле {field_name} отсутствует в модели {model.__name__}")
+        annotation = field.annotation
+        if sub_spec is not None:
+            annotation = _project_annotation(annotation, sub_spec, model, field_name)
+        # Копия описания поля: pydantic записывает в него аннотацию проекции.
+        fields[field_name] = (annotation, copy(field))
+
+    projection = create_model(name or f'{model.__name__}Projection', __base__=_base(model),
+                              __module__=model.__module__, **fields)
+    _projections[key] = projection
+    return projection
+
+
+def _project_annotation(annotation: Any, spec: dict, model: Type[BaseModel], field_name: str) -> Any:
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return project(annotation, spec)
+    origin = get_origin(annotation)
+    args = get_args(annotation)
+    if origin is None or not args:
+        raise ValueError(f"Поле {field_name} модели {model.__name__} не содержит вложенной модели")
+    args = tuple(arg if arg is type(None) else _project_annotation(arg, spec, model, field_name) for arg in args)
+    if origin is Union:
+        return Union[args]
+    return origin[args]
+
+
+def _base(model: Type[BaseModel]) -> Type[BaseModel]:
+    # Базовый класс без полей (BaseResponse, BaseEntity), чтобы проекция оставалась его подклассом.
+    for base in model.__mro__[1:]:
+        if issubclass(base, BaseModel) and not base.model_fields:
+            return base
+    return BaseModel
+
+
+def _normalize(spec: ProjectionSpec) -> dict:
+    if isinstance(spec, (list, tuple)):
+        return dict.fromkeys(spec)
+    return {name: None if sub_spec is None else _normalize(sub_spec) for name, sub_spec in spec.items()}
+
+
+def _freeze(spec: dict) -> tuple:
+    return tuple(sorted((name, None if sub_spec is None else _freeze(sub_spec)) for name, sub_spec in spec.items()))
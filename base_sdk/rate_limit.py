@@ -0,0 +1,109 @@
+import re
+import time
+import asyncio
+
+from typing import Optional
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """
+        Лимит запросов к endpoint'у.
+
+        Args:
+            requests (int): Количество запросов за период.
+            period (float): Период, с.
+            burst (int): Количество запросов, которые можно отправить подряд без пауз.
+    """
+    requests: int
+    period: float = 1
+    burst: int = 1
+
+    @property
+    def interval(self) -> float:
+        return self.period / self.requests
+
+
+class TokenBucket:
+    """
+        Бакет токенов одного ключа (маркетплейс, кабинет, endpoint).
+
+        Реализован через теоретическое время следующего запроса (GCRA), поэтому резервирование
+        токена выполняется без блокировок и не привязано к циклу событий.
+    """
+
+    def __init__(self, limit: RateLimit):
+        self.limit = limit
+        self._tat = 0.0
+
+    def reserve(self) -> float:
+        """Резервирует токен и возвращает время ожидания до его получения, с."""
+        now = time.monotonic()
+        tolerance = self.limit.interval * (self.limit.burst - 1)
+        tat = max(self._tat, now)
+        self._tat = tat + self.limit.interval
+        return max(tat - tolerance - now, 0)
+
+    async def acquire(self) -> float:
+        """Ожидание свободного токена. Возвращает время ожидания, с."""
+        wait = self.reserve()
+        if wait:
+            await asyncio.sleep(wait)
+        return wait
+
+    def pause(self, delay: float) -> None:
+        """Запрещает запросы на `delay` секунд, например после ответа 429."""
+        tolerance = self.limit.interval * (self.limit.burst - 1)
+        self._tat = max(self._tat, time.monotonic() + delay + tolerance)
+
+
+class RateLimiter:
+    """Реестр бакетов, общий для всех кабинетов и движков процесса."""
+
+    def __init__(self):
+        self._buckets: dict[tuple[str, str, str], TokenBucket] = {}
+
+    def get_bucket(self, marketplace: str, key: str, endpoint: str, limit: RateLimit) -> TokenBucket:
+        bucket_key = (marketplace, key, endpoint)
+        bucket = self._buckets.get(bucket_key)
+        if bucket is None or bucket.limit != limit:
+            bucket = self._buckets[bucket_key] = TokenBucket(limit)
+        return bucket
+
+
+rate_limiter = RateLimiter()
+
+
+class EndpointLimits:
+    """
+        Лимиты endpoint'ов движка.
+
+        Шаблоны вида `/tasks/{task_id}/status` сопоставляются с итоговым URL запроса,
+        так что все запросы к шаблону делят один бакет.
+    """
+
+    def __init__(self):
+        self._exact: dict[str, RateLimit] = {}
+        self._patterns: list[tuple[re.Pattern, str, RateLimit]] = []
+
+    def add(self, endpoint: str, limit: RateLimit) -> None:
+        if '{' not in endpoint:
+            self._exact[endpoint] = limit
+            return
+        parts = re.split(r'\{[^}]*\}', endpoint)
+        pattern = re.compile('[^/]+'.join(re.escape(part) for part in parts) + '$')
+        self._patterns = [item for item in self._patterns if item[1] != endpoint]
+        self._patterns.append((pattern, endpoint, limit))
+
+    def match(self, url: str) -> Optional[tuple[str, RateLimit]]:
+        limit = self._exact.get(url)
+        if limit is not None:
+            return url, limit
+        for pattern, endpoint, limit in self._patterns:
+            if pattern.match(url):
+                return endpoint, limit
+        return None
+
+    def __bool__(self) -> bool:
+        return bool(self._exact or self._patterns)
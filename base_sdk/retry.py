@@ -0,0 +1,125 @@
+import time
+import random
+
+from datetime import datetime, timezone
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Mapping, Optional
+
+
+@dataclass(frozen=True)
+class StatusRule:
+    """
+        Правило повтора для статуса ответа.
+
+        Args:
+            retry (bool): Повторять ли запрос.
+            min_delay (float): Минимальная пауза перед повтором, с.
+    """
+    retry: bool = True
+    min_delay: float = 0
+
+
+def _default_rules() -> dict[int, StatusRule]:
+    return {
+        408: StatusRule(),
+        409: StatusRule(min_delay=1),
+        420: StatusRule(min_delay=1),
+        425: StatusRule(min_delay=1),
+        429: StatusRule(min_delay=1),
+        500: StatusRule(),
+        502: StatusRule(),
+        503: StatusRule(min_delay=5),
+        504: StatusRule(),
+    }
+
+
+@dataclass
+class RetryPolicy:
+    """
+        Политика повторов запросов.
+
+        Пауза растёт экспоненциально (`backoff * multiplier ** attempt`, не более `max_backoff`)
+        со случайным разбросом `jitter`. Если сервер сообщил, когда можно повторить
+        (`Retry-After`, `X-RateLimit-*`), используется его значение.
+        Статусы без правила: 5xx повторяются, остальные нет.
+
+        Args:
+            retries (int): Количество попыток.
+            backoff (float): Пауза перед первым повтором, с.
+            multiplier (float): Множитель паузы.
+            max_backoff (float): Максимальная расчётная пауза, с.
+            jitter (float): Доля паузы, на которую она случайно уменьшается (0..1).
+            deadline (float, optional): Общий лимит времени на запрос со всеми повторами, с.
+            max_retry_after (float): Максимальная пауза по заголовкам сервера, с.
+            rules (dict[int, StatusRule]): Правила по статусам ответа.
+    """
+    retries: int = 6
+    backoff: float = 1
+    multiplier: float = 2
+    max_backoff: float = 60
+    jitter: float = 0.5
+    deadline: Optional[float] = 900
+    max_retry_after: float = 300
+    rules: dict[int, StatusRule] = field(default_factory=_default_rules)
+
+    def get_rule(self, status: int) -> StatusRule:
+        rule = self.rules.get(status)
+        if rule is None:
+            rule = StatusRule(retry=status >= 500)
+        return rule
+
+    def is_retryable(self, status: Optional[int]) -> bool:
+        return status is None or self.get_rule(status).retry
+
+    def get_delay(self, attempt: int, status: int = None, headers: Mapping[str, str] = None) -> float:
+        """
+            Пауза перед повтором.
+
+            Args:
+                attempt (int): Номер неудачной попытки, начиная с 0.
+                status (int, optional): Статус ответа, если он был получен.
+                headers (Mapping[str, str], optional): Заголовки ответа.
+
+            Returns:
+                float: Пауза в секундах.
+        """
+        delay = self.server_delay(headers) if headers else None
+        if delay is None:
+            delay = min(self.backoff * self.multiplier ** attempt, self.max_backoff)
+            delay -= delay * self.jitter * random.random()
+        if status is not None:
+            delay = max(delay, self.get_rule(status).min_delay)
+        return delay
+
+    def server_delay(self, headers: Mapping[str, str]) -> Optional[float]:
+        """Пауза, запрошенная сервером в заголовках `Retry-After` и `X-RateLimit-*`."""
+        headers = {k.lower(): v for k, v in headers.items()}
+        delay = _parse_seconds(headers.get('retry-after'))
+        if delay is None:
+            delay = _parse_seconds(headers.get('x-ratelimit-retry'))
+        if delay is None and headers.get('x-ratelimit-remaining', '').strip() == '0':
+            delay = _parse_seconds(headers.get('x-ratelimit-reset'))
+        if delay is None:
+            return None
+        return min(max(delay, 0), self.max_retry_after)
+
+
+def _parse_seconds(value: Optional[str]) -> Optional[float]:
+    """Разбор значения в секундах, unix-времени или HTTP-дате."""
+    if value is None:
+        return None
+    value = value.strip()
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            moment = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+        return (moment - datetime.now(timezone.utc)).total_seconds()
+    if seconds > 1e9:
+        return seconds - time.time()
+    return seconds
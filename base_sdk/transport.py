@@ -0,0 +1,314 @@
+import os
+import time
+import asyncio
+import aiohttp
+import logging
+
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import astuple, dataclass, field
+
+from .errors import TransportError, ResponseError, RetryRequest
+from .decoding import RawResponse, json_loads
+from .retry import RetryPolicy
+from .rate_limit import EndpointLimits, RateLimit, RateLimiter, TokenBucket, rate_limiter
+
+logger = logging.getLogger(__name__)
+
+# Общие пулы соединений, включаются через `shared_connectors()`.
+_shared_connectors: ContextVar[Optional[dict]] = ContextVar('shared_connectors', default=None)
+
+
+@dataclass
+class ConnectorConfig:
+    """Настройки пула соединений сессии."""
+    limit: int = 100
+    limit_per_host: int = 20
+    keepalive_timeout: float = 60
+    ttl_dns_cache: int = 600
+    ssl: bool = True
+
+    def create_connector(self) -> aiohttp.TCPConnector:
+        return aiohttp.TCPConnector(limit=self.limit,
+                                    limit_per_host=self.limit_per_host,
+                                    keepalive_timeout=self.keepalive_timeout,
+                                    ttl_dns_cache=self.ttl_dns_cache,
+                                    ssl=self.ssl)
+
+
+@asynccontextmanager
+async def shared_connectors() -> AsyncIterator[None]:
+    """
+        Общие пулы соединений для всех API-клиентов, созданных внутри контекста.
+
+        Клиенты с одинаковыми `ConnectorConfig` используют один `TCPConnector`, поэтому TCP и TLS
+        соединения переиспользуются между кабинетами и задачами. Пулы закрываются при выходе из контекста.
+    """
+    connectors = {}
+    token = _shared_connectors.set(connectors)
+    try:
+        yield
+    finally:
+        _shared_connectors.reset(token)
+        for connector in connectors.values():
+            await connector.close()
+
+
+@dataclass
+class EndpointMetrics:
+    """Счётчики запросов к одному endpoint'у."""
+    requests: int = 0
+    retries: int = 0
+    errors: int = 0
+    bytes_received: int = 0
+    elapsed: float = 0.0
+    throttled: float = 0.0
+
+
+@dataclass
+class TransportMetrics:
+    """Метрики транспорта кабинета."""
+    endpoints: dict[str, EndpointMetrics] = field(default_factory=dict)
+
+    def get(self, url: str) -> EndpointMetrics:
+        url = url.split('?')[0]
+        if url not in self.endpoints:
+            self.endpoints[url] = EndpointMetrics()
+        return self.endpoints[url]
+
+    @property
+    def total(self) -> EndpointMetrics:
+        total = EndpointMetrics()
+        for metrics in self.endpoints.values():
+            total.requests += metrics.requests
+            total.retries += metrics.retries
+            total.errors += metrics.errors
+            total.bytes_received += metrics.bytes_received
+            total.elapsed += metrics.elapsed
+            total.throttled += metrics.throttled
+        return total
+
+
+class AsyncTransport:
+    """
+        Общий HTTP-транспорт SDK маркетплейсов.
+
+        Держит одну сессию с пулом соединений на кабинет, выполняет повторы запросов
+        по `RetryPolicy`, таймауты, прокси, потоковую загрузку файлов и собирает метрики.
+        Запросы к endpoint'ам с объявленными лимитами проходят через общий `RateLimiter`
+        по ключу (маркетплейс, кабинет, endpoint).
+        Движки маркетплейсов переопределяют `_get_headers` и `_process_response`.
+    """
+    marketplace: str = ''
+    ok_statuses: tuple[int, ...] = (200,)
+
+    def __init__(self, base_url: str = '', proxy: str = None, timeout: float = 300,
+                 connector_config: ConnectorConfig = None, retry_policy: RetryPolicy = None,
+                 limit_key: str = '', limiter: RateLimiter = None):
+        self._base_url = base_url
+        self._proxy = proxy
+        self._timeout = timeout
+        self._connector_config = connector_config or ConnectorConfig()
+        self._retry_policy = retry_policy or RetryPolicy()
+        self._limit_key = limit_key
+        self._limiter = limiter or rate_limiter
+        self._limits = EndpointLimits()
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.metrics = TransportMetrics()
+
+    async def request(self, method: str, url: str, params: dict = None, json: Any = None, file: bool = False,
+                      raw: bool = False) -> Any:
+        """
+            Выполнение запроса.
+
+            Args:
+                method (str): HTTP-метод.
+                url (str): Путь или полная ссылка.
+                params (dict, optional): Параметры строки запроса.
+                json (Any, optional): Тело запроса.
+                file (bool, optional): Ответ — файл.
+                raw (bool, optional): Вернуть JSON-ответ как `RawResponse` без разбора.
+
+            Returns:
+                Any: Данные ответа.
+        """
+        url = self._get_url(url)
+        if params:
+            params = {k: v for k, v in params.items() if v is not None}
+
+        async def handler(response: aiohttp.ClientResponse) -> Any:
+            return await self._process_response(response, url, file=file, raw=raw)
+
+        return await self._perform_request(method, url, handler, file=file, params=params, json=json)
+
+    async def download(self, url: str, path: str = None, chunk_size: int = 1 << 16) -> bytes or str:
+        """
+            Потоковая загрузка файла.
+
+            Args:
+                url (str): Ссылка на файл.
+                path (str, optional): Путь сохранения. Если не указан, возвращается содержимое файла.
+                chunk_size (int, optional): Размер читаемого блока.
+
+            Returns:
+                bytes or str: Содержимое файла или путь к сохранённому файлу.
+        """
+        url = self._get_url(url)
+        metrics = self.metrics.get(url)
+
+        async def handler(response: aiohttp.ClientResponse) -> bytes or str:
+            if response.status not in self.ok_statuses:
+                raise RetryRequest(f"Получен ответ от {url} ({response.status})",
+                                   status=response.status, headers=response.headers)
+            if path is None:
+                content = await response.read()
+                metrics.bytes_received += len(content)
+                return content
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            with open(path, 'wb') as file:
+                async for chunk in response.content.iter_chunked(chunk_size):
+                    file.write(chunk)
+                    metrics.bytes_received += len(chunk)
+            return path
+
+        return await self._perform_request('GET', url, handler, auth=False)
+
+    def set_rate_limits(self, limits: dict[str, RateLimit]) -> None:
+        """
+            Регистрация лимитов endpoint'ов.
+
+            Args:
+                limits (dict[str, RateLimit]): Лимиты по URL endpoint'ов, допускаются шаблоны `{...}`.
+        """
+        for endpoint, limit in limits.items():
+            self._limits.add(self._get_url(endpoint), limit)
+
+    async def close(self) -> None:
+        """Закрытие сессии и всех соединений пула."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            total = self.metrics.total
+            if total.requests:
+                logger.debug(f"HTTP: запросов {total.requests}, повторов {total.retries}, ошибок {total.errors}, "
+                             f"получено {total.bytes_received} байт за {total.elapsed:.1f} с, "
+                             f"ожидание лимитов {total.throttled:.1f} с")
+        self._session = None
+        self._session_loop = None
+
+    def _get_url(self, url: str) -> str:
+        if url.startswith('http://') or url.startswith('https://'):
+            return url
+        if url.startswith("/"):
+            return self._base_url + url
+        return f"{self._base_url}/{url}"
+
+    async def _get_headers(self, file: bool = False) -> dict:
+        """Заголовки авторизации маркетплейса."""
+        return {}
+
+    async def _process_response(self, response: aiohttp.ClientResponse, url: str, file: bool = False,
+                                raw: bool = False) -> Any:
+        """
+            Разбор ответа.
+
+            Возвращает данные ответа, либо возбуждает `RetryRequest` для повтора запроса.
+        """
+        if response.status not in self.ok_statuses:
+            raise RetryRequest(f"Получен ответ от {url} ({response.status})",
+                               status=response.status, headers=response.headers)
+        content = await response.read()
+        self.metrics.get(url).bytes_received += len(content)
+        if file:
+            return {'file': content}
+        if not content.strip():
+            return None
+        if raw:
+            return RawResponse(content)
+        return json_loads(content)
+
+    async def _perform_request(self, method: str, url: str,
+                               handler: Callable[[aiohttp.ClientResponse], Awaitable[Any]],
+                               auth: bool = True, file: bool = False, **kwargs) -> Any:
+        """
+            Выполнение запроса с повторами по политике `RetryPolicy`.
+
+            Пауза между попытками растёт экспоненциально либо берётся из заголовков ответа,
+            общее время всех попыток ограничено `RetryPolicy.deadline`.
+            Заголовки авторизации запрашиваются перед каждой попыткой.
+        """
+        session = await self._get_session()
+        policy = self._retry_policy
+        metrics = self.metrics.get(url)
+        bucket = self._get_bucket(url)
+        started_at = time.monotonic()
+        retry = policy.retries
+        attempt = 0
+        while True:
+            if bucket is not None:
+                metrics.throttled += await bucket.acquire()
+            timeout = self._timeout
+            if policy.deadline is not None:
+                timeout = min(timeout, max(policy.deadline - (time.monotonic() - started_at), 1))
+            started = time.perf_counter()
+            metrics.requests += 1
+            try:
+                headers = await self._get_headers(file=file) if auth else None
+                async with session.request(method, url, headers=headers, proxy=self._proxy,
+                                           timeout=aiohttp.ClientTimeout(total=timeout), **kwargs) as response:
+                    return await handler(response)
+            except RetryRequest as e:
+                logger.info(f"{e}")
+                if not policy.is_retryable(e.status):
+                    metrics.errors += 1
+                    raise ResponseError(e.status, f"{e}")
+                delay = e.delay if e.delay is not None else policy.get_delay(attempt, e.status, e.headers)
+                if bucket is not None and e.status in (420, 429):
+                    bucket.pause(delay)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                metrics.errors += 1
+                logger.error(f"Ошибка соединения: {e!r}")
+                delay = policy.get_delay(attempt)
+            finally:
+                metrics.elapsed += time.perf_counter() - started
+            retry -= 1
+            attempt += 1
+            if retry <= 0:
+                break
+            if policy.deadline is not None and time.monotonic() - started_at + delay > policy.deadline:
+                logger.error(f"Превышено время ожидания ответа от {url}")
+                break
+            metrics.retries += 1
+            logger.error(f"Попытка повторного запроса через {delay:.1f} с. Осталось попыток: {retry}")
+            await asyncio.sleep(delay)
+        raise TransportError(f"Превышено количество попыток запроса к {url}")
+
+    def _get_bucket(self, url: str) -> Optional[TokenBucket]:
+        if not self._limits:
+            return None
+        match = self._limits.match(url.split('?')[0])
+        if match is None:
+            return None
+        endpoint, limit = match
+        return self._limiter.get_bucket(self.marketplace, self._limit_key, endpoint, limit)
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """
+            Возвращает долгоживущую сессию кабинета.
+
+            Сессия создаётся один раз на цикл событий, поэтому TCP и TLS соединения
+            переиспользуются между запросами. Внутри `shared_connectors()` сессия использует общий пул.
+        """
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            connectors = _shared_connectors.get()
+            if connectors is None:
+                self._session = aiohttp.ClientSession(connector=self._connector_config.create_connector())
+            else:
+                key = astuple(self._connector_config)
+                if key not in connectors or connectors[key].closed:
+                    connectors[key] = self._connector_config.create_connector()
+                self._session = aiohttp.ClientSession(connector=connectors[key], connector_owner=False)
+            self._session_loop = loop
+        return self._session
@@ -0,0 +1,105 @@
+"""
+    Сравнение разбора ответов маркетплейсов: прежний json.loads + parse_obj против валидации
+    `RawResponse` через model_validate_json и через декодер orjson.
+
+    Запуск из корня проекта:
+        python -m benchmarks.response_decoding [количество записей]
+"""
+import sys
+import json
+import time
+import random
+import warnings
+
+from typing import Callable
+
+from base_sdk import RawResponse, set_json_decoder, orjson
+from ozon_sdk.response import FinanceTransactionListResponse
+from wb_sdk.response import SupplierSalesResponse
+
+warnings.filterwarnings('ignore', category=DeprecationWarning)
+
+
+def make_finance_transactions(count: int) -> bytes:
+    operations = []
+    for i in range(count):
+        operations.append({
+            'operation_id': 10_000_000 + i,
+            'operation_type': random.choice(['OperationAgentDeliveredToCustomer', 'MarketplaceServiceItemFulfillment']),
+            'operation_date': '2024-06-01 12:34:56',
+            'operation_type_name': 'Доставка покупателю',
+            'delivery_charge': 0,
+            'return_delivery_charge': 0,
+            'accruals_for_sale': round(random.uniform(100, 5000), 2),
+            'sale_commission': round(random.uniform(-500, 0), 2),
+            'amount': round(random.uniform(-500, 5000), 2),
+            'type': 'orders',
+            'posting': {'delivery_schema': 'FBO',
+                        'order_date': '2024-05-30 10:00:00',
+                        'posting_number': f'0123456789-{i:04d}-1',
+                        'warehouse_id': 22000000000000},
+            'items': [{'name': f'Товар {i}', 'sku': 900_000_000 + i}],
+            'services': [{'name': 'MarketplaceServiceItemDirectFlowLogistic', 'price': -63.0},
+                         {'name': 'MarketplaceServiceItemDelivToCustomer', 'price': -25.0}],
+        })
+    return json.dumps({'result': {'operations': operations, 'page_count': 1, 'row_count': count}},
+                      ensure_ascii=False).encode()
+
+
+def make_supplier_sales(count: int) -> bytes:
+    sales = []
+    for i in range(count):
+        sales.append({
+            'date': '2024-06-01T12:34:56', 'lastChangeDate': '2024-06-01T13:00:00',
+            'warehouseName': 'Коледино', 'countryName': 'Россия', 'oblastOkrugName': 'Центральный федеральный округ',
+            'regionName': 'Московская', 'supplierArticle': f'ART-{i}', 'nmId': 100_000_000 + i,
+            'barcode': f'2000000{i:06d}', 'category': 'Одежда', 'subject': 'Футболки', 'brand': 'Бренд',
+            'techSize': 'XL', 'incomeID': 12345, 'isSupply': False, 'isRealization': True,
+            'totalPrice': 1999.0, 'discountPercent': 50, 'spp': 12.5, 'paymentSaleAmount': 0,
+            'forPay': 850.12, 'finishedPrice': 875.0, 'priceWithDisc': 999.5, 'saleID': f'S{i}',
+            'orderType': 'Клиентский', 'sticker': '123456789', 'gNumber': f'G{i}', 'srid': f'srid-{i}',
+        })
+    return json.dumps(sales, ensure_ascii=False).encode()
+
+
+def measure(func: Callable, repeat: int = 5) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def compare(name: str, response_type, content: bytes, wrap_list: bool = False) -> None:
+    if wrap_list:
+        content = b'{"result":' + content + b'}'
+
+    def parse_obj():
+        return response_type.parse_obj(json.loads(content))
+
+    def validate():
+        return RawResponse(content).validate(response_type)
+
+    expected = parse_obj()
+    base_time = measure(parse_obj)
+    print(f"{name}: {len(content) / 1024 / 1024:.1f} МБ, json.loads + parse_obj {base_time * 1000:.0f} мс")
+
+    decoders = {'model_validate_json': None, 'json.loads + model_validate': json.loads}
+    if orjson is not None:
+        decoders['orjson.loads + model_validate'] = orjson.loads
+    for decoder_name, decoder in decoders.items():
+        set_json_decoder(decoder)
+        assert validate() == expected, f"{name}: результаты разбора не совпадают ({decoder_name})"
+        elapsed = measure(validate)
+        print(f"    {decoder_name}: {elapsed * 1000:.0f} мс, ускорение x{base_time / elapsed:.2f}")
+
+
+def main(count: int = 20_000) -> None:
+    random.seed(0)
+    compare('FinanceTransactionListResponse', FinanceTransactionListResponse, make_finance_transactions(count))
+    compare('SupplierSalesResponse', SupplierSalesResponse, make_supplier_sales(count), wrap_list=True)
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,67 @@
+"""
+    Сравнение памяти, занимаемой строками отчёта о реализации WB: прежние dataclass со словарём
+    атрибутов, dataclass со слотами и колоночная `RowBatch`.
+
+    Запуск из корня проекта:
+        python -m benchmarks.row_memory [количество строк]
+"""
+import gc
+import sys
+import random
+import datetime
+import tracemalloc
+
+from typing import Callable
+from dataclasses import fields, make_dataclass
+
+from data_classes import DataWBReport, RowBatch
+
+# Прежнее представление: тот же набор полей без слотов.
+DictDataWBReport = make_dataclass('DictDataWBReport', [(field.name, field.type) for field in fields(DataWBReport)])
+
+OPERATIONS = ['Продажа', 'Возврат', 'Логистика', 'Хранение', 'Удержания']
+OFFICES = ['Коледино', 'Подольск', 'Электросталь', 'Казань', 'Краснодар']
+
+
+def make_values(count: int) -> list[dict]:
+    # Строки создаются заново для каждой записи, как при разборе JSON ответа.
+    start = datetime.date(2024, 6, 1)
+    rows = []
+    for i in range(count):
+        values = {}
+        for field in fields(DataWBReport):
+            if field.type is float:
+                values[field.name] = round(random.uniform(0, 5000), 2)
+            elif field.type is int:
+                values[field.name] = random.randint(0, 10)
+            elif field.type is datetime.date:
+                values[field.name] = start + datetime.timedelta(days=i % 20)
+            else:
+                values[field.name] = ''.join([field.name[:4], str(i % 50)])
+        values['supplier_oper_name'] = ''.join(random.choice(OPERATIONS))
+        values['office_name'] = ''.join(random.choice(OFFICES))
+        values['sku'] = str(100_000_000 + i)
+        values['posting_number'] = f'{i:032x}'
+        rows.append(values)
+    return rows
+
+
+def measure(name: str, build: Callable[[], object]) -> None:
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f'{name:<28}{current / 1024 / 1024:>10.1f} МБ')
+    del result
+
+
+def main(count: int = 200_000) -> None:
+    print(f'Строк: {count}, полей: {len(fields(DataWBReport))}')
+    measure('dataclass (__dict__)', lambda: [DictDataWBReport(**values) for values in make_values(count)])
+    measure('dataclass (slots)', lambda: [DataWBReport(**values) for values in make_values(count)])
+    measure('RowBatch', lambda: RowBatch(DataWBReport, (DataWBReport(**values) for values in make_values(count))))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:2]))
@@ -0,0 +1,117 @@
+"""
+    Сравнение времени разбора отчёта Яндекс.Маркета по стоимости услуг: прежний разбор
+    через `pd.read_excel` (два чтения листа и `iterrows`) и потоковый `parse_report`.
+
+    Запуск из корня проекта:
+        python -m benchmarks.ya_united_report [строк на лист] [процессов]
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import datetime
+import tempfile
+
+import pandas as pd
+
+from typing import Callable
+from openpyxl import Workbook
+
+from data_classes import DataYaReport
+from services import YA_REPORT_SHEETS, convert_id, iter_yandex_report, parse_report
+
+CAMPAIGN_ID = '21000000'
+HEADERS = ['ID бизнес-аккаунта', 'Номер заказа', 'Ваш SKU', 'Услуга', 'Дата и время оказания услуги',
+           'Стоимость услуги, ₽']
+SERVICES = ['Приём платежа', 'Доставка', 'Обработка', 'Хранение']
+
+
+def make_report(path: str, rows: int) -> None:
+    # Шапка отчёта из нескольких строк, как в файлах Маркета. Обычный режим записи сохраняет
+    # размеры листов и общие строки, как в выгрузке Маркета.
+    workbook = Workbook()
+    workbook.remove(workbook.active)
+    start = datetime.datetime(2024, 6, 1, 10)
+    for sheet_name in YA_REPORT_SHEETS[:10] + ['Платное хранение (1)', 'Платное хранение (2)']:
+        sheet = workbook.create_sheet(sheet_name)
+        sheet.append(['Отчёт по стоимости услуг'])
+        sheet.append([])
+        sheet.append(HEADERS)
+        for _ in range(rows):
+            sheet.append([12345,
+                          random.randint(10 ** 8, 10 ** 8 + rows // 2),
+                          f'art-{random.randint(1, 500)}',
+                          random.choice(SERVICES),
+                          (start + datetime.timedelta(hours=random.randint(0, 24 * 7))).strftime('%Y-%m-%d %H:%M:%S'),
+                          round(random.uniform(1, 500), 2)])
+    workbook.save(path)
+
+
+def parse_pandas(path_file: str) -> list[DataYaReport]:
+    # Прежний разбор из ya_report.add_yandex_report_entry, без изменения логики.
+    excel_file = pd.ExcelFile(path_file)
+    sheets = [s for s in YA_REPORT_SHEETS if s in excel_file.sheet_names]
+    sheets += [s for s in excel_file.sheet_names if 'Платное хранение' in s]
+    aggregate = {}
+    for sheet in sheets:
+        df = pd.read_excel(path_file, sheet_name=sheet, header=None)
+        header_row = 0
+        for i, row in df.iterrows():
+            if any(cell in HEADERS for cell in row if pd.notna(cell)):
+                header_row = i
+                break
+        if not header_row:
+            continue
+        df = pd.read_excel(path_file, sheet_name=sheet, header=header_row).fillna('')
+        for _, row in df.iterrows():
+            try:
+                operation_date = datetime.datetime.strptime(row['Дата и время оказания услуги'],
+                                                            '%Y-%m-%d %H:%M:%S').date()
+                cost = round(float(row['Стоимость услуги, ₽']), 2)
+            except Exception:
+                continue
+            key = (convert_id(row['ID бизнес-аккаунта']), CAMPAIGN_ID, operation_date,
+                   convert_id(row['Номер заказа']), sheet if 'Платное хранение' not in sheet else 'Платное хранение',
+                   row['Ваш SKU'], row['Услуга'])
+            aggregate[key] = aggregate.get(key, 0) + cost
+    return [DataYaReport(client_id=client_id, campaign_id=campaign_id, date=operation_date,
+                         posting_number=posting_number, operation_type=operation_type, vendor_code=vendor_code,
+                         service=service, cost=cost)
+            for (client_id, campaign_id, operation_date, posting_number, operation_type, vendor_code, service), cost
+            in aggregate.items()]
+
+
+async def collect(path_file: str, processes: int) -> list[DataYaReport]:
+    return [row async for batch in iter_yandex_report(path_file=path_file, campaign_id=CAMPAIGN_ID,
+                                                      processes=processes)
+            for row in batch]
+
+
+def measure(name: str, run: Callable[[], list]) -> list:
+    started = time.perf_counter()
+    result = run()
+    print(f'{name:<32}{time.perf_counter() - started:>8.2f} с')
+    return result
+
+
+def main(rows: int = 20_000, processes: int = 4) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, f'{CAMPAIGN_ID}_report.xlsx')
+        make_report(path, rows)
+        print(f'Строк на лист: {rows}, размер файла: {os.path.getsize(path) / 2 ** 20:.1f} МБ')
+
+        expected = measure('pd.read_excel + iterrows', lambda: parse_pandas(path))
+        result = measure('parse_report', lambda: [row for rows in parse_report(path, CAMPAIGN_ID) for row in rows])
+        pooled = measure(f'iter_yandex_report ({processes} проц.)', lambda: asyncio.run(collect(path, processes)))
+
+    def key(row: DataYaReport) -> tuple:
+        return row.operation_type, row.posting_number, row.vendor_code, row.service, row.date
+
+    assert sorted(result, key=key) == sorted(expected, key=key), 'Результаты разбора различаются'
+    assert sorted(pooled, key=key) == sorted(expected, key=key), 'Результаты разбора в процессах различаются'
+    print(f'Записей: {len(result)}')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:3]))
@@ -3,3 +3,7 @@ DB_PASS = "your_password"
 DB_HOST = "your_host"
 DB_NAME = "your_database"
 DB_URL = f"postgresql+psycopg2://{DB_USER}:{DB_PASS}@{DB_HOST}/{DB_NAME}"
+
+# Каталог дискового кэша отправлений Ozon вне репозитория, например "/var/cache/marketplace/oz_postings".
+# None — отправления кэшируются только в памяти процесса.
+OZ_POSTING_CACHE_DIR = None
@@ -3,3 +3,4 @@ from .oz_dataclasses import *
 from .wb_dataclasses import *
 from .ya_dataclasses import *
 from .sb_dataclasses import *
+from .row_batch import *
@@ -4,7 +4,7 @@ from typing import Optional
 from dataclasses import dataclass
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class DataOperation:
     client_id: str
     accrual_date: datetime.date
@@ -19,7 +19,7 @@ class DataOperation:
     bonus: Optional[float] = None
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class DataCostPrice:
     month_date: int
     year_date: int
@@ -27,7 +27,7 @@ class DataCostPrice:
     cost: float
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class DataSelfPurchase:
     client_id: str
     order_date: datetime.date
@@ -37,21 +37,21 @@ class DataSelfPurchase:
     price: float
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class DataOrder:
     client: "Client"
     vendor_code: str
     orders_count: float
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class DataRate:
     date: datetime.date
     currency: str
     rate: float
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class DataOverseasPurchase:
     accrual_date: datetime.date
     vendor_code: str
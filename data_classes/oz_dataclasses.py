@@ -4,7 +4,7 @@ from dataclasses import dataclass
 from typing import Optional
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class DataOzProductCard:
     sku: str
     vendor_code: str
@@ -16,7 +16,7 @@ class DataOzProductCard:
     discount_price: float
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class DataOzStatisticCardProduct:
     sku: str
     date: datetime.date
@@ -31,7 +31,7 @@ class DataOzStatisticCardProduct:
     cancel_count: int
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class DataOzAdvert:
     id_advert: str
     field_type: str
@@ -43,7 +43,7 @@ class DataOzAdvert:
     end_time: datetime.date
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class DataOzStatisticAdvert:
     client_id: str
     date: datetime.date
@@ -56,14 +56,14 @@ class DataOzStatisticAdvert:
     sum_price: float
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class DataOzStorage:
     date: datetime.date
     sku: str
     cost: float
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class DataOzService:
     client_id: str
     date: datetime.date
@@ -76,13 +76,13 @@ class DataOzService:
     cost: float
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class DataOzAdvertDailyBudget:
     advert_id: str
     daily_budget: float
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class DataOzOrder:
     order_date: datetime.date
     client_id: str
@@ -94,7 +94,7 @@ class DataOzOrder:
     price: float
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class DataOzStock:
     date: datetime.date
     client_id: str
@@ -105,7 +105,7 @@ class DataOzStock:
     reserved: int
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class DataOzBonus:
     date: datetime.date
     client_id: str
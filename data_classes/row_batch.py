@@ -0,0 +1,101 @@
+from array import array
+from dataclasses import fields
+from typing import Any, Iterable, Iterator, Type, Union
+
+# Числовые поля хранятся в типизированных массивах вместо списков объектов.
+_TYPECODES = {float: 'd', int: 'q'}
+
+_Column = Union[array, list]
+
+
+class RowBatch:
+    """
+        Колоночное хранилище строк одного dataclass.
+
+        Значения каждого поля хранятся отдельной колонкой: числовые поля — в `array`
+        (8 байт на значение вместо объекта float/int), остальные — в списке, где одинаковые
+        строки хранятся одним объектом. Если в числовую колонку попадает None или значение
+        другого типа, колонка переводится в список.
+
+        Итерация по пачке возвращает экземпляры `row_type`, поэтому пачку можно передавать
+        в методы записи вместо списка строк.
+    """
+    __slots__ = ('row_type', '_columns', '_strings')
+
+    def __init__(self, row_type: Type, rows: Iterable = ()):
+        """
+            Args:
+                row_type (Type): Dataclass строки.
+                rows (Iterable, optional): Начальные строки.
+        """
+        self.row_type = row_type
+        self._columns: dict[str, _Column] = {}
+        self._strings: dict[str, dict[str, str]] = {}
+        for field in fields(row_type):
+            typecode = _TYPECODES.get(field.type)
+            self._columns[field.name] = array(typecode) if typecode else []
+            if field.type is str:
+                self._strings[field.name] = {}
+        self.extend(rows)
+
+    def append(self, row: Any) -> None:
+        """
+            Добавление строки.
+
+            Args:
+                row (Any): Экземпляр `row_type`.
+        """
+        for name, column in self._columns.items():
+            value = getattr(row, name)
+            strings = self._strings.get(name)
+            if strings is not None and value is not None:
+                value = strings.setdefault(value, value)
+            try:
+                column.append(value)
+            except (TypeError, OverflowError):
+                column = self._columns[name] = column.tolist()
+                column.append(value)
+
+    def extend(self, rows: Iterable) -> None:
+        """
+            Добавление строк.
+
+            Args:
+                rows (Iterable): Экземпляры `row_type`.
+        """
+        for row in rows:
+            self.append(row)
+
+    def column(self, name: str) -> _Column:
+        """
+            Значения поля всех строк.
+
+            Args:
+                name (str): Название поля.
+
+            Returns:
+                array or list: Колонка значений.
+        """
+        return self._columns[name]
+
+    def records(self, **extra: Any) -> Iterator[dict]:
+        """
+            Строки в виде словарей {поле: значение} для пакетной записи в базу.
+
+            Args:
+                **extra (Any): Дополнительные колонки с одинаковым для всех строк значением.
+
+            Returns:
+                Iterator[dict]: Записи пачки.
+        """
+        names = tuple(self._columns)
+        for values in zip(*self._columns.values()):
+            yield {**extra, **dict(zip(names, values))}
+
+    def __iter__(self) -> Iterator:
+        row_type = self.row_type
+        for values in zip(*self._columns.values()):
+            yield row_type(*values)
+
+    def __len__(self) -> int:
+        return len(next(iter(self._columns.values()), ()))
@@ -3,7 +3,7 @@ import datetime
 from dataclasses import dataclass
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class DataSbOrders:
     posting_number: str
     client_id: str
@@ -3,7 +3,7 @@ import datetime
 from dataclasses import dataclass
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class DataWBCardProduct:
     sku: str
     vendor_code: str
@@ -13,7 +13,7 @@ class DataWBCardProduct:
     discount_price: float
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class DataWBStatisticCardProduct:
     sku: str
     vendor_code: str
@@ -27,7 +27,7 @@ class DataWBStatisticCardProduct:
     orders_sum: float
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class DataWBAdvert:
     id_advert: str
     id_type: int
@@ -39,7 +39,7 @@ class DataWBAdvert:
     end_time: datetime.date
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class DataWBStatisticAdvert:
     client_id: str
     sku: str
@@ -55,7 +55,7 @@ class DataWBStatisticAdvert:
     app_type: str
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class DataWBReport:
     realizationreport_id: str
     gi_id: str
@@ -117,7 +117,7 @@ class DataWBReport:
     posting_number: str
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class DataWBStorage:
     client_id: str
     date: datetime.date
@@ -127,7 +127,7 @@ class DataWBStorage:
     cost: float
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class DataWBAcceptance:
     client_id: str
     date: datetime.date
@@ -135,7 +135,7 @@ class DataWBAcceptance:
     cost: float
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class DataWBOrder:
     order_date: datetime.date
     client_id: str
@@ -151,7 +151,7 @@ class DataWBOrder:
     warehouse_type: str
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class DataWBStock:
     date: datetime.date
     client_id: str
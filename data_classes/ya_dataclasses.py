@@ -3,7 +3,7 @@ import datetime
 from dataclasses import dataclass
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class DataYaCampaigns:
     client_id: str
     campaign_id: str
@@ -11,7 +11,7 @@ class DataYaCampaigns:
     placement_type: str
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class DataYaReport:
     client_id: str
     campaign_id: str
@@ -23,7 +23,7 @@ class DataYaReport:
     cost: float
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class DataYaOrder:
     order_date: datetime.date
     client_id: str
@@ -39,7 +39,7 @@ class DataYaOrder:
     update_date: datetime.date
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class DataYaStock:
     date: datetime.date
     client_id: str
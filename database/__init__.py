@@ -2,3 +2,4 @@ from .oz_db import *
 from .wb_db import *
 from .ya_db import *
 from .sb_db import *
+from .async_facade import *
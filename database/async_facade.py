@@ -0,0 +1,54 @@
+import asyncio
+
+from typing import Any, Callable
+from functools import partial, wraps
+from concurrent.futures import ThreadPoolExecutor
+
+# Количество одновременно выполняемых запросов к базе. Соединения удерживают сессии, а не потоки,
+# поэтому размер пула движка задаётся отдельно (`DB_POOL_SIZE` в database.db).
+DB_EXECUTOR_WORKERS = 10
+
+db_executor = ThreadPoolExecutor(max_workers=DB_EXECUTOR_WORKERS, thread_name_prefix='db')
+
+
+class AsyncDbFacade:
+    """
+        Асинхронный фасад подключения к базе данных.
+
+        Методы подключения вызываются с теми же именами и аргументами, но выполняются в пуле потоков
+        `db_executor`, поэтому запросы к базе не блокируют цикл событий и выполняются одновременно
+        с запросами к API. Сессия подключения не потокобезопасна, поэтому вызовы одного фасада
+        выполняются по очереди; параллельность достигается между подключениями (например, кабинетами
+        в `run_cabinets`).
+
+        Пример:
+            await db_conn.aio.add_wb_operation(list_operations=list_operation)
+    """
+
+    def __init__(self, db_conn: Any, executor: ThreadPoolExecutor = None) -> None:
+        """
+            Args:
+                db_conn (DbConnection): Подключение к базе данных.
+                executor (ThreadPoolExecutor, optional): Пул потоков. По умолчанию общий `db_executor`.
+        """
+        self._db_conn = db_conn
+        self._executor = executor or db_executor
+        self._lock = asyncio.Lock()
+
+    def __getattr__(self, name: str) -> Callable:
+        method = getattr(self._db_conn, name)
+        if not callable(method):
+            raise AttributeError(f"'{type(self._db_conn).__name__}.{name}' не является методом")
+
+        @wraps(method)
+        async def wrapper(*args, **kwargs) -> Any:
+            async with self._lock:
+                future = asyncio.get_running_loop().run_in_executor(self._executor, partial(method, *args, **kwargs))
+                try:
+                    return await asyncio.shield(future)
+                except asyncio.CancelledError:
+                    # Сессия освобождается только после завершения запроса в потоке
+                    await asyncio.wait([future])
+                    raise
+
+        return wrapper
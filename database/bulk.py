@@ -0,0 +1,102 @@
+import logging
+
+from typing import Iterable, Iterator, Optional, Type
+from itertools import islice
+
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import insert
+
+from .models import Base
+
+logger = logging.getLogger(__name__)
+
+# Ограничение PostgreSQL на количество параметров в одном запросе.
+MAX_PARAMETERS = 65535
+CHUNK_SIZE = 1000
+
+
+def bulk_upsert(session: Session, model: Type[Base], rows: Iterable[dict], index_elements: list[str],
+                update_columns: Optional[list[str]] = None, chunk_size: int = CHUNK_SIZE) -> int:
+    """
+        Пакетная вставка записей одним `INSERT ... VALUES (...), (...) ON CONFLICT` на пачку строк.
+
+        Строки с одинаковым ключом конфликта схлопываются так же, как при построчной вставке:
+        при обновлении остаётся последняя строка, без обновления — первая. Строки с NULL в ключе
+        не конфликтуют и передаются все.
+        Фиксация транзакции остаётся за вызывающим методом.
+
+        Args:
+            session (Session): Сессия базы данных.
+            model (Type[Base]): Модель таблицы.
+            rows (Iterable[dict]): Записи в виде словарей {колонка: значение}.
+            index_elements (list[str]): Колонки уникального ограничения.
+            update_columns (list[str], optional): Обновляемые при конфликте колонки.
+                Если не указаны, конфликтующие записи пропускаются.
+            chunk_size (int, optional): Количество строк в одном запросе.
+
+        Returns:
+            int: Количество переданных в базу строк.
+    """
+    unique = {}
+    for row in rows:
+        key = tuple(row.get(column) for column in index_elements)
+        if None in key:
+            key = id(row)
+        if update_columns:
+            unique.pop(key, None)
+            unique[key] = row
+        else:
+            unique.setdefault(key, row)
+    rows = list(unique.values())
+    if not rows:
+        return 0
+
+    session.flush()
+    for chunk in _chunks(rows, chunk_size):
+        stmt = insert(model).values(chunk)
+        if update_columns:
+            stmt = stmt.on_conflict_do_update(index_elements=index_elements,
+                                              set_={column: stmt.excluded[column] for column in update_columns})
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=index_elements)
+        session.execute(stmt)
+    logger.debug(f"{model.__tablename__}: передано {len(rows)} строк")
+    return len(rows)
+
+
+def bulk_insert(session: Session, model: Type[Base], rows: Iterable[dict], chunk_size: int = CHUNK_SIZE) -> int:
+    """
+        Пакетная вставка записей без проверки конфликтов одним `INSERT ... VALUES` на пачку строк.
+        Записи читаются из `rows` по одной пачке, поэтому можно передавать генератор.
+        Фиксация транзакции остаётся за вызывающим методом.
+
+        Args:
+            session (Session): Сессия базы данных.
+            model (Type[Base]): Модель таблицы.
+            rows (Iterable[dict]): Записи в виде словарей {колонка: значение}.
+            chunk_size (int, optional): Количество строк в одном запросе.
+
+        Returns:
+            int: Количество переданных в базу строк.
+    """
+    count = 0
+    for chunk in _chunks(rows, chunk_size):
+        if not count:
+            session.flush()
+        session.execute(insert(model).values(chunk))
+        count += len(chunk)
+    if count:
+        logger.debug(f"{model.__tablename__}: передано {count} строк")
+    return count
+
+
+def _chunks(rows: Iterable[dict], chunk_size: int) -> Iterator[list[dict]]:
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is None:
+        return
+    chunk_size = max(1, min(chunk_size, MAX_PARAMETERS // len(first)))
+    chunk = [first, *islice(rows, chunk_size - 1)]
+    while chunk:
+        yield chunk
+        chunk = list(islice(rows, chunk_size))
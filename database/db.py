@@ -2,21 +2,30 @@ import time
 import logging
 import datetime
 
-from typing import Type
-from functools import wraps
+from typing import Optional, Type
+from weakref import WeakSet
+from functools import cache, wraps
 
 from sqlalchemy.orm import Session
 from pyodbc import Error as PyodbcError
 from sqlalchemy.exc import OperationalError
-from sqlalchemy import create_engine, text, func as f
-from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import Engine, Row, create_engine, text, func as f
 
 from config import *
 from data_classes import *
 from database.models import *
+from database.bulk import bulk_upsert
+from database.async_facade import AsyncDbFacade
 
 logger = logging.getLogger(__name__)
 
+# Соединение занято сессией от первого запроса до commit/rollback/close, а не потоком `db_executor`,
+# поэтому пул рассчитан на одновременно открытые сессии: в run_jobs до JOB_CONCURRENCY (4) задач,
+# у каждой внешняя сессия и до CABINET_CONCURRENCY (4) сессий кабинетов — 4 × (1 + 4) = 20.
+DB_POOL_SIZE = 20
+# Запас для сессий вне run_cabinets (отчёты, google_sheet_*).
+DB_MAX_OVERFLOW = 10
+
 
 def retry_on_exception(retries=3, delay=10):
     def decorator(func):
@@ -45,15 +54,47 @@ def retry_on_exception(retries=3, delay=10):
     return decorator
 
 
+@cache
+def get_engine(echo: bool = False) -> Engine:
+    """
+        Общий для процесса движок с пулом соединений.
+
+        Args:
+            echo (bool, optional): Логирование SQL-запросов.
+
+        Returns:
+            Engine: Движок базы данных `DB_URL`.
+    """
+    return create_engine(url=DB_URL, echo=echo, pool_pre_ping=True, pool_size=DB_POOL_SIZE,
+                         max_overflow=DB_MAX_OVERFLOW)
+
+
 class DbConnection:
-    def __init__(self, echo: bool = False) -> None:
-        self.engine = create_engine(url=DB_URL, echo=echo, pool_pre_ping=True)
+    # Движки, для которых таблицы уже созданы в этом процессе.
+    _started_engines: WeakSet = WeakSet()
+
+    def __init__(self, echo: bool = False, engine: Engine = None) -> None:
+        """
+            Args:
+                echo (bool, optional): Логирование SQL-запросов.
+                engine (Engine, optional): Движок с пулом соединений. По умолчанию общий для процесса.
+        """
+        self.engine = engine or get_engine(echo=echo)
         self.session = Session(self.engine)
+        # Те же методы без блокировки цикла событий: `await db_conn.aio.<метод>(...)`
+        self.aio = AsyncDbFacade(self)
+
+    def close(self) -> None:
+        """Закрытие сессии и возврат соединения в пул."""
+        self.session.close()
 
     @retry_on_exception()
     def start_db(self) -> None:
-        """Создание таблиц."""
+        """Создание таблиц. Выполняется один раз на движок, повторные вызовы в процессе пропускаются."""
+        if self.engine in self._started_engines:
+            return
         metadata.create_all(self.session.bind, checkfirst=True)
+        self._started_engines.add(self.engine)
 
     @retry_on_exception()
     def get_client(self, client_id: str) -> Type[Client]:
@@ -125,6 +166,63 @@ class DbConnection:
         result = self.session.execute(query).fetchall()
         return [row[0] for row in result]
 
+    @retry_on_exception()
+    def get_sync_state(self, client_id: str, endpoint: str) -> Optional[Row]:
+        """
+            Получает отметку последней успешной синхронизации кабинета с endpoint'ом.
+
+            Args:
+                client_id (str): ID кабинета.
+                endpoint (str): Название синхронизируемого endpoint'а.
+
+            Returns:
+                Row or None: Row(watermark, cursor) или None, если синхронизации ещё не было.
+        """
+        return self.session.query(SyncState.watermark, SyncState.cursor).filter_by(client_id=client_id,
+                                                                                   endpoint=endpoint).first()
+
+    def get_sync_start(self, client_id: str, endpoint: str, default: datetime.datetime,
+                       overlap: datetime.timedelta) -> datetime.datetime:
+        """
+            Начало периода загрузки изменений с момента последней успешной синхронизации.
+
+            Args:
+                client_id (str): ID кабинета.
+                endpoint (str): Название синхронизируемого endpoint'а.
+                default (datetime): Начало периода, если синхронизации ещё не было.
+                overlap (timedelta): Запас перекрытия с уже загруженным периодом.
+
+            Returns:
+                datetime: Отметка синхронизации за вычетом `overlap` или `default`.
+        """
+        state = self.get_sync_state(client_id=client_id, endpoint=endpoint)
+        if state is None or state.watermark is None:
+            return default
+        return state.watermark - overlap
+
+    @retry_on_exception()
+    def set_sync_state(self, client_id: str, endpoint: str, watermark: datetime.datetime = None,
+                       cursor: str = None) -> None:
+        """
+            Сохраняет отметку успешной синхронизации. Вызывается после фиксации загруженных данных.
+
+            Args:
+                client_id (str): ID кабинета.
+                endpoint (str): Название синхронизируемого endpoint'а.
+                watermark (datetime, optional): Время, до которого данные загружены (например, lastChangeDate).
+                cursor (str, optional): Последний токен страницы или ID строки (например, rrd_id).
+        """
+        row = dict(client_id=client_id,
+                   endpoint=endpoint,
+                   watermark=watermark,
+                   cursor=cursor,
+                   updated_at=datetime.datetime.now())
+        bulk_upsert(session=self.session, model=SyncState, rows=[row],
+                    index_elements=['client_id', 'endpoint'],
+                    update_columns=['watermark', 'cursor', 'updated_at'])
+        self.session.commit()
+        logger.debug(f"Синхронизация {endpoint} кабинета {client_id}: watermark={watermark}, cursor={cursor}")
+
     @retry_on_exception()
     def add_cost_price(self, list_cost_price: list[DataCostPrice]) -> None:
         """
@@ -133,67 +231,50 @@ class DbConnection:
             Args:
                 list_cost_price (list[DataCostPrice]): список данных по себестоймости.
         """
-        for row in list_cost_price:
-            stmt = insert(CostPrice).values(
-                month_date=row.month_date,
-                year_date=row.year_date,
-                vendor_code=row.vendor_code,
-                cost=row.cost
-            ).on_conflict_do_update(
-                index_elements=['month_date', 'year_date', 'vendor_code'],
-                set_={'cost': row.cost}
-            )
-            self.session.execute(stmt)
+        rows = [dict(month_date=row.month_date,
+                     year_date=row.year_date,
+                     vendor_code=row.vendor_code,
+                     cost=row.cost) for row in list_cost_price]
+        bulk_upsert(session=self.session, model=CostPrice, rows=rows,
+                    index_elements=['month_date', 'year_date', 'vendor_code'],
+                    update_columns=['cost'])
         self.session.commit()
         logger.info(f"Успешное добавление в базу")
 
     @retry_on_exception()
     def add_self_purchase(self, list_self_purchase: list[DataSelfPurchase]) -> None:
-        for row in list_self_purchase:
-            stmt = insert(SelfPurchase).values(
-                client_id=row.client_id,
-                order_date=row.order_date,
-                accrual_date=row.accrual_date,
-                vendor_code=row.vendor_code,
-                quantities=row.quantities,
-                price=row.price
-            ).on_conflict_do_update(
-                index_elements=['client_id', 'order_date', 'accrual_date', 'vendor_code', 'price'],
-                set_={'quantities': row.quantities}
-            )
-            self.session.execute(stmt)
+        rows = [dict(client_id=row.client_id,
+                     order_date=row.order_date,
+                     accrual_date=row.accrual_date,
+                     vendor_code=row.vendor_code,
+                     quantities=row.quantities,
+                     price=row.price) for row in list_self_purchase]
+        bulk_upsert(session=self.session, model=SelfPurchase, rows=rows,
+                    index_elements=['client_id', 'order_date', 'accrual_date', 'vendor_code', 'price'],
+                    update_columns=['quantities'])
         self.session.commit()
         logger.info(f"Успешное добавление в базу")
 
     @retry_on_exception()
     def add_overseas_purchases(self, list_purchase: list[DataOverseasPurchase]) -> None:
-        for row in list_purchase:
-            stmt = insert(OverseasPurchase).values(
-                accrual_date=row.accrual_date,
-                vendor_code=row.vendor_code,
-                quantities=row.quantities,
-                price=row.price,
-                log_cost=row.log_cost,
-                log_add_cost=row.log_add_cost
-            ).on_conflict_do_update(
-                index_elements=['accrual_date', 'vendor_code'],
-                set_={'quantities': row.quantities,
-                      'price': row.price,
-                      'log_cost': row.log_cost,
-                      'log_add_cost': row.log_add_cost}
-            )
-            self.session.execute(stmt)
+        rows = [dict(accrual_date=row.accrual_date,
+                     vendor_code=row.vendor_code,
+                     quantities=row.quantities,
+                     price=row.price,
+                     log_cost=row.log_cost,
+                     log_add_cost=row.log_add_cost) for row in list_purchase]
+        bulk_upsert(session=self.session, model=OverseasPurchase, rows=rows,
+                    index_elements=['accrual_date', 'vendor_code'],
+                    update_columns=['quantities', 'price', 'log_cost', 'log_add_cost'])
         self.session.commit()
         logger.info(f"Успешное добавление в базу")
 
     @retry_on_exception()
     def add_exchange_rate(self, list_rate: list[DataRate]) -> None:
-        for row in list_rate:
-            stmt = insert(ExchangeRate).values(
-                date=row.date,
-                currency=row.currency,
-                rate=row.rate
-            ).on_conflict_do_nothing(index_elements=['date', 'currency'])
-            self.session.execute(stmt)
+        rows = [dict(date=row.date,
+                     currency=row.currency,
+                     rate=row.rate) for row in list_rate]
+        bulk_upsert(session=self.session, model=ExchangeRate, rows=rows,
+                    index_elements=['date', 'currency'])
         self.session.commit()
         logger.info(f"Успешное добавление в базу")
@@ -1,5 +1,6 @@
 from sqlalchemy.orm import declarative_base
-from sqlalchemy import Column, String, MetaData, Integer, Identity, Numeric, UniqueConstraint, ForeignKey, Date
+from sqlalchemy import (Column, String, MetaData, Integer, Identity, Numeric, UniqueConstraint, ForeignKey, Date,
+                        DateTime)
 
 metadata = MetaData()
 Base = declarative_base(metadata=metadata)
@@ -84,3 +85,19 @@ class ExchangeRate(Base):
     __table_args__ = (
         UniqueConstraint('date', 'currency', name='exchange_rate_unique'),
     )
+
+
+class SyncState(Base):
+    """Модель таблицы sync_state."""
+    __tablename__ = 'sync_state'
+
+    id = Column(Integer, Identity(), primary_key=True)
+    client_id = Column(String(length=255), ForeignKey('clients.client_id'), nullable=False)
+    endpoint = Column(String(length=100), nullable=False)
+    watermark = Column(DateTime, default=None, nullable=True)
+    cursor = Column(String(length=255), default=None, nullable=True)
+    updated_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint('client_id', 'endpoint', name='sync_state_unique'),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, ForeignKey, Numeric, Identity, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, Numeric, Identity, UniqueConstraint
 
 from .general_models import Base
 
@@ -236,3 +236,19 @@ class OzBonus(Base):
     __table_args__ = (
         UniqueConstraint('date', 'sku', 'vendor_code', name='oz_bonus_unique'),
     )
+
+
+class OzSkuMapping(Base):
+    """Модель таблицы oz_sku_mapping."""
+    __tablename__ = 'oz_sku_mapping'
+
+    id = Column(Integer, Identity(), primary_key=True)
+    client_id = Column(String(length=255), ForeignKey('clients.client_id'), nullable=False)
+    sku = Column(String(length=255), nullable=False)
+    kind = Column(String(length=20), nullable=False)
+    base_sku = Column(String(length=255), default=None, nullable=True)
+    updated_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint('client_id', 'sku', 'kind', name='oz_sku_mapping_unique'),
+    )
@@ -1,12 +1,13 @@
 import logging
 
-from typing import Type
-from datetime import datetime
+from typing import Iterable, Optional, Type
+from datetime import datetime, timedelta
 
-from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import Row
 
 from .models import *
 from data_classes import *
+from .bulk import bulk_upsert
 from .db import DbConnection, retry_on_exception
 
 logger = logging.getLogger(__name__)
@@ -56,6 +57,68 @@ class OzDbConnection(DbConnection):
         result = self.session.query(OzCardProduct.sku, OzCardProduct.vendor_code).filter_by(client_id=client_id).all()
         return {sku: vendor_code for sku, vendor_code in result}
 
+    @retry_on_exception()
+    def get_oz_card_products(self, skus: Iterable[str]) -> dict[str, Row]:
+        """
+            Получает данные карточек товаров по списку SKU одним запросом.
+
+            Args:
+                skus (Iterable[str]): SKU товаров.
+
+            Returns:
+                dict[str, Row]: словарь {sku: (sku, client_id, price, discount_price)}.
+        """
+        skus = set(skus)
+        if not skus:
+            return {}
+        result = self.session.query(OzCardProduct.sku,
+                                    OzCardProduct.client_id,
+                                    OzCardProduct.price,
+                                    OzCardProduct.discount_price).filter(OzCardProduct.sku.in_(skus)).all()
+        return {row.sku: row for row in result}
+
+    @retry_on_exception()
+    def get_oz_sku_mapping(self, client_id: str, kind: str, ttl: timedelta) -> dict[str, Optional[str]]:
+        """
+            Получает сохранённые соответствия SKU основным товарам, обновлённые не раньше `ttl`.
+
+            Args:
+                client_id (str): ID кабинета.
+                kind (str): Тип соответствия: discounted — уценённый товар, related — связанный SKU.
+                ttl (timedelta): Время жизни записи.
+
+            Returns:
+                dict[str, Optional[str]]: словарь {sku: SKU основного товара или None, если его нет}.
+        """
+        result = self.session.query(OzSkuMapping.sku, OzSkuMapping.base_sku).filter(
+            OzSkuMapping.client_id == client_id,
+            OzSkuMapping.kind == kind,
+            OzSkuMapping.updated_at >= datetime.now() - ttl).all()
+        return {sku: base_sku for sku, base_sku in result}
+
+    @retry_on_exception()
+    def add_oz_sku_mapping(self, client_id: str, kind: str, mapping: dict[str, Optional[str]]) -> None:
+        """
+            Добавление в базу данных соответствий SKU основным товарам.
+
+            Args:
+                client_id (str): ID кабинета.
+                kind (str): Тип соответствия: discounted — уценённый товар, related — связанный SKU.
+                mapping (dict[str, Optional[str]]): Словарь {sku: SKU основного товара или None}.
+        """
+        if not mapping:
+            return
+        updated_at = datetime.now()
+        rows = [dict(client_id=client_id,
+                     sku=sku,
+                     kind=kind,
+                     base_sku=base_sku,
+                     updated_at=updated_at) for sku, base_sku in mapping.items()]
+        bulk_upsert(session=self.session, model=OzSkuMapping, rows=rows,
+                    index_elements=['client_id', 'sku', 'kind'],
+                    update_columns=['base_sku', 'updated_at'])
+        self.session.commit()
+
     @retry_on_exception()
     def add_oz_operation(self, list_operations: list[DataOperation]) -> None:
         """
@@ -64,25 +127,19 @@ class OzDbConnection(DbConnection):
             Args:
                 list_operations (list[DataOperation]): Список данных об операциях.
         """
-        for row in list_operations:
-            stmt = insert(OzMain).values(
-                client_id=row.client_id,
-                accrual_date=row.accrual_date,
-                type_of_transaction=row.type_of_transaction,
-                vendor_code=row.vendor_code,
-                posting_number=row.posting_number,
-                delivery_schema=row.delivery_schema,
-                sku=row.sku,
-                sale=row.sale,
-                quantities=row.quantities,
-                commission=row.commission
-            ).on_conflict_do_update(
-                index_elements=['accrual_date', 'type_of_transaction', 'posting_number', 'sku'],
-                set_={'sale': row.sale,
-                      'quantities': row.quantities,
-                      'commission': row.commission}
-            )
-            self.session.execute(stmt)
+        rows = [dict(client_id=row.client_id,
+                     accrual_date=row.accrual_date,
+                     type_of_transaction=row.type_of_transaction,
+                     vendor_code=row.vendor_code,
+                     posting_number=row.posting_number,
+                     delivery_schema=row.delivery_schema,
+                     sku=row.sku,
+                     sale=row.sale,
+                     quantities=row.quantities,
+                     commission=row.commission) for row in list_operations]
+        bulk_upsert(session=self.session, model=OzMain, rows=rows,
+                    index_elements=['accrual_date', 'type_of_transaction', 'posting_number', 'sku'],
+                    update_columns=['sale', 'quantities', 'commission'])
         self.session.commit()
         logger.info(f"Успешное добавление в базу")
 
@@ -101,16 +158,19 @@ class OzDbConnection(DbConnection):
             if row.field_type not in advert_types:
                 self.session.add(OzTypeAdvert(field_type=row.field_type, type=row.field_type))
                 advert_types.add(row.field_type)
-            new = OzAdverts(id_advert=row.id_advert,
-                            client_id=client_id,
-                            field_type=row.field_type,
-                            field_status=row.field_status,
-                            name_advert=row.name_advert,
-                            create_time=row.create_time,
-                            change_time=row.change_time,
-                            start_time=row.start_time,
-                            end_time=row.end_time)
-            self.session.merge(new)
+        rows = [dict(id_advert=row.id_advert,
+                     client_id=client_id,
+                     field_type=row.field_type,
+                     field_status=row.field_status,
+                     name_advert=row.name_advert,
+                     create_time=row.create_time,
+                     change_time=row.change_time,
+                     start_time=row.start_time,
+                     end_time=row.end_time) for row in adverts_list]
+        bulk_upsert(session=self.session, model=OzAdverts, rows=rows,
+                    index_elements=['id_advert'],
+                    update_columns=['client_id', 'field_type', 'field_status', 'name_advert', 'create_time',
+                                    'change_time', 'start_time', 'end_time'])
         self.session.commit()
         logger.info(f"Успешное добавление в базу")
 
@@ -123,16 +183,18 @@ class OzDbConnection(DbConnection):
                 client_id (str): ID кабинета.
                 list_card_product (list[DataOzProductCard]): Список данных о карточках товаров.
         """
-        for row in list_card_product:
-            new = OzCardProduct(sku=row.sku,
-                                client_id=client_id,
-                                vendor_code=row.vendor_code,
-                                category=row.category,
-                                brand=row.brand,
-                                link=row.link,
-                                price=row.price,
-                                discount_price=row.discount_price)
-            self.session.merge(new)
+        rows = [dict(sku=row.sku,
+                     client_id=client_id,
+                     vendor_code=row.vendor_code,
+                     category=row.category,
+                     brand=row.brand,
+                     link=row.link,
+                     price=row.price,
+                     discount_price=row.discount_price) for row in list_card_product]
+        bulk_upsert(session=self.session, model=OzCardProduct, rows=rows,
+                    index_elements=['sku'],
+                    update_columns=['client_id', 'vendor_code', 'category', 'brand', 'link', 'price',
+                                    'discount_price'])
         self.session.commit()
         logger.info(f"Успешное добавление в базу")
 
@@ -144,35 +206,32 @@ class OzDbConnection(DbConnection):
             Args:
                 list_card_product (list[DataOzStatisticCardProduct]): Список данных статистики карточек товаров.
         """
+        card_products = self.get_oz_card_products(skus=[row.sku for row in list_card_product])
+        rows = []
         for row in list_card_product:
-            card_product = self.session.query(OzCardProduct).filter_by(sku=row.sku).first()
-            stmt = insert(OzStatisticCardProduct).values(
-                sku=row.sku,
-                date=row.date,
-                view_search=row.view_search,
-                view_card=row.view_card,
-                add_to_cart_from_search_count=row.add_to_cart_from_search_count,
-                add_to_cart_from_card_count=row.add_to_cart_from_card_count,
-                orders_count=row.orders_count,
-                orders_sum=row.orders_sum,
-                delivered_count=row.delivered_count,
-                returns_count=row.returns_count,
-                cancel_count=row.cancel_count,
-                price=card_product.price,
-                discount_price=card_product.discount_price
-            ).on_conflict_do_update(
-                index_elements=['sku', 'date'],
-                set_={'view_search': row.view_search,
-                      'view_card': row.view_card,
-                      'add_to_cart_from_search_count': row.add_to_cart_from_search_count,
-                      'add_to_cart_from_card_count': row.add_to_cart_from_card_count,
-                      'orders_count': row.orders_count,
-                      'orders_sum': row.orders_sum,
-                      'delivered_count': row.delivered_count,
-                      'returns_count': row.returns_count,
-                      'cancel_count': row.cancel_count}
-            )
-            self.session.execute(stmt)
+            card_product = card_products.get(row.sku)
+            if card_product is None:
+                # Запись без карточки нарушит внешний ключ sku
+                logger.warning(f"Карточка товара {row.sku} не найдена в БД. Статистика пропущена")
+                continue
+            rows.append(dict(sku=row.sku,
+                             date=row.date,
+                             view_search=row.view_search,
+                             view_card=row.view_card,
+                             add_to_cart_from_search_count=row.add_to_cart_from_search_count,
+                             add_to_cart_from_card_count=row.add_to_cart_from_card_count,
+                             orders_count=row.orders_count,
+                             orders_sum=row.orders_sum,
+                             delivered_count=row.delivered_count,
+                             returns_count=row.returns_count,
+                             cancel_count=row.cancel_count,
+                             price=card_product.price,
+                             discount_price=card_product.discount_price))
+        bulk_upsert(session=self.session, model=OzStatisticCardProduct, rows=rows,
+                    index_elements=['sku', 'date'],
+                    update_columns=['view_search', 'view_card', 'add_to_cart_from_search_count',
+                                    'add_to_cart_from_card_count', 'orders_count', 'orders_sum', 'delivered_count',
+                                    'returns_count', 'cancel_count'])
         self.session.commit()
         logger.info(f"Успешное добавление в базу")
 
@@ -184,25 +243,17 @@ class OzDbConnection(DbConnection):
             Args:
                 list_statistics_advert (list[DataOzStatisticAdvert]): Список данных статистики РК.
         """
-        for row in list_statistics_advert:
-            stmt = insert(OzStatisticAdvert).values(
-                sku=row.sku,
-                advert_id=row.advert_id,
-                date=row.date,
-                views=row.views,
-                clicks=row.clicks,
-                orders_count=row.orders_count,
-                sum_price=row.sum_price,
-                sum_cost=row.sum_cost
-            ).on_conflict_do_update(
-                index_elements=['sku', 'advert_id', 'date'],
-                set_={'views': row.views,
-                      'clicks': row.clicks,
-                      'orders_count': row.orders_count,
-                      'sum_price': row.sum_price,
-                      'sum_cost': row.sum_cost}
-            )
-            self.session.execute(stmt)
+        rows = [dict(sku=row.sku,
+                     advert_id=row.advert_id,
+                     date=row.date,
+                     views=row.views,
+                     clicks=row.clicks,
+                     orders_count=row.orders_count,
+                     sum_price=row.sum_price,
+                     sum_cost=row.sum_cost) for row in list_statistics_advert]
+        bulk_upsert(session=self.session, model=OzStatisticAdvert, rows=rows,
+                    index_elements=['sku', 'advert_id', 'date'],
+                    update_columns=['views', 'clicks', 'orders_count', 'sum_price', 'sum_cost'])
         self.session.commit()
         logger.info(f"Успешное добавление в базу")
 
@@ -216,16 +267,12 @@ class OzDbConnection(DbConnection):
                 date (datetime.date): дата актуальная для бюджета.
                 adverts_daily_budget (list[DataOzAdvertDailyBudget]): список данных по бюджету РК.
         """
-        for row in adverts_daily_budget:
-            stmt = insert(OzAdvertDailyBudget).values(
-                date=date,
-                advert_id=row.advert_id,
-                daily_budget=row.daily_budget
-            ).on_conflict_do_update(
-                index_elements=['date', 'advert_id'],
-                set_={'daily_budget': row.daily_budget}
-            )
-            self.session.execute(stmt)
+        rows = [dict(date=date,
+                     advert_id=row.advert_id,
+                     daily_budget=row.daily_budget) for row in adverts_daily_budget]
+        bulk_upsert(session=self.session, model=OzAdvertDailyBudget, rows=rows,
+                    index_elements=['date', 'advert_id'],
+                    update_columns=['daily_budget'])
         self.session.commit()
         logger.info(f"Успешное добавление в базу")
 
@@ -237,27 +284,24 @@ class OzDbConnection(DbConnection):
             Args:
                 list_storage (list[DataOzStorage]): список данных по хранению товаров.
         """
+        card_products = self.get_oz_card_products(skus=[row.sku for row in list_storage])
         for row in list_storage:
-            product = self.session.query(OzCardProduct.client_id).filter_by(sku=row.sku).first()
+            product = card_products.get(row.sku)
             if product:
-                client_id = product[0]
+                client_id = product.client_id
                 break
         else:
             logger.error(f"Магазин не найден в БД. Данные не добавлены")
             return
         product_data = self.get_oz_sku_vendor_code(client_id=client_id)
-        for row in list_storage:
-            stmt = insert(OzStorage).values(
-                client_id=client_id,
-                date=row.date,
-                vendor_code=product_data.get(row.sku, '---UNKNOWN_VENDOR'),
-                sku=row.sku,
-                cost=row.cost
-            ).on_conflict_do_update(
-                index_elements=['client_id', 'date', 'sku'],
-                set_={'cost': row.cost}
-            )
-            self.session.execute(stmt)
+        rows = [dict(client_id=client_id,
+                     date=row.date,
+                     vendor_code=product_data.get(row.sku, '---UNKNOWN_VENDOR'),
+                     sku=row.sku,
+                     cost=row.cost) for row in list_storage]
+        bulk_upsert(session=self.session, model=OzStorage, rows=rows,
+                    index_elements=['client_id', 'date', 'sku'],
+                    update_columns=['cost'])
         self.session.commit()
         logger.info(f"Успешное добавление в базу")
 
@@ -280,26 +324,18 @@ class OzDbConnection(DbConnection):
                                           type_name='new')
                 self.session.add(new_type)
                 type_services.add((row.operation_type, row.service or ''))
-            stmt = insert(OzServices).values(
-                client_id=row.client_id,
-                date=row.date,
-                operation_type=row.operation_type,
-                operation_type_name=row.operation_type_name,
-                vendor_code=product_data.get(row.sku) or row.vendor_code or '',
-                sku=row.sku or '',
-                posting_number=row.posting_number or '',
-                service=row.service or '',
-                cost=row.cost
-            ).on_conflict_do_update(
-                index_elements=['client_id',
-                                'date',
-                                'operation_type',
-                                'sku',
-                                'posting_number',
-                                'service'],
-                set_={'cost': row.cost}
-            )
-            self.session.execute(stmt)
+        rows = [dict(client_id=row.client_id,
+                     date=row.date,
+                     operation_type=row.operation_type,
+                     operation_type_name=row.operation_type_name,
+                     vendor_code=product_data.get(row.sku) or row.vendor_code or '',
+                     sku=row.sku or '',
+                     posting_number=row.posting_number or '',
+                     service=row.service or '',
+                     cost=row.cost) for row in list_services]
+        bulk_upsert(session=self.session, model=OzServices, rows=rows,
+                    index_elements=['client_id', 'date', 'operation_type', 'sku', 'posting_number', 'service'],
+                    update_columns=['cost'])
         self.session.commit()
         logger.info(f"Успешное добавление в базу")
 
@@ -311,23 +347,17 @@ class OzDbConnection(DbConnection):
             Args:
                 list_orders (list[DataOzOrder]): Список данных о заказах.
         """
-        for row in list_orders:
-            stmt = insert(OzOrders).values(
-                client_id=row.client_id,
-                order_date=row.order_date,
-                sku=row.sku,
-                vendor_code=row.vendor_code,
-                posting_number=row.posting_number,
-                delivery_schema=row.delivery_schema,
-                quantities=row.quantities,
-                price=row.price
-            ).on_conflict_do_update(
-                index_elements=['order_date', 'sku', 'posting_number'],
-                set_={'vendor_code': row.vendor_code,
-                      'quantities': row.quantities,
-                      'price': row.price}
-            )
-            self.session.execute(stmt)
+        rows = [dict(client_id=row.client_id,
+                     order_date=row.order_date,
+                     sku=row.sku,
+                     vendor_code=row.vendor_code,
+                     posting_number=row.posting_number,
+                     delivery_schema=row.delivery_schema,
+                     quantities=row.quantities,
+                     price=row.price) for row in list_orders]
+        bulk_upsert(session=self.session, model=OzOrders, rows=rows,
+                    index_elements=['order_date', 'sku', 'posting_number'],
+                    update_columns=['vendor_code', 'quantities', 'price'])
         self.session.commit()
         logger.info(f"Успешное добавление в базу")
 
@@ -339,17 +369,15 @@ class OzDbConnection(DbConnection):
             Args:
                 list_stocks (list[DataOzStock]): Список данных о остатках на складах.
         """
-        for row in list_stocks:
-            stmt = insert(OzStock).values(
-                date=row.date,
-                client_id=row.client_id,
-                sku=row.sku,
-                vendor_code=row.vendor_code,
-                size=row.size,
-                quantity=row.quantity,
-                reserved=row.reserved
-            ).on_conflict_do_nothing(index_elements=['date', 'sku', 'size'])
-            self.session.execute(stmt)
+        rows = [dict(date=row.date,
+                     client_id=row.client_id,
+                     sku=row.sku,
+                     vendor_code=row.vendor_code,
+                     size=row.size,
+                     quantity=row.quantity,
+                     reserved=row.reserved) for row in list_stocks]
+        bulk_upsert(session=self.session, model=OzStock, rows=rows,
+                    index_elements=['date', 'sku', 'size'])
         self.session.commit()
         logger.info(f"Успешное добавление в базу")
 
@@ -361,14 +389,12 @@ class OzDbConnection(DbConnection):
             Args:
                 list_bonus (list[DataOzBonus]): Список данных о бонусах продавца.
         """
-        for row in list_bonus:
-            stmt = insert(OzBonus).values(
-                date=row.date,
-                client_id=row.client_id,
-                sku=row.sku,
-                vendor_code=row.vendor_code,
-                bonus=row.bonus
-            ).on_conflict_do_nothing(index_elements=['date', 'sku', 'vendor_code'])
-            self.session.execute(stmt)
+        rows = [dict(date=row.date,
+                     client_id=row.client_id,
+                     sku=row.sku,
+                     vendor_code=row.vendor_code,
+                     bonus=row.bonus) for row in list_bonus]
+        bulk_upsert(session=self.session, model=OzBonus, rows=rows,
+                    index_elements=['date', 'sku', 'vendor_code'])
         self.session.commit()
         logger.info(f"Успешное добавление в базу")
@@ -1,17 +1,115 @@
 import logging
 
+from typing import Iterable, Optional, Union
 from datetime import date
 
-from sqlalchemy import or_, text, select
-from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import Row, or_, text, select
+from sqlalchemy.orm import Session
 
 from .models import *
 from data_classes import *
+from .bulk import bulk_insert, bulk_upsert
 from .db import DbConnection, retry_on_exception
 
 logger = logging.getLogger(__name__)
 
 
+class _ServiceIndex:
+    """
+        Индекс типов услуг отчёта о реализации.
+
+        Тип услуги совпадает со строкой отчёта, если совпадает тип операции и название бонуса
+        начинается с услуги типа (или оба не заданы). Префиксы хранятся по типу операции вместе
+        с их длинами, поэтому проверка строки не перебирает все типы услуг.
+    """
+
+    def __init__(self, type_services: list[tuple[str, str]]):
+        self._empty = set()
+        self._prefixes: dict[str, set[str]] = {}
+        self._lengths: dict[str, list[int]] = {}
+        for operation_type, service in type_services:
+            self.add(operation_type, service)
+
+    def add(self, operation_type: str, service: str) -> None:
+        if service is None:
+            self._empty.add(operation_type)
+            return
+        prefixes = self._prefixes.setdefault(operation_type, set())
+        if service not in prefixes:
+            prefixes.add(service)
+            self._lengths[operation_type] = sorted({len(prefix) for prefix in prefixes})
+
+    def match(self, operation_type: str, service: str) -> bool:
+        if service is None:
+            return operation_type in self._empty
+        prefixes = self._prefixes.get(operation_type)
+        if not prefixes:
+            return False
+        return any(service[:length] in prefixes for length in self._lengths[operation_type] if length <= len(service))
+
+
+class WBReportLoader:
+    """
+        Потоковая замена записей отчёта о реализации начиная с `start_date`.
+
+        Страницы отчёта передаются в базу по мере получения через `add`, поэтому в памяти
+        держится только текущая страница. Старые записи периода удаляются перед первой страницей,
+        и вся загрузка фиксируется одной транзакцией при выходе из контекста: до фиксации
+        читатели видят прежние данные, при ошибке изменения откатываются.
+    """
+
+    def __init__(self, session: Session, client_id: str, start_date: date):
+        """
+            Args:
+                session (Session): Сессия базы данных.
+                client_id (str): ID кабинета.
+                start_date (date): Начальная дата заменяемых записей.
+        """
+        self._session = session
+        self._client_id = client_id
+        self._start_date = start_date
+        self._type_services: Optional[_ServiceIndex] = None
+        self.count = 0
+
+    def __enter__(self) -> 'WBReportLoader':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        if exc_type is not None:
+            self._session.rollback()
+            return
+        if self._type_services is not None:
+            self._session.commit()
+            logger.info(f"Успешное добавление в базу. Количество записей: {self.count}")
+
+    def add(self, list_report: Union[RowBatch, list[DataWBReport]]) -> None:
+        """
+            Передача в базу страницы отчёта.
+
+            Args:
+                list_report (RowBatch or list[DataWBReport]): Строки отчёта о реализации.
+        """
+        if not isinstance(list_report, RowBatch):
+            list_report = RowBatch(DataWBReport, list_report)
+        if self._type_services is None:
+            self._start()
+        for operation_type, service in zip(list_report.column('supplier_oper_name'),
+                                           list_report.column('bonus_type_name')):
+            if not self._type_services.match(operation_type, service):
+                new_type = WBTypeServices(operation_type=operation_type, service=service, type_name='new')
+                self._session.add(new_type)
+                self._type_services.add(operation_type, service)
+
+        self.count += bulk_insert(session=self._session, model=WBReport,
+                                  rows=list_report.records(client_id=self._client_id))
+
+    def _start(self) -> None:
+        self._session.query(WBReport).filter(WBReport.operation_date >= self._start_date,
+                                             WBReport.client_id == self._client_id).delete(synchronize_session=False)
+        self._type_services = _ServiceIndex(self._session.query(WBTypeServices.operation_type,
+                                                                WBTypeServices.service).all())
+
+
 class WBDbConnection(DbConnection):
     @retry_on_exception()
     def get_wb_adverts_id(self, client_id: str, from_date: datetime.date) -> dict:
@@ -33,6 +131,26 @@ class WBDbConnection(DbConnection):
         ).all()
         return {int(advert_id): (create_time, end_time) for (advert_id, create_time, end_time) in result}
 
+    @retry_on_exception()
+    def get_wb_card_products(self, skus: Iterable[str]) -> dict[str, Row]:
+        """
+            Получает данные карточек товаров по списку SKU одним запросом.
+
+            Args:
+                skus (Iterable[str]): SKU товаров.
+
+            Returns:
+                dict[str, Row]: словарь {sku: (sku, client_id, price, discount_price)}.
+        """
+        skus = set(skus)
+        if not skus:
+            return {}
+        result = self.session.query(WBCardProduct.sku,
+                                    WBCardProduct.client_id,
+                                    WBCardProduct.price,
+                                    WBCardProduct.discount_price).filter(WBCardProduct.sku.in_(skus)).all()
+        return {row.sku: row for row in result}
+
     @retry_on_exception()
     def get_wb_sku_vendor_code(self, client_id: str) -> dict:
         """
@@ -91,25 +209,19 @@ class WBDbConnection(DbConnection):
             Args:
                 list_operations (list[DataOperation]): Список данных об операциях.
         """
-        for row in list_operations:
-            stmt = insert(WBMain).values(
-                client_id=row.client_id,
-                accrual_date=row.accrual_date,
-                type_of_transaction=row.type_of_transaction,
-                vendor_code=row.vendor_code,
-                posting_number=row.posting_number,
-                delivery_schema=row.delivery_schema,
-                sku=row.sku,
-                sale=row.sale,
-                quantities=row.quantities,
-                commission=row.commission
-            ).on_conflict_do_update(
-                index_elements=['accrual_date', 'type_of_transaction', 'posting_number', 'sku'],
-                set_={'sale': row.sale,
-                      'quantities': row.quantities,
-                      'commission': row.commission}
-            )
-            self.session.execute(stmt)
+        rows = [dict(client_id=row.client_id,
+                     accrual_date=row.accrual_date,
+                     type_of_transaction=row.type_of_transaction,
+                     vendor_code=row.vendor_code,
+                     posting_number=row.posting_number,
+                     delivery_schema=row.delivery_schema,
+                     sku=row.sku,
+                     sale=row.sale,
+                     quantities=row.quantities,
+                     commission=row.commission) for row in list_operations]
+        bulk_upsert(session=self.session, model=WBMain, rows=rows,
+                    index_elements=['accrual_date', 'type_of_transaction', 'posting_number', 'sku'],
+                    update_columns=['sale', 'quantities', 'commission'])
         self.session.commit()
         logger.info(f"Успешное добавление в базу")
 
@@ -122,17 +234,19 @@ class WBDbConnection(DbConnection):
                 client_id (str): ID кабинета.
                 adverts_list (list[DataWBAdvert]): Список данных о рекламных компаниях.
         """
-        for row in adverts_list:
-            new = WBAdverts(id_advert=row.id_advert,
-                            client_id=client_id,
-                            id_type=row.id_type,
-                            id_status=row.id_status,
-                            name_advert=row.name_advert,
-                            create_time=row.create_time,
-                            change_time=row.change_time,
-                            start_time=row.start_time,
-                            end_time=row.end_time)
-            self.session.merge(new)
+        rows = [dict(id_advert=row.id_advert,
+                     client_id=client_id,
+                     id_type=row.id_type,
+                     id_status=row.id_status,
+                     name_advert=row.name_advert,
+                     create_time=row.create_time,
+                     change_time=row.change_time,
+                     start_time=row.start_time,
+                     end_time=row.end_time) for row in adverts_list]
+        bulk_upsert(session=self.session, model=WBAdverts, rows=rows,
+                    index_elements=['id_advert'],
+                    update_columns=['client_id', 'id_type', 'id_status', 'name_advert', 'create_time',
+                                    'change_time', 'start_time', 'end_time'])
         self.session.commit()
         logger.info(f"Успешное добавление в базу")
 
@@ -144,15 +258,15 @@ class WBDbConnection(DbConnection):
             Args:
                 list_card_product (list[DataWBCardProduct]): Список данных о карточках товаров.
         """
-        for row in list_card_product:
-            new = WBCardProduct(sku=row.sku,
-                                client_id=row.client_id,
-                                vendor_code=row.vendor_code,
-                                link=row.link,
-                                price=row.price,
-                                discount_price=row.discount_price)
-
-            self.session.merge(new)
+        rows = [dict(sku=row.sku,
+                     client_id=row.client_id,
+                     vendor_code=row.vendor_code,
+                     link=row.link,
+                     price=row.price,
+                     discount_price=row.discount_price) for row in list_card_product]
+        bulk_upsert(session=self.session, model=WBCardProduct, rows=rows,
+                    index_elements=['sku'],
+                    update_columns=['client_id', 'vendor_code', 'link', 'price', 'discount_price'])
         self.session.commit()
         logger.info(f"Успешное добавление в базу")
 
@@ -183,31 +297,20 @@ class WBDbConnection(DbConnection):
         self.session.commit()
 
         skus = self.get_wb_sku_vendor_code(client_id=client_id)
-        for row in product_advertising_campaign:
-            if row.sku in skus:
-                stmt = insert(WBStatisticAdvert).values(
-                    sku=row.sku,
-                    advert_id=row.advert_id,
-                    date=row.date,
-                    views=row.views,
-                    clicks=row.clicks,
-                    atbs=row.atbs,
-                    orders_count=row.orders_count,
-                    shks=row.shks,
-                    sum_price=row.sum_price,
-                    sum_cost=row.sum_cost,
-                    appType=row.app_type
-                ).on_conflict_do_update(
+        rows = [dict(sku=row.sku,
+                     advert_id=row.advert_id,
+                     date=row.date,
+                     views=row.views,
+                     clicks=row.clicks,
+                     atbs=row.atbs,
+                     orders_count=row.orders_count,
+                     shks=row.shks,
+                     sum_price=row.sum_price,
+                     sum_cost=row.sum_cost,
+                     appType=row.app_type) for row in product_advertising_campaign if row.sku in skus]
+        bulk_upsert(session=self.session, model=WBStatisticAdvert, rows=rows,
                     index_elements=['sku', 'advert_id', 'date', 'appType'],
-                    set_={'views': row.views,
-                          'clicks': row.clicks,
-                          'atbs': row.atbs,
-                          'orders_count': row.orders_count,
-                          'shks': row.shks,
-                          'sum_price': row.atbs,
-                          'sum_cost': row.sum_cost}
-                )
-                self.session.execute(stmt)
+                    update_columns=['views', 'clicks', 'atbs', 'orders_count', 'shks', 'sum_price', 'sum_cost'])
         self.session.commit()
         logger.info(f"Успешное добавление в базу")
 
@@ -222,121 +325,57 @@ class WBDbConnection(DbConnection):
                 list_card_product (list[DataWBStatisticCardProduct]): Список данных статистики карточек товаров.
         """
         skus = self.get_wb_sku_vendor_code(client_id=client_id)
+        card_products = self.get_wb_card_products(skus=[row.sku for row in list_card_product if row.sku in skus])
+        rows = []
         for row in list_card_product:
-            if row.sku not in skus:
+            card_product = card_products.get(row.sku)
+            if card_product is None:
                 continue
-            card_product = self.session.query(WBCardProduct).filter_by(sku=row.sku).first()
-            price = card_product.price
-            discount_price = card_product.discount_price
-            stmt = insert(WBStatisticCardProduct).values(
-                sku=row.sku,
-                date=row.date,
-                open_card_count=row.open_card_count,
-                add_to_cart_count=row.add_to_cart_count,
-                orders_count=row.orders_count,
-                buyouts_count=row.buyouts_count,
-                cancel_count=row.cancel_count,
-                orders_sum=row.orders_sum,
-                price=price,
-                discount_price=discount_price,
-            ).on_conflict_do_update(
-                index_elements=['sku', 'date'],
-                set_={'open_card_count': row.open_card_count,
-                      'add_to_cart_count': row.add_to_cart_count,
-                      'orders_count': row.orders_count,
-                      'buyouts_count': row.buyouts_count,
-                      'cancel_count': row.cancel_count,
-                      'orders_sum': row.orders_sum}
-            )
-            self.session.execute(stmt)
+            rows.append(dict(sku=row.sku,
+                             date=row.date,
+                             open_card_count=row.open_card_count,
+                             add_to_cart_count=row.add_to_cart_count,
+                             orders_count=row.orders_count,
+                             buyouts_count=row.buyouts_count,
+                             cancel_count=row.cancel_count,
+                             orders_sum=row.orders_sum,
+                             price=card_product.price,
+                             discount_price=card_product.discount_price))
+        bulk_upsert(session=self.session, model=WBStatisticCardProduct, rows=rows,
+                    index_elements=['sku', 'date'],
+                    update_columns=['open_card_count', 'add_to_cart_count', 'orders_count', 'buyouts_count',
+                                    'cancel_count', 'orders_sum'])
         self.session.commit()
         logger.info(f"Успешное добавление в базу")
 
     @retry_on_exception()
     def add_wb_report_entry(self, client_id: str, start_date: date, list_report: list[DataWBReport]) -> None:
-        self.session.query(WBReport).filter(WBReport.operation_date >= start_date,
-                                            WBReport.client_id == client_id).delete(synchronize_session=False)
-        self.session.commit()
-        type_services = set(self.session.query(WBTypeServices.operation_type,
-                                               WBTypeServices.service).all())
-        for row in list_report:
-            match_found = any(
-                row.supplier_oper_name == existing_type[0] and (
-                        (existing_type[1] is None and row.bonus_type_name is None) or
-                        (existing_type[1] is not None and row.bonus_type_name is not None
-                         and row.bonus_type_name.startswith(existing_type[1]))
-                )
-                for existing_type in type_services
-            )
-            if not match_found:
-                new_type = WBTypeServices(operation_type=row.supplier_oper_name,
-                                          service=row.bonus_type_name,
-                                          type_name='new')
-                self.session.add(new_type)
-                type_services.add((row.supplier_oper_name, row.bonus_type_name))
-
-            new = WBReport(client_id=client_id,
-                           realizationreport_id=row.realizationreport_id,
-                           gi_id=row.gi_id,
-                           subject_name=row.subject_name,
-                           sku=row.sku,
-                           brand=row.brand,
-                           vendor_code=row.vendor_code,
-                           size=row.size,
-                           barcode=row.barcode,
-                           doc_type_name=row.doc_type_name,
-                           quantity=row.quantity,
-                           retail_price=row.retail_price,
-                           retail_amount=row.retail_amount,
-                           sale_percent=row.sale_percent,
-                           commission_percent=row.commission_percent,
-                           office_name=row.office_name,
-                           supplier_oper_name=row.supplier_oper_name,
-                           order_date=row.order_date,
-                           sale_date=row.sale_date,
-                           operation_date=row.operation_date,
-                           shk_id=row.shk_id,
-                           retail_price_withdisc_rub=row.retail_price_withdisc_rub,
-                           delivery_amount=row.delivery_amount,
-                           return_amount=row.return_amount,
-                           delivery_rub=row.delivery_rub,
-                           gi_box_type_name=row.gi_box_type_name,
-                           product_discount_for_report=row.product_discount_for_report,
-                           supplier_promo=row.supplier_promo,
-                           order_id=row.order_id,
-                           ppvz_spp_prc=row.ppvz_spp_prc,
-                           ppvz_kvw_prc_base=row.ppvz_kvw_prc_base,
-                           ppvz_kvw_prc=row.ppvz_kvw_prc,
-                           sup_rating_prc_up=row.sup_rating_prc_up,
-                           is_kgvp_v2=row.is_kgvp_v2,
-                           ppvz_sales_commission=row.ppvz_sales_commission,
-                           ppvz_for_pay=row.ppvz_for_pay,
-                           ppvz_reward=row.ppvz_reward,
-                           acquiring_fee=row.acquiring_fee,
-                           acquiring_bank=row.acquiring_bank,
-                           ppvz_vw=row.ppvz_vw,
-                           ppvz_vw_nds=row.ppvz_vw_nds,
-                           ppvz_office_id=row.ppvz_office_id,
-                           ppvz_office_name=row.ppvz_office_name,
-                           ppvz_supplier_id=row.ppvz_supplier_id,
-                           ppvz_supplier_name=row.ppvz_supplier_name,
-                           ppvz_inn=row.ppvz_inn,
-                           declaration_number=row.declaration_number,
-                           bonus_type_name=row.bonus_type_name,
-                           sticker_id=row.sticker_id,
-                           site_country=row.site_country,
-                           penalty=row.penalty,
-                           additional_payment=row.additional_payment,
-                           rebill_logistic_cost=row.rebill_logistic_cost,
-                           rebill_logistic_org=row.rebill_logistic_org,
-                           kiz=row.kiz,
-                           storage_fee=row.storage_fee,
-                           deduction=row.deduction,
-                           acceptance=row.acceptance,
-                           posting_number=row.posting_number)
-            self.session.add(new)
-        self.session.commit()
-        logger.info(f"Успешное добавление в базу")
+        """
+            Заменяет в базе данных записи отчёта о реализации начиная с `start_date`.
+
+            Удаление старых и вставка новых записей выполняются в одной транзакции,
+            поэтому до фиксации читатели видят прежние данные периода.
+
+            Args:
+                client_id (str): ID кабинета.
+                start_date (date): Начальная дата заменяемых записей.
+                list_report (list[DataWBReport]): Список строк отчёта о реализации.
+        """
+        with self.wb_report_loader(client_id=client_id, start_date=start_date) as loader:
+            loader.add(list_report=list_report)
+
+    def wb_report_loader(self, client_id: str, start_date: date) -> 'WBReportLoader':
+        """
+            Загрузчик отчёта о реализации по страницам.
+
+            Args:
+                client_id (str): ID кабинета.
+                start_date (date): Начальная дата заменяемых записей.
+
+            Returns:
+                WBReportLoader: Контекстный менеджер загрузки отчёта.
+        """
+        return WBReportLoader(session=self.session, client_id=client_id, start_date=start_date)
 
     @retry_on_exception()
     def add_wb_storage_entry(self, list_storage: list[DataWBStorage]) -> None:
@@ -346,19 +385,15 @@ class WBDbConnection(DbConnection):
             Args:
                 list_storage (list[DataWBStorage]): Список данных о заказах.
         """
-        for row in list_storage:
-            stmt = insert(WBStorage).values(
-                client_id=row.client_id,
-                date=row.date,
-                vendor_code=row.vendor_code,
-                sku=row.sku,
-                calc_type=row.calc_type,
-                cost=row.cost
-            ).on_conflict_do_update(
-                index_elements=['date', 'sku', 'calc_type'],
-                set_={'cost': row.cost}
-            )
-            self.session.execute(stmt)
+        rows = [dict(client_id=row.client_id,
+                     date=row.date,
+                     vendor_code=row.vendor_code,
+                     sku=row.sku,
+                     calc_type=row.calc_type,
+                     cost=row.cost) for row in list_storage]
+        bulk_upsert(session=self.session, model=WBStorage, rows=rows,
+                    index_elements=['date', 'sku', 'calc_type'],
+                    update_columns=['cost'])
         self.session.commit()
         logger.info(f"Успешное добавление в базу")
 
@@ -370,32 +405,22 @@ class WBDbConnection(DbConnection):
             Args:
                 list_orders (list[DataWBOrder]): Список данных о заказах.
         """
-        for row in list_orders:
-            stmt = insert(WBOrders).values(
-                client_id=row.client_id,
-                order_date=row.order_date,
-                sku=row.sku,
-                vendor_code=row.vendor_code,
-                posting_number=row.posting_number,
-                category=row.category,
-                subject=row.subject,
-                price=row.price,
-                is_cancel=row.is_cancel,
-                cancel_date=row.cancel_date,
-                warehouse=row.warehouse,
-                warehouse_type=row.warehouse_type
-            ).on_conflict_do_update(
-                index_elements=['order_date', 'sku', 'posting_number'],
-                set_={'vendor_code': row.vendor_code,
-                      'category': row.category,
-                      'subject': row.subject,
-                      'price': row.price,
-                      'is_cancel': row.is_cancel,
-                      'cancel_date': row.cancel_date,
-                      'warehouse': row.warehouse,
-                      'warehouse_type': row.warehouse_type}
-            )
-            self.session.execute(stmt)
+        rows = [dict(client_id=row.client_id,
+                     order_date=row.order_date,
+                     sku=row.sku,
+                     vendor_code=row.vendor_code,
+                     posting_number=row.posting_number,
+                     category=row.category,
+                     subject=row.subject,
+                     price=row.price,
+                     is_cancel=row.is_cancel,
+                     cancel_date=row.cancel_date,
+                     warehouse=row.warehouse,
+                     warehouse_type=row.warehouse_type) for row in list_orders]
+        bulk_upsert(session=self.session, model=WBOrders, rows=rows,
+                    index_elements=['order_date', 'sku', 'posting_number'],
+                    update_columns=['vendor_code', 'category', 'subject', 'price', 'is_cancel', 'cancel_date',
+                                    'warehouse', 'warehouse_type'])
         self.session.commit()
         logger.info(f"Успешное добавление в базу")
 
@@ -409,18 +434,14 @@ class WBDbConnection(DbConnection):
                 list_acceptance (list[DataWBAcceptance]): Список данных о приёмке.
         """
         skus = self.get_wb_sku_vendor_code(client_id=client_id)
-        for row in list_acceptance:
-            stmt = insert(WBAcceptance).values(
-                client_id=row.client_id,
-                date=row.date,
-                sku=row.sku,
-                vendor_code=skus.get(row.sku) or '---unknown_vendor',
-                cost=row.cost
-            ).on_conflict_do_update(
-                index_elements=['date', 'sku'],
-                set_={'cost': row.cost}
-            )
-            self.session.execute(stmt)
+        rows = [dict(client_id=row.client_id,
+                     date=row.date,
+                     sku=row.sku,
+                     vendor_code=skus.get(row.sku) or '---unknown_vendor',
+                     cost=row.cost) for row in list_acceptance]
+        bulk_upsert(session=self.session, model=WBAcceptance, rows=rows,
+                    index_elements=['date', 'sku'],
+                    update_columns=['cost'])
         self.session.commit()
         logger.info(f"Успешное добавление в базу")
 
@@ -432,20 +453,18 @@ class WBDbConnection(DbConnection):
             Args:
                 list_stocks (list[DataWBStock]): Список данных о остатках на складах.
         """
-        for row in list_stocks:
-            stmt = insert(WBStock).values(
-                date=row.date,
-                client_id=row.client_id,
-                sku=row.sku,
-                vendor_code=row.vendor_code,
-                size=row.size,
-                category=row.category,
-                subject=row.subject,
-                warehouse=row.warehouse,
-                quantity_warehouse=row.quantity_warehouse,
-                quantity_to_client=row.quantity_to_client,
-                quantity_from_client=row.quantity_from_client
-            ).on_conflict_do_nothing(index_elements=['client_id', 'date', 'sku', 'warehouse', 'size'])
-            self.session.execute(stmt)
+        rows = [dict(date=row.date,
+                     client_id=row.client_id,
+                     sku=row.sku,
+                     vendor_code=row.vendor_code,
+                     size=row.size,
+                     category=row.category,
+                     subject=row.subject,
+                     warehouse=row.warehouse,
+                     quantity_warehouse=row.quantity_warehouse,
+                     quantity_to_client=row.quantity_to_client,
+                     quantity_from_client=row.quantity_from_client) for row in list_stocks]
+        bulk_upsert(session=self.session, model=WBStock, rows=rows,
+                    index_elements=['client_id', 'date', 'sku', 'warehouse', 'size'])
         self.session.commit()
         logger.info(f"Успешное добавление в базу")
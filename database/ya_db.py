@@ -1,9 +1,8 @@
 import logging
 
-from sqlalchemy.dialects.postgresql import insert
-
 from .models import *
 from data_classes import *
+from .bulk import bulk_upsert
 from .db import DbConnection, retry_on_exception
 
 logger = logging.getLogger(__name__)
@@ -32,25 +31,19 @@ class YaDbConnection(DbConnection):
             Args:
                 list_operations (list[DataOperation]): Список данных об операциях.
         """
-        for row in list_operations:
-            stmt = insert(YaMain).values(
-                client_id=row.client_id,
-                accrual_date=row.accrual_date,
-                type_of_transaction=row.type_of_transaction,
-                vendor_code=row.vendor_code,
-                posting_number=row.posting_number,
-                delivery_schema=row.delivery_schema,
-                sku=row.sku,
-                sale=row.sale,
-                quantities=row.quantities,
-                bonus=row.bonus
-            ).on_conflict_do_update(
-                index_elements=['accrual_date', 'client_id', 'type_of_transaction', 'posting_number', 'sku'],
-                set_={'sale': row.sale,
-                      'quantities': row.quantities,
-                      'bonus': row.bonus}
-            )
-            self.session.execute(stmt)
+        rows = [dict(client_id=row.client_id,
+                     accrual_date=row.accrual_date,
+                     type_of_transaction=row.type_of_transaction,
+                     vendor_code=row.vendor_code,
+                     posting_number=row.posting_number,
+                     delivery_schema=row.delivery_schema,
+                     sku=row.sku,
+                     sale=row.sale,
+                     quantities=row.quantities,
+                     bonus=row.bonus) for row in list_operations]
+        bulk_upsert(session=self.session, model=YaMain, rows=rows,
+                    index_elements=['accrual_date', 'client_id', 'type_of_transaction', 'posting_number', 'sku'],
+                    update_columns=['sale', 'quantities', 'bonus'])
         self.session.commit()
         logger.info(f"Успешное добавление в базу")
 
@@ -71,26 +64,18 @@ class YaDbConnection(DbConnection):
                                         type_name='new')
                 self.session.add(new_type)
                 type_services.add((row.operation_type, row.service or ''))
-            stmt = insert(YaReport).values(
-                client_id=row.client_id,
-                campaign_id=row.campaign_id,
-                posting_number=row.posting_number or '',
-                operation_type=row.operation_type,
-                vendor_code=row.vendor_code or '',
-                service=row.service or '',
-                date=row.date,
-                cost=row.cost
-            ).on_conflict_do_update(
-                index_elements=['client_id',
-                                'campaign_id',
-                                'date',
-                                'posting_number',
-                                'vendor_code',
-                                'operation_type',
-                                'service'],
-                set_={'cost': row.cost}
-            )
-            self.session.execute(stmt)
+        rows = [dict(client_id=row.client_id,
+                     campaign_id=row.campaign_id,
+                     posting_number=row.posting_number or '',
+                     operation_type=row.operation_type,
+                     vendor_code=row.vendor_code or '',
+                     service=row.service or '',
+                     date=row.date,
+                     cost=row.cost) for row in list_reports]
+        bulk_upsert(session=self.session, model=YaReport, rows=rows,
+                    index_elements=['client_id', 'campaign_id', 'date', 'posting_number', 'vendor_code',
+                                    'operation_type', 'service'],
+                    update_columns=['cost'])
         self.session.commit()
         logger.info(f"Успешное добавление в базу")
 
@@ -102,33 +87,21 @@ class YaDbConnection(DbConnection):
             Args:
                 list_orders (list[DataYaOrder]): Список данных о заказах.
         """
-        for row in list_orders:
-            stmt = insert(YaOrders).values(
-                order_date=row.order_date,
-                client_id=row.client_id,
-                sku=row.sku,
-                vendor_code=row.vendor_code,
-                posting_number=row.posting_number,
-                delivery_schema=row.delivery_schema,
-                quantities=row.quantities,
-                rejected=row.rejected,
-                returned=row.returned,
-                price=row.price,
-                status=row.status,
-                update_date=row.update_date
-            ).on_conflict_do_update(
-                index_elements=['order_date',
-                                'sku',
-                                'posting_number'],
-                set_={'price': row.price,
-                      'quantities': row.quantities,
-                      'rejected': row.rejected,
-                      'returned': row.returned,
-                      'status': row.status,
-                      'update_date': row.update_date,
-                      }
-            )
-            self.session.execute(stmt)
+        rows = [dict(order_date=row.order_date,
+                     client_id=row.client_id,
+                     sku=row.sku,
+                     vendor_code=row.vendor_code,
+                     posting_number=row.posting_number,
+                     delivery_schema=row.delivery_schema,
+                     quantities=row.quantities,
+                     rejected=row.rejected,
+                     returned=row.returned,
+                     price=row.price,
+                     status=row.status,
+                     update_date=row.update_date) for row in list_orders]
+        bulk_upsert(session=self.session, model=YaOrders, rows=rows,
+                    index_elements=['order_date', 'sku', 'posting_number'],
+                    update_columns=['price', 'quantities', 'rejected', 'returned', 'status', 'update_date'])
         self.session.commit()
         logger.info(f"Успешное добавление в базу")
 
@@ -140,18 +113,15 @@ class YaDbConnection(DbConnection):
             Args:
                 list_stocks (list[DataYaStock]): Список данных о заказах.
         """
-        for row in list_stocks:
-            stmt = insert(YaStock).values(
-                date=row.date,
-                client_id=row.client_id,
-                campaign_id=row.campaign_id,
-                vendor_code=row.vendor_code,
-                size=row.size,
-                warehouse=row.warehouse,
-                quantity=row.quantity,
-                type=row.type
-            ).on_conflict_do_nothing(
-                index_elements=['client_id', 'date', 'campaign_id', 'vendor_code', 'size', 'warehouse', 'type'])
-            self.session.execute(stmt)
+        rows = [dict(date=row.date,
+                     client_id=row.client_id,
+                     campaign_id=row.campaign_id,
+                     vendor_code=row.vendor_code,
+                     size=row.size,
+                     warehouse=row.warehouse,
+                     quantity=row.quantity,
+                     type=row.type) for row in list_stocks]
+        bulk_upsert(session=self.session, model=YaStock, rows=rows,
+                    index_elements=['client_id', 'date', 'campaign_id', 'vendor_code', 'size', 'warehouse', 'type'])
         self.session.commit()
         logger.info(f"Успешное добавление в базу")
@@ -437,7 +437,7 @@ def stat_orders_update(db_conn: DbConnection, days: int = 1) -> None:
     new_worksheet.batch_update(all_updates, value_input_option=ValueInputOption("USER_ENTERED"))
 
 
-def main(retries: int = 6) -> None:
+def main(retries: int = 6, raise_errors: bool = False) -> None:
     try:
         db_conn = DbConnection()
         db_conn.start_db()
@@ -447,14 +447,20 @@ def main(retries: int = 6) -> None:
         logger.error(f'Не доступна база данных. Осталось попыток подключения: {retries - 1}')
         if retries > 0:
             time.sleep(10)
-            main(retries=retries - 1)
+            main(retries=retries - 1, raise_errors=raise_errors)
+        elif raise_errors:
+            raise
     except gspread.exceptions.APIError as e:
         logger.error(f'Ошибка работы с GoogleSheet: {e}. Осталось попыток: {retries - 1}')
         if retries > 0:
             time.sleep(60)
-            main(retries=retries - 1)
+            main(retries=retries - 1, raise_errors=raise_errors)
+        elif raise_errors:
+            raise
     except Exception as e:
         logger.error(f'{e}')
+        if raise_errors:
+            raise
 
 
 if __name__ == "__main__":
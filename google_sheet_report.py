@@ -165,7 +165,7 @@ def stat_advert_update(db_conn: WBDbConnection):
         format_cell_range(worksheet, f'{cl}2:{cl}{len(entry) + 1}', date_format)
 
 
-def main(retries: int = 6) -> None:
+def main(retries: int = 6, raise_errors: bool = False) -> None:
     try:
         db_conn = WBDbConnection()
         db_conn.start_db()
@@ -178,9 +178,13 @@ def main(retries: int = 6) -> None:
         logger.error(f'Не доступна база данных. Осталось попыток подключения: {retries - 1}')
         if retries > 0:
             time.sleep(10)
-            main(retries=retries - 1)
+            main(retries=retries - 1, raise_errors=raise_errors)
+        elif raise_errors:
+            raise
     except Exception as e:
         logger.error(f'{e}')
+        if raise_errors:
+            raise
 
 
 if __name__ == "__main__":
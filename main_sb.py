@@ -7,7 +7,8 @@ from sqlalchemy.exc import OperationalError
 
 from data_classes import DataOperation, DataSbOrders
 from sb_sdk.sb_api import SberApi
-from database import SbDbConnection
+from runners import run_cabinets, raise_on_failure
+from database import SbDbConnection, Client
 
 
 nest_asyncio.apply()
@@ -17,13 +18,13 @@ logger = logging.getLogger(__name__)
 
 
 async def get_shipments(db_conn: SbDbConnection, client_id: str, api_key: str, date_from: str, date_to: str) -> list[str]:
-    list_shipments = db_conn.get_not_delivered_orders(client_id=client_id)
-    statuses = db_conn.get_status_orders()
-    api_user = SberApi(client_id=client_id, api_key=api_key)
-    answer = await api_user.get_order_service_order_search(date_from=date_from,
-                                                           date_to=date_to,
-                                                           statuses=statuses,
-                                                           count=1000)
+    list_shipments = await db_conn.aio.get_not_delivered_orders(client_id=client_id)
+    statuses = await db_conn.aio.get_status_orders()
+    async with SberApi(client_id=client_id, api_key=api_key) as api_user:
+        answer = await api_user.get_order_service_order_search(date_from=date_from,
+                                                               date_to=date_to,
+                                                               statuses=statuses,
+                                                               count=1000)
     if answer:
         if answer.data:
             list_shipments.extend(answer.data.shipments)
@@ -41,8 +42,8 @@ async def add_operations(db_conn: SbDbConnection, client_id: str, api_key: str,
     if not list_shipments:
         return
 
-    api_user = SberApi(client_id=client_id, api_key=api_key)
-    answer = await api_user.get_order_service_orders(shipments=list_shipments)
+    async with SberApi(client_id=client_id, api_key=api_key) as api_user:
+        answer = await api_user.get_order_service_orders(shipments=list_shipments)
     if answer:
         if answer.data:
             for shipment in answer.data.shipments:
@@ -64,13 +65,13 @@ async def add_operations(db_conn: SbDbConnection, client_id: str, api_key: str,
                                                 date_order=format_date(date_format=shipment.creationDate)))
 
     logger.info(f"Добавление в базу данных выполненых заказов в количестве {len(list_delivered)}")
-    db_conn.add_sb_operation(client_id=client_id, list_operations=list_delivered)
+    await db_conn.aio.add_sb_operation(client_id=client_id, list_operations=list_delivered)
     logger.info(f"Обновление информации о заказах")
-    db_conn.add_sb_orders(client_id=client_id, list_operations=list_orders)
-    db_conn.delete_order_canceled(client_id=client_id)
+    await db_conn.aio.add_sb_orders(client_id=client_id, list_operations=list_orders)
+    await db_conn.aio.delete_order_canceled(client_id=client_id)
 
 
-async def main_func_sb(retries: int = 6) -> None:
+async def main_func_sb(retries: int = 6, raise_errors: bool = False) -> None:
     try:
         db_conn = SbDbConnection()
         db_conn.start_db()
@@ -79,7 +80,7 @@ async def main_func_sb(retries: int = 6) -> None:
         date_from = date_now - timedelta(days=1)
         date_to = date_now - timedelta(microseconds=1)
 
-        for client in clients:
+        async def job(db_conn: SbDbConnection, client: Client) -> None:
             list_shipments = await get_shipments(db_conn=db_conn,
                                                  client_id=client.client_id,
                                                  api_key=client.api_key,
@@ -92,13 +93,19 @@ async def main_func_sb(retries: int = 6) -> None:
                                  api_key=client.api_key,
                                  list_shipments=list_shipments)
 
+        results = await run_cabinets(db_conn=db_conn, cabinets=clients, job=job)
+        raise_on_failure(results)
     except OperationalError:
         logger.error(f'Не доступна база данных. Осталось попыток подключения: {retries - 1}')
         if retries > 0:
             await asyncio.sleep(10)
-            await main_func_sb(retries=retries - 1)
+            await main_func_sb(retries=retries - 1, raise_errors=raise_errors)
+        elif raise_errors:
+            raise
     except Exception as e:
         logger.error(f'{e}')
+        if raise_errors:
+            raise
 
 if __name__ == "__main__":
     loop = asyncio.get_event_loop()
@@ -8,7 +8,8 @@ from datetime import datetime, timedelta, timezone
 from sqlalchemy.exc import OperationalError
 
 from wb_sdk.wb_api import WBApi
-from database import WBDbConnection
+from runners import run_cabinets, raise_on_failure
+from database import WBDbConnection, Client
 from data_classes import DataOperation
 
 nest_asyncio.apply()
@@ -16,31 +17,44 @@ nest_asyncio.apply()
 logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)-8s %(message)s')
 logger = logging.getLogger(__name__)
 
+SYNC_ENDPOINT = 'wb_supplier_sales'
+# Запас перекрытия с уже загруженными изменениями (lastChangeDate).
+SYNC_OVERLAP = timedelta(hours=1)
+
 
 async def add_wb_main_entry(db_conn: WBDbConnection, client_id: str, api_key: str) -> None:
     """
         Добавление записей в таблицу `wb_main_table`.
 
+        Загружаются продажи, изменённые с момента последней успешной синхронизации кабинета
+        (с запасом `SYNC_OVERLAP`); при первом запуске — за последние 10 дней.
+
         Args:
             db_conn (WBDbConnection): Объект соединения с базой данных.
             client_id (str): ID кабинета.
             api_key (str): API KEY кабинета.
     """
     date = datetime.now(tz=timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
-    start = date - timedelta(days=10)
     end = date - timedelta(microseconds=1)
-    logger.info(f"За период с <{start}> до <{end}>")
+    # lastChangeDate приходит без часового пояса, отметка синхронизации хранится так же
+    today = date.replace(tzinfo=None)
+    start = await db_conn.aio.get_sync_start(client_id=client_id, endpoint=SYNC_ENDPOINT,
+                                             default=today - timedelta(days=10), overlap=SYNC_OVERLAP)
+    logger.info(f"Изменения с <{start}>, продажи до <{end}>")
 
     list_operation = []
 
     # Инициализация API-клиента WB
-    api_user = WBApi(api_key=api_key)
-
-    # Получение списка продаж
-    answer_sales = await api_user.get_supplier_sales(date_from=start.isoformat(), flag=0)
+    async with WBApi(api_key=api_key) as api_user:
+        # Получение списка продаж
+        answer_sales = await api_user.get_supplier_sales(date_from=start.isoformat(), flag=0)
 
     # Обработка полученных результатов
+    watermark = None
     for operation in answer_sales.result:
+        if operation.lastChangeDate:
+            last_change = operation.lastChangeDate.replace(tzinfo=None)
+            watermark = max(watermark, last_change) if watermark else last_change
         if operation.orderType != "Клиентский":
             continue
 
@@ -72,26 +86,38 @@ async def add_wb_main_entry(db_conn: WBDbConnection, client_id: str, api_key: st
                                             commission=commission))
 
     logger.info(f"Количество записей: {len(list_operation)}")
-    db_conn.add_wb_operation(list_operations=list_operation)
+    await db_conn.aio.add_wb_operation(list_operations=list_operation)
 
+    if watermark:
+        # Продажи текущего дня пропускаются, поэтому отметка не может быть позже его начала
+        await db_conn.aio.set_sync_state(client_id=client_id, endpoint=SYNC_ENDPOINT,
+                                         watermark=min(watermark, today))
 
-async def main_func_wb(retries: int = 6) -> None:
+
+async def main_func_wb(retries: int = 6, raise_errors: bool = False) -> None:
     try:
         db_conn = WBDbConnection()
         db_conn.start_db()
 
         clients = db_conn.get_clients(marketplace="WB")
 
-        for client in clients:
+        async def job(db_conn: WBDbConnection, client: Client) -> None:
             logger.info(f"Добавление в базу данных компании '{client.name_company}'")
             await add_wb_main_entry(db_conn=db_conn, client_id=client.client_id, api_key=client.api_key)
+
+        results = await run_cabinets(db_conn=db_conn, cabinets=clients, job=job)
+        raise_on_failure(results)
     except OperationalError:
         logger.error(f'Не доступна база данных. Осталось попыток подключения: {retries - 1}')
         if retries > 0:
             await asyncio.sleep(10)
-            await main_func_wb(retries=retries - 1)
+            await main_func_wb(retries=retries - 1, raise_errors=raise_errors)
+        elif raise_errors:
+            raise
     except Exception as e:
         logger.error(f'{e}')
+        if raise_errors:
+            raise
 
 
 if __name__ == "__main__":
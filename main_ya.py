@@ -7,7 +7,8 @@ from sqlalchemy.exc import OperationalError
 
 from data_classes import DataOperation, DataYaCampaigns
 from ya_sdk.ya_api import YandexApi
-from database import YaDbConnection
+from runners import run_cabinets, raise_on_failure
+from database import YaDbConnection, Client
 
 nest_asyncio.apply()
 
@@ -17,10 +18,8 @@ logger = logging.getLogger(__name__)
 
 async def get_campaign_ids(api_key: str) -> list[DataYaCampaigns]:
     list_campaigns = []
-    api_user = YandexApi(api_key=api_key)
-    answer = await api_user.get_campaigns()
-    if answer:
-        for campaign in answer.campaigns:
+    async with YandexApi(api_key=api_key) as api_user:
+        async for campaign in api_user.iter_campaigns():
             list_campaigns.append(DataYaCampaigns(client_id=str(campaign.business.field_id),
                                                   campaign_id=str(campaign.field_id),
                                                   name=campaign.domain,
@@ -30,23 +29,14 @@ async def get_campaign_ids(api_key: str) -> list[DataYaCampaigns]:
 
 async def get_orders(api_key: str, campaign_id: str, updated_at_from: str, updated_at_to: str) -> list[int]:
     list_orders = []
-    page = 1
 
-    api_user = YandexApi(api_key=api_key)
-    while True:
-        answer_orders = await api_user.get_campaigns_orders(campaign_id=campaign_id,
-                                                            updated_at_from=updated_at_from,
-                                                            updated_at_to=updated_at_to,
-                                                            status=['DELIVERED'],
-                                                            page=page)
-        if answer_orders:
-            for order in answer_orders.orders:
-                list_orders.append(order.id_field)
-
-        if answer_orders.pager.pagesCount <= page:
-            break
-
-        page += 1
+    async with YandexApi(api_key=api_key) as api_user:
+        orders = api_user.iter_campaigns_orders(campaign_id=campaign_id,
+                                                updated_at_from=updated_at_from,
+                                                updated_at_to=updated_at_to,
+                                                status=['DELIVERED'])
+        async for order in orders:
+            list_orders.append(order.id_field)
 
     return list_orders
 
@@ -74,27 +64,17 @@ async def get_operations(client_id: str, campaign_id: str, api_key: str, updated
     date_format = '%Y-%m-%d'
 
     # Инициализация API-клиента Yandex
-    api_user = YandexApi(api_key=api_key)
-
-    # Получение списка заказов
-    list_orders = await get_orders(campaign_id=campaign_id,
-                                   api_key=api_key,
-                                   updated_at_from=updated_at_from,
-                                   updated_at_to=updated_at_to)
-    if not list_orders:
-        return list_operation
-
-    page_token = None
-
-    while True:
-        answer = await api_user.get_campaigns_stats_orders(campaign_id=campaign_id,
-                                                           orders=list_orders,
-                                                           limit=200,
-                                                           page_token=page_token)
-        if not answer.result:
-            break
-
-        for order in answer.result.orders:
+    async with YandexApi(api_key=api_key) as api_user:
+        # Получение списка заказов
+        list_orders = await get_orders(campaign_id=campaign_id,
+                                       api_key=api_key,
+                                       updated_at_from=updated_at_from,
+                                       updated_at_to=updated_at_to)
+        if not list_orders:
+            return list_operation
+
+        orders = api_user.iter_campaigns_stats_orders(campaign_id=campaign_id, orders=list_orders, limit=200)
+        async for order in orders:
             posting_number = str(order.id_field)  # Номер отправления
             accrual_date = datetime.strptime(order.statusUpdateDate.split('T')[0], date_format).date()  # Дата доставки
             for item in order.items:
@@ -132,10 +112,6 @@ async def get_operations(client_id: str, campaign_id: str, api_key: str, updated
                                                         sale=sale,
                                                         quantities=quantities,
                                                         bonus=bonus))
-        if not answer.result.paging.nextPageToken:
-            break
-
-        page_token = answer.result.paging.nextPageToken
 
     return list_operation
 
@@ -163,10 +139,10 @@ async def add_yandex_main_entry(db_conn: YaDbConnection, client_id: str, campaig
                                       updated_at_to=end.isoformat())
 
     logger.info(f"Количество записей: {len(operations)}")
-    db_conn.add_ya_operation(list_operations=operations)
+    await db_conn.aio.add_ya_operation(list_operations=operations)
 
 
-async def main_func_yandex(retries: int = 6) -> None:
+async def main_func_yandex(retries: int = 6, raise_errors: bool = False) -> None:
     """
         Основная функция для обновления записей в базе данных.
 
@@ -177,28 +153,38 @@ async def main_func_yandex(retries: int = 6) -> None:
         db_conn.start_db()
         clients = db_conn.get_clients(marketplace='Yandex')
         api_key_set = {client.api_key for client in clients}
+        date_now = datetime.now(tz=timezone(timedelta(hours=3))).replace(hour=0, minute=0, second=0, microsecond=0)
+
+        cabinets = []
         for api_key in api_key_set:
             list_campaigns = await get_campaign_ids(api_key=api_key)
             db_conn.add_ya_campaigns(list_campaigns=list_campaigns)
-
-            date_now = datetime.now(tz=timezone(timedelta(hours=3))).replace(hour=0, minute=0, second=0, microsecond=0)
-
             for campaign in sorted(list_campaigns, key=lambda x: x.client_id):
-                client = db_conn.get_client(client_id=campaign.client_id)
-                logger.info(f"Добавление в базу данных компании '{client.name_company}' магазина '{campaign.name}'")
-                await add_yandex_main_entry(db_conn=db_conn,
-                                            client_id=client.client_id,
-                                            campaign_id=campaign.campaign_id,
-                                            api_key=client.api_key,
-                                            date_now=date_now)
-
+                cabinets.append((db_conn.get_client(client_id=campaign.client_id), campaign))
+
+        async def job(db_conn: YaDbConnection, cabinet: tuple[Client, DataYaCampaigns]) -> None:
+            client, campaign = cabinet
+            logger.info(f"Добавление в базу данных компании '{client.name_company}' магазина '{campaign.name}'")
+            await add_yandex_main_entry(db_conn=db_conn,
+                                        client_id=client.client_id,
+                                        campaign_id=campaign.campaign_id,
+                                        api_key=client.api_key,
+                                        date_now=date_now)
+
+        results = await run_cabinets(db_conn=db_conn, cabinets=cabinets, job=job,
+                                     name=lambda cabinet: f"{cabinet[0].name_company} / {cabinet[1].name}")
+        raise_on_failure(results)
     except OperationalError:
         logger.error(f'Не доступна база данных. Осталось попыток подключения: {retries - 1}')
         if retries > 0:
             await asyncio.sleep(10)
-            await main_func_yandex(retries=retries - 1)
+            await main_func_yandex(retries=retries - 1, raise_errors=raise_errors)
+        elif raise_errors:
+            raise
     except Exception as e:
         logger.error(f'{e}')
+        if raise_errors:
+            raise
 
 
 if __name__ == "__main__":
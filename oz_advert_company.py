@@ -1,5 +1,5 @@
 import asyncio
-from typing import Type
+from typing import AsyncIterator, Type
 
 import nest_asyncio
 import logging
@@ -8,9 +8,14 @@ from datetime import datetime, timedelta, date
 
 from sqlalchemy.exc import OperationalError
 
+from base_sdk import batches
 from ozon_sdk.errors import ClientError
+from runners import (run_cabinets, run_pipeline, run_reports,
+                     ReportJob, REPORT_PENDING, REPORT_READY, REPORT_FAILED, raise_on_failure)
 from database import OzDbConnection, Client
 from ozon_sdk.ozon_api import OzonApi, OzonPerformanceAPI
+from ozon_sdk.response import AnalyticsDataResponse
+from services import OzSkuResolver
 from data_classes import DataOzProductCard, DataOzStatisticCardProduct, DataOzAdvert, DataOzStatisticAdvert, \
     DataOzAdvertDailyBudget
 
@@ -19,6 +24,9 @@ nest_asyncio.apply()
 logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)-8s %(message)s')
 logger = logging.getLogger(__name__)
 
+# Ozon Performance формирует отчёты аккаунта по одному; кабинеты обрабатываются параллельно.
+STATISTICS_REPORT_CONCURRENCY = 1
+
 
 async def add_adverts(db_conn: OzDbConnection, client_id: str, performance_id: str, client_secret: str,
                       from_date: date) -> None:
@@ -38,10 +46,9 @@ async def add_adverts(db_conn: OzDbConnection, client_id: str, performance_id: s
     adverts_daily_budget = []
 
     # Инициализация API-клиента Ozon
-    api_user = OzonPerformanceAPI(client_id=performance_id, client_secret=client_secret)
-
-    # Получение списка РК
-    answer = await api_user.get_client_campaign()
+    async with OzonPerformanceAPI(client_id=performance_id, client_secret=client_secret) as api_user:
+        # Получение списка РК
+        answer = await api_user.get_client_campaign()
 
     # Обработка полученных результатов
     for advert in answer.list_field:
@@ -69,106 +76,131 @@ async def add_adverts(db_conn: OzDbConnection, client_id: str, performance_id: s
                                          end_time=end_time))
 
     logger.info(f"Обновление информации о рекламных компаний")
-    db_conn.add_oz_adverts(client_id=client_id, adverts_list=adverts_list)
+    await db_conn.aio.add_oz_adverts(client_id=client_id, adverts_list=adverts_list)
     logger.info(f"Добавление данных по бюджетам РК")
-    company_ids = db_conn.get_oz_adverts_id(client_id=client_id)
+    company_ids = await db_conn.aio.get_oz_adverts_id(client_id=client_id)
     daily_budget = [row for row in adverts_daily_budget if row.advert_id in company_ids]
-    db_conn.add_oz_adverts_daily_budget(date=from_date, adverts_daily_budget=daily_budget)
+    await db_conn.aio.add_oz_adverts_daily_budget(date=from_date, adverts_daily_budget=daily_budget)
 
 
-async def get_products_ids(client_id: str, api_key: str) -> list[str]:
+async def iter_product_ids(api_user: OzonApi, chunk_size: int = 100) -> AsyncIterator[list[str]]:
     """
-        Получения списка ID товаров.
+        Получение ID товаров пачками со всех страниц.
 
         Args:
-            client_id (str): ID кабинета.
-            api_key (str): API KEY кабинета.
+            api_user (OzonApi): API-клиент кабинета.
+            chunk_size (int, optional): Количество ID в одной странице результата.
 
-        Returns:
-            List[str]: Список ID товаров.
+        Yields:
+            list[str]: Очередные ID товаров, не более `chunk_size`.
     """
-    list_product_ids = []
-
-    # Инициализация API-клиента Ozon
-    api_user = OzonApi(client_id=client_id, api_key=api_key)
-
     visibility_params = ['ALL', 'ARCHIVED']
 
     for visibility in visibility_params:
-        last_id = None
-        total = 1000
-
-        # Получение всех страниц товаров
-        while total >= 1000:
-            # Получение списка товаров
-            answer = await api_user.get_product_list(limit=1000, last_id=last_id, visibility=visibility)
-
-            # Обработка полученных результатов
-            for item in answer.result.items:
-                list_product_ids.append(str(item.product_id))
-            total = answer.result.total
-            last_id = answer.result.last_id
-
-    return list_product_ids
+        products = api_user.iter_product_list(visibility=visibility, limit=1000)
+        async for chunk in batches(products, size=chunk_size):
+            yield [str(item.product_id) for item in chunk]
 
 
 async def add_card_products(db_conn: OzDbConnection, client_id: str, api_key: str) -> None:
     """
         Обновление записей в таблице `oz_card_product` за указанную дату.
 
+        Карточки запрашиваются по 100 товаров конвейером: пока обрабатывается одна пачка,
+        запрашиваются следующие ID товаров и записывается предыдущая пачка.
+
         Args:
             db_conn (OzDbConnection): Объект соединения с базой данных.
             client_id (str): ID кабинета.
             api_key (str): API KEY кабинета.
     """
-    list_card_product = []
-
-    # Получение id товаров по ID кабинета
-    list_product_ids = await get_products_ids(client_id=client_id, api_key=api_key)
+    logger.info(f"Обновление информации о карточках товаров")
 
     # Инициализация API-клиента Ozon
-    api_user = OzonApi(client_id=client_id, api_key=api_key)
+    async with OzonApi(client_id=client_id, api_key=api_key) as api_user:
+        async def parse(ids: list[str]) -> list[DataOzProductCard]:
+            list_card_product = []
 
-    # Запрос карточек товара по 100 товаров за цикл
-    for ids in [list_product_ids[i:i + 100] for i in range(0, len(list_product_ids), 100)]:
-        # Получение списка карточек товаров
-        answer = await api_user.get_product_info_list(product_id=ids)
-        # Получение списка атрибутов товаров
-        attributes = await api_user.get_products_info_attributes(product_id=[str(product) for product in ids],
-                                                                 limit=1000)
+            # Получение списка карточек товаров
+            answer = await api_user.get_product_info_list(product_id=ids)
+            # Получение списка атрибутов товаров
+            attributes = await api_user.get_products_info_attributes(product_id=ids, limit=1000)
 
-        # Обработка полученных результатов
-        for item in answer.result.items:
-            vendor_code = item.offer_id  # Артикул товара в системе продавца
-            brand = None
-            category = None
-
-            for product in attributes.result:
-                if product.id_field == item.id_field:
-                    for attribute in product.attributes:
-                        if attribute.attribute_id == 8229:
-                            category = attribute.values[0].value  # Категория товаров
-                        elif attribute.attribute_id == 85:
-                            brand = attribute.values[0].value  # Брэнд товара
-
-            price = round(float(item.old_price), 2)  # Цена товара
-            discount_price = round(float(item.price), 2)  # Цена товара со скидкой
-
-            # Сбор информации для каждого артикула WB товара
-            for sku in [item.sku, item.fbo_sku, item.fbs_sku]:
-                if sku:
-                    link = f"https://www.ozon.ru/product/{sku}"  # Ссылка на товар
-                    list_card_product.append(DataOzProductCard(sku=str(sku),
-                                                               client_id=client_id,
-                                                               vendor_code=vendor_code,
-                                                               brand=brand,
-                                                               category=category,
-                                                               link=link,
-                                                               price=price,
-                                                               discount_price=discount_price))
+            # Обработка полученных результатов
+            for item in answer.result.items:
+                vendor_code = item.offer_id  # Артикул товара в системе продавца
+                brand = None
+                category = None
+
+                for product in attributes.result:
+                    if product.id_field == item.id_field:
+                        for attribute in product.attributes:
+                            if attribute.attribute_id == 8229:
+                                category = attribute.values[0].value  # Категория товаров
+                            elif attribute.attribute_id == 85:
+                                brand = attribute.values[0].value  # Брэнд товара
+
+                price = round(float(item.old_price), 2)  # Цена товара
+                discount_price = round(float(item.price), 2)  # Цена товара со скидкой
+
+                # Сбор информации для каждого артикула WB товара
+                for sku in [item.sku, item.fbo_sku, item.fbs_sku]:
+                    if sku:
+                        link = f"https://www.ozon.ru/product/{sku}"  # Ссылка на товар
+                        list_card_product.append(DataOzProductCard(sku=str(sku),
+                                                                   client_id=client_id,
+                                                                   vendor_code=vendor_code,
+                                                                   brand=brand,
+                                                                   category=category,
+                                                                   link=link,
+                                                                   price=price,
+                                                                   discount_price=discount_price))
+            return list_card_product
+
+        async def write(list_card_product: list[DataOzProductCard]) -> None:
+            await db_conn.aio.add_oz_cards_products(client_id=client_id, list_card_product=list_card_product)
+
+        await run_pipeline(pages=iter_product_ids(api_user=api_user), parse=parse, write=write,
+                           name=f"Карточки товаров {client_id}")
+
+
+async def iter_analytics_pages(api_user: OzonApi, date_from: date, date_to: date, metrics: list[str],
+                               limit: int = 1000) -> AsyncIterator[AnalyticsDataResponse]:
+    """
+        Постраничное получение статистики КТ по `offset`.
 
-    logger.info(f"Обновление информации о карточках товаров")
-    db_conn.add_oz_cards_products(client_id=client_id, list_card_product=list_card_product)
+        Args:
+            api_user (OzonApi): API-клиент кабинета.
+            date_from (date): Начало периода.
+            date_to (date): Конец периода.
+            metrics (list[str]): Метрики КТ.
+            limit (int, optional): Количество строк на странице.
+
+        Yields:
+            AnalyticsDataResponse: Ответ с очередной страницей статистики.
+    """
+    offset = 0
+    while True:
+        # Получение списка статистик по КТ
+        answer = await api_user.get_analytics_data(date_from=date_from.isoformat(),
+                                                   date_to=date_to.isoformat(),
+                                                   dimension=['sku', 'day'],
+                                                   limit=limit,
+                                                   metrics=metrics,
+                                                   offset=offset)
+
+        # Проверка на Премиум
+        if answer.result.data and len(answer.result.data[0].metrics) < len(metrics):
+            logger.error("Статистика не доступна из-за отсутсвия Премиума")
+            break
+
+        yield answer
+
+        # Получение остальных страниц результата
+        if len(answer.result.data) < limit:
+            break
+
+        offset += limit
 
 
 async def add_statistics_card_products(db_conn: OzDbConnection, client_id: str, api_key: str,
@@ -182,9 +214,6 @@ async def add_statistics_card_products(db_conn: OzDbConnection, client_id: str,
             api_key (str): API KEY кабинета.
             date_yesterday (datetime): Дата, за которую собираются данные.
     """
-    offset = 0
-    limit = 1000
-
     list_statistics_card_products = []
 
     #  Метрики для КТ
@@ -201,71 +230,51 @@ async def add_statistics_card_products(db_conn: OzDbConnection, client_id: str,
     ]
 
     # Инициализация API-клиента Ozon
-    api_user = OzonApi(client_id=client_id, api_key=api_key)
+    async with OzonApi(client_id=client_id, api_key=api_key) as api_user:
+        # Получение sku товаров по ID кабинета продавца
+        list_sku = await db_conn.aio.get_oz_sku_vendor_code(client_id=client_id)
+        sku_resolver = await OzSkuResolver.create(db_conn=db_conn, api_user=api_user, client_id=client_id,
+                                                  known_skus=list_sku)
 
-    while True:
-        # Получение списка статистик по КТ
-        answer = await api_user.get_analytics_data(date_from=(date_yesterday - timedelta(days=30)).isoformat(),
-                                                   date_to=date_yesterday.isoformat(),
-                                                   dimension=['sku', 'day'],
-                                                   limit=limit,
-                                                   metrics=metrics,
-                                                   offset=offset)
+        async def parse(answer: AnalyticsDataResponse) -> None:
+            # Разрешение неизвестных SKU страницы одним пакетом
+            await sku_resolver.prepare(product.dimensions[0].id_field for product in answer.result.data)
 
-        # Получение sku товаров по ID кабинета продавца
-        list_sku = db_conn.get_oz_sku_vendor_code(client_id=client_id)
+            # Обработка полученных результатов
+            for product in answer.result.data:
+                sku = sku_resolver.resolve(product.dimensions[0].id_field)  # Артикул товара
+                field_date = datetime.strptime(product.dimensions[1].id_field, '%Y-%m-%d').date()
 
-        # Обработка полученных результатов
-        for product in answer.result.data:
-            sku = product.dimensions[0].id_field  # Артикул товара
-            field_date = datetime.strptime(product.dimensions[1].id_field, '%Y-%m-%d').date()
-
-            # Фильтруем только те товары что есть в БД
-            if sku not in list_sku:
-                answer_info = await api_user.get_product_info_discounted(discounted_skus=[sku])
-                for info in answer_info.items:
-                    if sku == str(info.discounted_sku):
-                        sku = str(info.sku)
-            if sku not in list_sku:
-                answer_info = await api_user.get_product_related_sku_get(skus=[sku])
-                for info in answer_info.items:
-                    if str(info.sku) in list_sku:
-                        sku = str(info.sku)
-                        break
-            if sku not in list_sku:
-                continue
-            metrics_round = [round(metric, 2) for metric in product.metrics]  # Список значений метрик
-
-            # Проверка на Премиум
-            if len(metrics_round) < len(metrics):
-                logger.error(f"{client_id} Статистика не доступна из-за отсутсвия Премиума")
-                limit = 0
-                break
-
-            # Проверка на полностью нулевую статистику
-            if not sum(metrics_round):
-                continue
-
-            data = dict(zip(metrics, metrics_round))
-            list_statistics_card_products.append(
-                DataOzStatisticCardProduct(sku=sku,
-                                           date=field_date,
-                                           add_to_cart_from_search_count=int(data.get('hits_tocart_search')),
-                                           add_to_cart_from_card_count=int(data.get('hits_tocart_pdp')),
-                                           view_search=int(data.get('session_view_search')),
-                                           view_card=int(data.get('session_view_pdp')),
-                                           orders_count=int(data.get('ordered_units')),
-                                           orders_sum=round(float(data.get('revenue')), 2),
-                                           delivered_count=int(data.get('delivered_units')),
-                                           returns_count=int(data.get('returns')),
-                                           cancel_count=int(data.get('cancellations'))
-                                           ))
+                # Фильтруем только те товары что есть в БД
+                if sku not in list_sku:
+                    continue
+                metrics_round = [round(metric, 2) for metric in product.metrics]  # Список значений метрик
 
-        # Получение остальных страниц результата
-        if len(answer.result.data) < limit:
-            break
+                # Проверка на полностью нулевую статистику
+                if not sum(metrics_round):
+                    continue
 
-        offset += limit
+                data = dict(zip(metrics, metrics_round))
+                list_statistics_card_products.append(
+                    DataOzStatisticCardProduct(sku=sku,
+                                               date=field_date,
+                                               add_to_cart_from_search_count=int(data.get('hits_tocart_search')),
+                                               add_to_cart_from_card_count=int(data.get('hits_tocart_pdp')),
+                                               view_search=int(data.get('session_view_search')),
+                                               view_card=int(data.get('session_view_pdp')),
+                                               orders_count=int(data.get('ordered_units')),
+                                               orders_sum=round(float(data.get('revenue')), 2),
+                                               delivered_count=int(data.get('delivered_units')),
+                                               returns_count=int(data.get('returns')),
+                                               cancel_count=int(data.get('cancellations'))
+                                               ))
+
+        # Строки одного SKU и дня агрегируются после получения всех страниц
+        await run_pipeline(pages=iter_analytics_pages(api_user=api_user,
+                                                      date_from=date_yesterday - timedelta(days=30),
+                                                      date_to=date_yesterday,
+                                                      metrics=metrics),
+                           parse=parse, name=f"Статистика КТ {client_id}")
 
     # Агрегирование данных
     aggregate = {}
@@ -319,7 +328,7 @@ async def add_statistics_card_products(db_conn: OzDbConnection, client_id: str,
         ))
 
     logger.info(f"Количество записей: {len(list_statistics_card_products)}")
-    db_conn.add_oz_statistics_card_products(list_card_product=list_statistics_card_products)
+    await db_conn.aio.add_oz_statistics_card_products(list_card_product=list_statistics_card_products)
 
 
 async def add_statistic_adverts(db_conn: OzDbConnection, client_id: str, performance_id: str, client_secret: str,
@@ -338,108 +347,116 @@ async def add_statistic_adverts(db_conn: OzDbConnection, client_id: str, perform
     adverts_ids = []
 
     # Инициализация API-клиента Ozon
-    api_user = OzonPerformanceAPI(client_id=performance_id, client_secret=client_secret)
+    async with OzonPerformanceAPI(client_id=performance_id, client_secret=client_secret) as api_user:
+        # Получения статистики РК за дату
+        answer = await api_user.get_client_statistics_daily_json(date_from=from_date.isoformat(),
+                                                                 date_to=from_date.isoformat())
 
-    # Получения статистики РК за дату
-    answer = await api_user.get_client_statistics_daily_json(date_from=from_date.isoformat(),
-                                                             date_to=from_date.isoformat())
+        stat_adverts = {row.id_field: row for row in answer.rows}
 
-    stat_adverts = {row.id_field: row for row in answer.rows}
+        company_ids = await db_conn.aio.get_oz_adverts_id(client_id=client_id)  # РК и типы РК магазина
+        list_sku = await db_conn.aio.get_oz_sku_vendor_code(client_id=client_id)  # sku товаров магазина
 
-    company_ids = db_conn.get_oz_adverts_id(client_id=client_id)  # РК и типы РК магазина
-    list_sku = db_conn.get_oz_sku_vendor_code(client_id=client_id)  # sku товаров магазина
-
-    # Обработка полученных результатов
-    for advert_id, stat in stat_adverts.items():
-        if company_ids[advert_id] == 'SEARCH_PROMO':
-            adverts_ids.append(advert_id)
-        else:
-            # Получение объектов РК
-            answer_sku = await api_user.get_client_campaign_objects(campaign_id=advert_id)
-
-            if not answer_sku:
-                continue
-
-            skus = answer_sku.list_field
-            if len(skus) > 1:
+        # Обработка полученных результатов
+        for advert_id, stat in stat_adverts.items():
+            if company_ids[advert_id] == 'SEARCH_PROMO':
                 adverts_ids.append(advert_id)
-            elif len(skus) == 1:
-                sku = skus[0].id_field  # Артикул WB товара
-                if sku not in list_sku:
-                    continue
+            else:
+                # Получение объектов РК
+                answer_sku = await api_user.get_client_campaign_objects(campaign_id=advert_id)
 
-                if '-' in stat.date:
-                    field_date = datetime.strptime(stat.date, '%Y-%m-%d').date()
-                else:
-                    field_date = datetime.strptime(stat.date, '%d.%m.%Y').date()
-                sum_cost = round(float(stat.moneySpent.replace(',', '.')), 2)  # Рассход РК
-
-                # Сумма зазаков
-                if stat.ordersMoney is None:
-                    sum_price = 0
-                else:
-                    sum_price = round(float(stat.ordersMoney.replace(',', '.')), 2)
-                list_statistics_advert.append(DataOzStatisticAdvert(client_id=client_id,
-                                                                    date=field_date,
-                                                                    advert_id=advert_id,
-                                                                    sku=sku,
-                                                                    views=int(stat.views or 0),
-                                                                    clicks=int(stat.clicks or 0),
-                                                                    sum_cost=sum_cost,
-                                                                    orders_count=int(stat.orders or 0),
-                                                                    sum_price=sum_price))
-
-    # Запрос статистики РК по 10 компаний за цикл
-    for ids in [adverts_ids[i:i + 10] for i in range(0, len(adverts_ids), 10)]:
-        answer_stat = await api_user.get_client_statistics_json(campaigns=ids,
-                                                                date_from=from_date.isoformat(),
-                                                                date_to=from_date.isoformat(),
-                                                                group_by='DATE')
-        uuid = answer_stat.UUID  # Получение UUID отчёта
-
-        # Проверка готовности отчёта
-        link = None
-        while link != 'OK':
-            await asyncio.sleep(30)
-            answer_uuid = await api_user.get_client_statistics_uuid(uuid=uuid)
-            link = answer_uuid.state
-            if link == 'ERROR':
-                logger.info(f"Ошибка создания отчёта по РК: {client_id}={ids}")
-                break
-        else:
-            # Запрос на получение отчёта
-            answer_report = await api_user.get_client_statistics_report(uuid=uuid)
+                if not answer_sku:
+                    continue
 
-            # Обработка полученных результатов
-            for advert in answer_report.result:
-                advert_id = advert.field_id  # ID РК
-                for row in advert.statistic.report.rows:
-                    sku = row.sku  # Артикул Ozon товара
+                skus = answer_sku.list_field
+                if len(skus) > 1:
+                    adverts_ids.append(advert_id)
+                elif len(skus) == 1:
+                    sku = skus[0].id_field  # Артикул WB товара
                     if sku not in list_sku:
                         continue
-                    # Дата статистики
-                    if '-' in row.date:
-                        field_date = datetime.strptime(row.date, '%Y-%m-%d').date()
+
+                    if '-' in stat.date:
+                        field_date = datetime.strptime(stat.date, '%Y-%m-%d').date()
                     else:
-                        field_date = datetime.strptime(row.date, '%d.%m.%Y').date()
-                    sum_cost = round(float(row.moneySpent.replace(',', '.')), 2)  # Рассход РК
+                        field_date = datetime.strptime(stat.date, '%d.%m.%Y').date()
+                    sum_cost = round(float(stat.moneySpent.replace(',', '.')), 2)  # Рассход РК
 
                     # Сумма зазаков
-                    if row.ordersMoney is None:
+                    if stat.ordersMoney is None:
                         sum_price = 0
                     else:
-                        sum_price = round(float(row.ordersMoney.replace(',', '.')), 2)
-
+                        sum_price = round(float(stat.ordersMoney.replace(',', '.')), 2)
                     list_statistics_advert.append(DataOzStatisticAdvert(client_id=client_id,
                                                                         date=field_date,
                                                                         advert_id=advert_id,
                                                                         sku=sku,
-                                                                        views=int(row.views or 0),
-                                                                        clicks=int(row.clicks or 0),
+                                                                        views=int(stat.views or 0),
+                                                                        clicks=int(stat.clicks or 0),
                                                                         sum_cost=sum_cost,
-                                                                        orders_count=int(row.orders or 0),
+                                                                        orders_count=int(stat.orders or 0),
                                                                         sum_price=sum_price))
 
+        def statistics_report(ids: list[str]) -> ReportJob:
+            async def create() -> str:
+                answer_stat = await api_user.get_client_statistics_json(campaigns=ids,
+                                                                        date_from=from_date.isoformat(),
+                                                                        date_to=from_date.isoformat(),
+                                                                        group_by='DATE')
+                return answer_stat.UUID  # Получение UUID отчёта
+
+            async def poll(uuid: str) -> str:
+                answer_uuid = await api_user.get_client_statistics_uuid(uuid=uuid)
+                if answer_uuid.state == 'OK':
+                    return REPORT_READY
+                if answer_uuid.state == 'ERROR':
+                    logger.info(f"Ошибка создания отчёта по РК: {client_id}={ids}")
+                    return REPORT_FAILED
+                return REPORT_PENDING
+
+            async def download(uuid: str) -> None:
+                # Запрос на получение отчёта
+                answer_report = await api_user.get_client_statistics_report(uuid=uuid)
+
+                # Обработка полученных результатов
+                for advert in answer_report.result:
+                    advert_id = advert.field_id  # ID РК
+                    for row in advert.statistic.report.rows:
+                        sku = row.sku  # Артикул Ozon товара
+                        if sku not in list_sku:
+                            continue
+                        # Дата статистики
+                        if '-' in row.date:
+                            field_date = datetime.strptime(row.date, '%Y-%m-%d').date()
+                        else:
+                            field_date = datetime.strptime(row.date, '%d.%m.%Y').date()
+                        sum_cost = round(float(row.moneySpent.replace(',', '.')), 2)  # Рассход РК
+
+                        # Сумма зазаков
+                        if row.ordersMoney is None:
+                            sum_price = 0
+                        else:
+                            sum_price = round(float(row.ordersMoney.replace(',', '.')), 2)
+
+                        list_statistics_advert.append(DataOzStatisticAdvert(client_id=client_id,
+                                                                            date=field_date,
+                                                                            advert_id=advert_id,
+                                                                            sku=sku,
+                                                                            views=int(row.views or 0),
+                                                                            clicks=int(row.clicks or 0),
+                                                                            sum_cost=sum_cost,
+                                                                            orders_count=int(row.orders or 0),
+                                                                            sum_price=sum_price))
+
+            return ReportJob(name=f"{client_id} РК {', '.join(map(str, ids))}", create=create, poll=poll,
+                             download=download)
+
+        # Запрос статистики РК частями по ограничению отчёта
+        jobs = [statistics_report(ids) for ids in api_user.split_statistics_campaigns(adverts_ids)]
+        results = await run_reports(jobs, concurrency=STATISTICS_REPORT_CONCURRENCY)
+        # Без любой из частей статистика кабинета неполная: этап не отмечается выполненным
+        raise_on_failure(results, allow_partial=False)
+
     # Агрегирование данных
     aggregate = {}
     for stat in list_statistics_advert:
@@ -473,7 +490,7 @@ async def add_statistic_adverts(db_conn: OzDbConnection, client_id: str, perform
                                                             sum_price=sum_price))
 
     logger.info(f"Количество записей: {len(list_statistics_advert)}")
-    db_conn.add_oz_statistics_adverts(list_statistics_advert=list_statistics_advert)
+    await db_conn.aio.add_oz_statistics_adverts(list_statistics_advert=list_statistics_advert)
 
 readiness_check = {}
 check_func = {'cards': False, 'adverts': False, 'stat_cards': False, 'stat_adverts': False}
@@ -484,7 +501,7 @@ async def statistic(db_conn: OzDbConnection, client: Type[Client], date_yesterda
         print(f"{client.name_company}: {readiness_check[client.name_company]}")
 
         # Получение данных рекламного кабинета магазина
-        performance = db_conn.get_oz_performance(client_id=client.client_id)
+        performance = await db_conn.aio.get_oz_performance(client_id=client.client_id)
 
         if not readiness_check[client.name_company]['cards']:
             await add_card_products(db_conn=db_conn, client_id=client.client_id, api_key=client.api_key)
@@ -524,7 +541,7 @@ async def statistic(db_conn: OzDbConnection, client: Type[Client], date_yesterda
         readiness_check.pop(client.name_company)
 
 
-async def main_oz_advert(retries: int = 6) -> None:
+async def main_oz_advert(retries: int = 6, raise_errors: bool = False) -> None:
     try:
         db_conn = OzDbConnection()
         db_conn.start_db()
@@ -538,22 +555,25 @@ async def main_oz_advert(retries: int = 6) -> None:
 
         date_yesterday = (datetime.now() - timedelta(days=1)).date()
 
-        tasks = []
-
-        for client in clients:
-            if client.name_company not in readiness_check.keys():
-                continue
-            tasks.append(statistic(db_conn=db_conn, client=client, date_yesterday=date_yesterday))
+        async def job(db_conn: OzDbConnection, client: Client) -> None:
+            await statistic(db_conn=db_conn, client=client, date_yesterday=date_yesterday)
 
-        await asyncio.gather(*tasks)
+        results = await run_cabinets(db_conn=db_conn,
+                                     cabinets=[client for client in clients if client.name_company in readiness_check],
+                                     job=job)
+        raise_on_failure(results)
 
     except OperationalError:
         logger.error(f'Не доступна база данных. Осталось попыток подключения: {retries - 1}')
         if retries > 0:
             await asyncio.sleep(10)
-            await main_oz_advert(retries=retries - 1)
+            await main_oz_advert(retries=retries - 1, raise_errors=raise_errors)
+        elif raise_errors:
+            raise
     except Exception as e:
         logger.error(f'{e}')
+        if raise_errors:
+            raise
 
 
 if __name__ == "__main__":
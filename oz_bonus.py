@@ -7,10 +7,11 @@ from datetime import timedelta, date
 
 from sqlalchemy.exc import OperationalError
 
-from database import OzDbConnection
+from runners import run_cabinets, raise_on_failure
+from database import OzDbConnection, Client
 from ozon_sdk.ozon_api import OzonApi
+from services import OzSkuResolver
 from data_classes import DataOzBonus
-from ozon_sdk.errors import ClientError
 
 nest_asyncio.apply()
 
@@ -35,42 +36,35 @@ async def add_oz_bonus(db_conn: OzDbConnection, client_id: str, api_key: str) ->
     logger.info(f"За {month} месяц {year}")
 
     list_bonus = []
-    dict_sku = db_conn.get_oz_sku_vendor_code(client_id=client_id)
+    dict_sku = await db_conn.aio.get_oz_sku_vendor_code(client_id=client_id)
 
     # Инициализация API-клиента Ozon
-    api_user = OzonApi(client_id=client_id, api_key=api_key)
-    # Получение списка отчёта о реализации
-    answer = await api_user.get_finance_realization(month=month, year=year)
-
-    # Обработка полученных результатов
-    for row in answer.result.rows:
-        vendor_code = row.item.offer_id
-
-        sku = str(row.item.sku)
-        if sku not in dict_sku:
-            answer_info = await api_user.get_product_info_discounted(discounted_skus=[sku])
-            for info in answer_info.items:
-                if sku == str(info.discounted_sku):
-                    sku = str(info.sku)
-                    break
-        if sku not in dict_sku:
-            answer_info = await api_user.get_product_related_sku_get(skus=[sku])
-            for info in answer_info.items:
-                if str(info.sku) in dict_sku:
-                    sku = str(info.sku)
-                    break
-
-        bonus = 0
-        if row.delivery_commission:
-            bonus += row.delivery_commission.bonus
-        if row.return_commission:
-            bonus -= row.return_commission.bonus
+    async with OzonApi(client_id=client_id, api_key=api_key) as api_user:
+        # Получение списка отчёта о реализации
+        answer = await api_user.get_finance_realization(month=month, year=year)
 
-        list_bonus.append(DataOzBonus(date=from_date,
-                                      client_id=client_id,
-                                      sku=sku,
-                                      vendor_code=vendor_code,
-                                      bonus=bonus))
+        # Разрешение неизвестных SKU отчёта одним пакетом
+        sku_resolver = await OzSkuResolver.create(db_conn=db_conn, api_user=api_user, client_id=client_id,
+                                                  known_skus=dict_sku)
+        await sku_resolver.prepare(str(row.item.sku) for row in answer.result.rows)
+
+        # Обработка полученных результатов
+        for row in answer.result.rows:
+            vendor_code = row.item.offer_id
+
+            sku = sku_resolver.resolve(str(row.item.sku))
+
+            bonus = 0
+            if row.delivery_commission:
+                bonus += row.delivery_commission.bonus
+            if row.return_commission:
+                bonus -= row.return_commission.bonus
+
+            list_bonus.append(DataOzBonus(date=from_date,
+                                          client_id=client_id,
+                                          sku=sku,
+                                          vendor_code=vendor_code,
+                                          bonus=bonus))
 
     # Агрегирование данных
     aggregate = {}
@@ -95,10 +89,10 @@ async def add_oz_bonus(db_conn: OzDbConnection, client_id: str, api_key: str) ->
                                       bonus=bonus))
 
     logger.info(f'Количество записей: {len(list_bonus)}')
-    db_conn.add_oz_bonus_entry(list_bonus=list_bonus)
+    await db_conn.aio.add_oz_bonus_entry(list_bonus=list_bonus)
 
 
-async def main_oz_services(retries: int = 6) -> None:
+async def main_oz_services(retries: int = 6, raise_errors: bool = False) -> None:
     try:
         db_conn = OzDbConnection()
 
@@ -106,22 +100,25 @@ async def main_oz_services(retries: int = 6) -> None:
 
         clients = db_conn.get_clients(marketplace="Ozon")
 
-        for client in clients:
-            try:
-                logger.info(f"Добавление в базу данных компании '{client.name_company}'")
-                await add_oz_bonus(db_conn=db_conn,
-                                   client_id=client.client_id,
-                                   api_key=client.api_key)
-            except ClientError as e:
-                logger.error(f'{e}')
-                continue
+        async def job(db_conn: OzDbConnection, client: Client) -> None:
+            logger.info(f"Добавление в базу данных компании '{client.name_company}'")
+            await add_oz_bonus(db_conn=db_conn,
+                               client_id=client.client_id,
+                               api_key=client.api_key)
+
+        results = await run_cabinets(db_conn=db_conn, cabinets=clients, job=job)
+        raise_on_failure(results)
     except OperationalError:
         logger.error(f'Не доступна база данных. Осталось попыток подключения: {retries - 1}')
         if retries > 0:
             await asyncio.sleep(10)
-            await main_oz_services(retries=retries - 1)
+            await main_oz_services(retries=retries - 1, raise_errors=raise_errors)
+        elif raise_errors:
+            raise
     except Exception as e:
         logger.error(f'{e}')
+        if raise_errors:
+            raise
 
 
 if __name__ == "__main__":
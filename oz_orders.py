@@ -7,10 +7,12 @@ from datetime import datetime, timedelta, timezone
 
 from sqlalchemy.exc import OperationalError
 
-from database import OzDbConnection
+from base_sdk import batches
+from runners import run_cabinets, raise_on_failure
+from database import OzDbConnection, Client
 from ozon_sdk.ozon_api import OzonApi
+from services import OzSkuResolver
 from data_classes import DataOzOrder
-from ozon_sdk.errors import ClientError
 
 nest_asyncio.apply()
 
@@ -34,97 +36,42 @@ async def add_oz_orders_entry(db_conn: OzDbConnection, client_id: str, api_key:
     logger.info(f"За период с <{from_date}> до <{to_date}>")
 
     limit = 1000
-    offset = 0
     list_orders = []
-    list_sku = list(db_conn.get_oz_sku_vendor_code(client_id=client_id).keys())
+    list_sku = list((await db_conn.aio.get_oz_sku_vendor_code(client_id=client_id)).keys())
 
     # Инициализация API-клиента Ozon
-    api_user = OzonApi(client_id=client_id, api_key=api_key)
-    while True:
-        # Получение списка финансовых транзакций
-        answer = await api_user.get_posting_fbo_list(since=from_date.isoformat(),
-                                                     to=to_date.isoformat(),
-                                                     limit=limit,
-                                                     offset=offset)
-
-        # Обработка полученных результатов
-        for order in answer.result:
-            order_date = (order.in_process_at + timedelta(hours=3)).date()
-            for product in order.products:
-                sku = str(product.sku)
-                if sku not in list_sku:
-                    answer_info = await api_user.get_product_info_discounted(discounted_skus=[sku])
-                    for info in answer_info.items:
-                        if sku == str(info.discounted_sku):
-                            sku = str(info.sku)
-
-                if sku not in list_sku:
-                    answer_info = await api_user.get_product_related_sku_get(skus=[sku])
-                    for info in answer_info.items:
-                        if str(info.sku) in list_sku:
-                            sku = str(info.sku)
-
-                list_orders.append(DataOzOrder(client_id=client_id,
-                                               order_date=order_date,
-                                               sku=sku,
-                                               vendor_code=product.offer_id,
-                                               posting_number=order.posting_number,
-                                               delivery_schema='FBO',
-                                               quantities=product.quantity,
-                                               price=round(float(product.price), 2)))
-
-        if len(answer.result) >= limit:
-            offset += limit
-            continue
-
-        break
-
-    offset = 0
-
-    while True:
-        # Получение списка финансовых транзакций
-        answer = await api_user.get_posting_fbs_list(since=from_date.isoformat(),
-                                                     to=to_date.isoformat(),
-                                                     limit=limit,
-                                                     offset=offset)
-
-        # Обработка полученных результатов
-        for order in answer.result.postings:
-            order_date = (order.in_process_at + timedelta(hours=3)).date()
-            for product in order.products:
-                sku = str(product.sku)
-                if sku not in list_sku:
-                    answer_info = await api_user.get_product_info_discounted(discounted_skus=[sku])
-                    for info in answer_info.items:
-                        if sku == str(info.discounted_sku):
-                            sku = str(info.sku)
-
-                if sku not in list_sku:
-                    answer_info = await api_user.get_product_related_sku_get(skus=[sku])
-                    for info in answer_info.items:
-                        if str(info.sku) in list_sku:
-                            sku = str(info.sku)
-
-                list_orders.append(DataOzOrder(client_id=client_id,
-                                               order_date=order_date,
-                                               sku=sku,
-                                               vendor_code=product.offer_id,
-                                               posting_number=order.posting_number,
-                                               delivery_schema='FBS',
-                                               quantities=product.quantity,
-                                               price=round(float(product.price), 2)))
-
-        if answer.result.has_next:
-            offset += limit
-            continue
-
-        break
+    async with OzonApi(client_id=client_id, api_key=api_key) as api_user:
+        sku_resolver = await OzSkuResolver.create(db_conn=db_conn, api_user=api_user, client_id=client_id,
+                                                  known_skus=list_sku)
+        postings = {'FBO': api_user.iter_posting_fbo_list(since=from_date.isoformat(), to=to_date.isoformat(),
+                                                          limit=limit),
+                    'FBS': api_user.iter_posting_fbs_list(since=from_date.isoformat(), to=to_date.isoformat(),
+                                                          limit=limit)}
+        for delivery_schema, orders in postings.items():
+            async for batch in batches(orders, size=limit):
+                # Разрешение неизвестных SKU пачки одним запросом
+                await sku_resolver.prepare(str(product.sku) for order in batch for product in order.products)
+
+                # Обработка полученных результатов
+                for order in batch:
+                    order_date = (order.in_process_at + timedelta(hours=3)).date()
+                    for product in order.products:
+                        sku = sku_resolver.resolve(str(product.sku))
+
+                        list_orders.append(DataOzOrder(client_id=client_id,
+                                                       order_date=order_date,
+                                                       sku=sku,
+                                                       vendor_code=product.offer_id,
+                                                       posting_number=order.posting_number,
+                                                       delivery_schema=delivery_schema,
+                                                       quantities=product.quantity,
+                                                       price=round(float(product.price), 2)))
 
     logger.info(f"Количество записей операций: {len(list_orders)}")
-    db_conn.add_oz_orders(list_orders=list_orders)
+    await db_conn.aio.add_oz_orders(list_orders=list_orders)
 
 
-async def main_func_oz(retries: int = 6) -> None:
+async def main_func_oz(retries: int = 6, raise_errors: bool = False) -> None:
     try:
         db_conn = OzDbConnection()
         db_conn.start_db()
@@ -133,23 +80,26 @@ async def main_func_oz(retries: int = 6) -> None:
 
         date_now = datetime.now(tz=timezone(timedelta(hours=3))).replace(hour=0, minute=0, second=0, microsecond=0)
 
-        for client in clients:
-            try:
-                logger.info(f"Добавление в базу данных компании '{client.name_company}'")
-                await add_oz_orders_entry(db_conn=db_conn,
-                                          client_id=client.client_id,
-                                          api_key=client.api_key,
-                                          date_now=date_now)
-            except ClientError as e:
-                logger.error(f'{e}')
-                continue
+        async def job(db_conn: OzDbConnection, client: Client) -> None:
+            logger.info(f"Добавление в базу данных компании '{client.name_company}'")
+            await add_oz_orders_entry(db_conn=db_conn,
+                                      client_id=client.client_id,
+                                      api_key=client.api_key,
+                                      date_now=date_now)
+
+        results = await run_cabinets(db_conn=db_conn, cabinets=clients, job=job)
+        raise_on_failure(results)
     except OperationalError:
         logger.error(f'Не доступна база данных. Осталось попыток подключения: {retries - 1}')
         if retries > 0:
             await asyncio.sleep(10)
-            await main_func_oz(retries=retries - 1)
+            await main_func_oz(retries=retries - 1, raise_errors=raise_errors)
+        elif raise_errors:
+            raise
     except Exception as e:
         logger.error(f'{e}')
+        if raise_errors:
+            raise
 
 
 if __name__ == "__main__":
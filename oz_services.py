@@ -7,147 +7,159 @@ from datetime import datetime, timedelta, timezone
 
 from sqlalchemy.exc import OperationalError
 
-from database import OzDbConnection
+from base_sdk import iter_numbered_pages
+from runners import run_cabinets, raise_on_failure
+from database import OzDbConnection, Client
 from ozon_sdk.ozon_api import OzonApi
+from ozon_sdk.projections import FinanceTransactionServicesView
+from services import OzPostingFetcher, OzSkuResolver, POSTING_CACHE_DIR
 from data_classes import DataOzService
-from ozon_sdk.errors import ClientError
 
 nest_asyncio.apply()
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)-8s %(message)s')
 logger = logging.getLogger(__name__)
 
+POSTING_OPERATION_TYPES = ['OperationAgentDeliveredToCustomer', 'OperationItemReturn', 'OperationReturnGoodsFBSofRMS']
+
+SYNC_ENDPOINT = 'oz_finance_services'
+# Операции загружаются целыми днями: последний загруженный день перечитывается,
+# чтобы подхватить операции, проведённые задним числом.
+SYNC_OVERLAP = timedelta(days=1)
+# Ограничение периода запроса финансовых операций Ozon.
+MAX_PERIOD = timedelta(days=30)
+
 
 async def add_oz_services(db_conn: OzDbConnection, client_id: str, api_key: str, date_now: datetime) -> None:
     """
         Добавление записей в таблицу `oz_services` за указанную дату.
 
+        Загружаются дни с последней успешной синхронизации кабинета (с запасом `SYNC_OVERLAP`);
+        при первом запуске — за два дня.
+
         Args:
             db_conn (OzDbConnection): Объект соединения с базой данных.
             client_id (str): ID кабинета.
             api_key (str): API KEY кабинета.
             date_now (datetime): Начальная дата периода.
     """
-    start = date_now - timedelta(days=2)
+    # Отметка синхронизации хранится в UTC без часового пояса
+    start = await db_conn.aio.get_sync_start(client_id=client_id, endpoint=SYNC_ENDPOINT,
+                                             default=(date_now - timedelta(days=2)).replace(tzinfo=None),
+                                             overlap=SYNC_OVERLAP)
+    start = start.replace(tzinfo=timezone.utc)
+    start = max(start, date_now - MAX_PERIOD)
     end = date_now - timedelta(microseconds=1)
     logger.info(f"За период с <{start}> до <{end}>")
 
-    page = 1
     list_services = []
-    dict_sku = db_conn.get_oz_sku_vendor_code(client_id=client_id)
+    dict_sku = await db_conn.aio.get_oz_sku_vendor_code(client_id=client_id)
 
     # Инициализация API-клиента Ozon
-    api_user = OzonApi(client_id=client_id, api_key=api_key)
-    while True:
-        # Получение списка финансовых транзакций
-        answer = await api_user.get_finance_transaction_list(from_field=start.isoformat(),
-                                                             to=end.isoformat(),
-                                                             page=page)
-
-        # Обработка полученных результатов
-        for operation in answer.result.operations:
-            percentage_of_sales = {}
-            vendor = {}
-
-            delivery_schema = operation.posting.delivery_schema
-            accruals_for_sale = operation.accruals_for_sale
-
-            accrual_date = operation.operation_date.date()
-            operation_type = operation.operation_type
-            operation_type_name = operation.operation_type_name
-            posting_number = operation.posting.posting_number
-
-            skus = [str(item.sku) for item in operation.items]
-
-            if operation_type in ['OperationAgentDeliveredToCustomer',
-                                  'OperationItemReturn',
-                                  'OperationReturnGoodsFBSofRMS'] and len(skus) > 1:
-                if delivery_schema == 'FBO':
-                    answer_fb = await api_user.get_posting_fbo(posting_number=posting_number,
-                                                               analytics_data=True,
-                                                               financial_data=True,
-                                                               translit=True)
-                elif delivery_schema in ['FBS', 'RFBS']:
-                    answer_fb = await api_user.get_posting_fbs(posting_number=posting_number,
-                                                               analytics_data=True,
-                                                               financial_data=True,
-                                                               translit=True)
-                else:
-                    continue
-
-                products = answer_fb.result.products
-                if not accruals_for_sale:
-                    accruals_for_sale = sum([float(product.price) * product.quantity for product in products])
-                for product in products:
-                    sale = float(product.price)
-                    percentage = sale / accruals_for_sale
-                    percentage_of_sales[str(product.sku)] = percentage
-                    vendor[str(product.sku)] = product.offer_id
-
-            for service in operation.services:
-                service_name = service.name
-                total_cost = round(service.price, 2)
-
-                if len(skus) > 1:
-                    for sku in skus:
-                        if percentage_of_sales.get(sku):
-                            cost = round(total_cost * percentage_of_sales.get(sku), 2)
+    async with OzonApi(client_id=client_id, api_key=api_key) as api_user:
+        posting_fetcher = OzPostingFetcher(api_user=api_user, client_id=client_id, cache_dir=POSTING_CACHE_DIR)
+        sku_resolver = await OzSkuResolver.create(db_conn=db_conn, api_user=api_user, client_id=client_id,
+                                                  known_skus=dict_sku, related=False)
+        # Получение списка финансовых транзакций: страницы после первой запрашиваются одновременно
+        pages = iter_numbered_pages(
+            fetch=lambda page: api_user.get_finance_transaction_list(from_field=start.isoformat(),
+                                                                     to=end.isoformat(),
+                                                                     page=page,
+                                                                     projection=FinanceTransactionServicesView),
+            page_count=lambda answer: answer.result.page_count)
+        async for answer in pages:
+
+            # Загрузка отправлений и разрешение неизвестных SKU страницы одним пакетом
+            await posting_fetcher.prefetch((operation.posting.posting_number, operation.posting.delivery_schema)
+                                           for operation in answer.result.operations
+                                           if operation.operation_type in POSTING_OPERATION_TYPES
+                                           and len(operation.items) > 1)
+            await sku_resolver.prepare(str(item.sku) for operation in answer.result.operations
+                                       if operation.services
+                                       for item in operation.items)
+
+            # Обработка полученных результатов
+            for operation in answer.result.operations:
+                percentage_of_sales = {}
+                vendor = {}
+
+                delivery_schema = operation.posting.delivery_schema
+                accruals_for_sale = operation.accruals_for_sale
+
+                accrual_date = operation.operation_date.date()
+                operation_type = operation.operation_type
+                operation_type_name = operation.operation_type_name
+                posting_number = operation.posting.posting_number
+
+                skus = [str(item.sku) for item in operation.items]
+
+                if operation_type in POSTING_OPERATION_TYPES and len(skus) > 1:
+                    answer_fb = await posting_fetcher.get(posting_number=posting_number,
+                                                          delivery_schema=delivery_schema)
+                    if answer_fb is None:
+                        continue
+
+                    products = answer_fb.result.products
+                    if not accruals_for_sale:
+                        accruals_for_sale = sum([float(product.price) * product.quantity for product in products])
+                    for product in products:
+                        sale = float(product.price)
+                        percentage = sale / accruals_for_sale
+                        percentage_of_sales[str(product.sku)] = percentage
+                        vendor[str(product.sku)] = product.offer_id
+
+                for service in operation.services:
+                    service_name = service.name
+                    total_cost = round(service.price, 2)
+
+                    if len(skus) > 1:
+                        for sku in skus:
+                            if percentage_of_sales.get(sku):
+                                cost = round(total_cost * percentage_of_sales.get(sku), 2)
+                            else:
+                                cost = round(total_cost / len(skus), 2)
+                            sku = sku_resolver.resolve(sku)
+                            list_services.append(DataOzService(client_id=client_id,
+                                                               date=accrual_date,
+                                                               operation_type=operation_type,
+                                                               operation_type_name=operation_type_name or None,
+                                                               vendor_code=vendor.get(sku) or dict_sku.get(sku),
+                                                               sku=sku,
+                                                               posting_number=posting_number or None,
+                                                               service=service_name,
+                                                               cost=cost))
+                    else:
+                        if skus:
+                            sku = skus[0]
+                            sku = sku_resolver.resolve(sku)
+                            vendor_code = vendor.get(sku) or dict_sku.get(sku)
                         else:
-                            cost = round(total_cost / len(skus), 2)
-                        if sku not in dict_sku:
-                            answer_info = await api_user.get_product_info_discounted(discounted_skus=[sku])
-                            for info in answer_info.items:
-                                if sku == str(info.discounted_sku):
-                                    sku = str(info.sku)
+                            vendor_code = None
+                            sku = None
                         list_services.append(DataOzService(client_id=client_id,
                                                            date=accrual_date,
                                                            operation_type=operation_type,
                                                            operation_type_name=operation_type_name or None,
-                                                           vendor_code=vendor.get(sku) or dict_sku.get(sku),
+                                                           vendor_code=vendor_code,
                                                            sku=sku,
                                                            posting_number=posting_number or None,
-                                                           service=service_name,
-                                                           cost=cost))
-                else:
-                    if skus:
-                        sku = skus[0]
-                        if sku not in dict_sku:
-                            answer_info = await api_user.get_product_info_discounted(discounted_skus=[sku])
-                            for info in answer_info.items:
-                                if sku == str(info.discounted_sku):
-                                    sku = str(info.sku)
-                        vendor_code = vendor.get(sku) or dict_sku.get(sku)
-                    else:
-                        vendor_code = None
-                        sku = None
+                                                           service=service_name or None,
+                                                           cost=total_cost))
+
+                if not len(operation.services) and operation_type not in ['ClientReturnAgentOperation',
+                                                                          'OperationAgentDeliveredToCustomer']:
+                    cost = round(operation.amount, 2)
                     list_services.append(DataOzService(client_id=client_id,
                                                        date=accrual_date,
                                                        operation_type=operation_type,
                                                        operation_type_name=operation_type_name or None,
-                                                       vendor_code=vendor_code,
-                                                       sku=sku,
+                                                       vendor_code=None,
+                                                       sku=', '.join(skus) or None,
                                                        posting_number=posting_number or None,
-                                                       service=service_name or None,
-                                                       cost=total_cost))
-
-            if not len(operation.services) and operation_type not in ['ClientReturnAgentOperation',
-                                                                      'OperationAgentDeliveredToCustomer']:
-                cost = round(operation.amount, 2)
-                list_services.append(DataOzService(client_id=client_id,
-                                                   date=accrual_date,
-                                                   operation_type=operation_type,
-                                                   operation_type_name=operation_type_name or None,
-                                                   vendor_code=None,
-                                                   sku=', '.join(skus) or None,
-                                                   posting_number=posting_number or None,
-                                                   service=None,
-                                                   cost=cost))
-
-        # Получение дополнительных страниц результатов
-        if page >= answer.result.page_count:
-            break
-
-        page += 1
+                                                       service=None,
+                                                       cost=cost))
+
+        posting_fetcher.log_stats()
 
     # Агрегирование данных
     aggregate = {}
@@ -180,10 +192,12 @@ async def add_oz_services(db_conn: OzDbConnection, client_id: str, api_key: str,
                                            cost=cost))
 
     logger.info(f'Количество записей: {len(list_services)}')
-    db_conn.add_oz_services_entry(client_id=client_id, list_services=list_services)
+    await db_conn.aio.add_oz_services_entry(client_id=client_id, list_services=list_services)
+    await db_conn.aio.set_sync_state(client_id=client_id, endpoint=SYNC_ENDPOINT,
+                                     watermark=date_now.replace(tzinfo=None))
 
 
-async def main_oz_services(retries: int = 6) -> None:
+async def main_oz_services(retries: int = 6, raise_errors: bool = False) -> None:
     try:
         db_conn = OzDbConnection()
 
@@ -193,23 +207,26 @@ async def main_oz_services(retries: int = 6) -> None:
 
         date_now = datetime.now(tz=timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
 
-        for client in clients:
-            try:
-                logger.info(f"Добавление в базу данных компании '{client.name_company}'")
-                await add_oz_services(db_conn=db_conn,
-                                      client_id=client.client_id,
-                                      api_key=client.api_key,
-                                      date_now=date_now)
-            except ClientError as e:
-                logger.error(f'{e}')
-                continue
+        async def job(db_conn: OzDbConnection, client: Client) -> None:
+            logger.info(f"Добавление в базу данных компании '{client.name_company}'")
+            await add_oz_services(db_conn=db_conn,
+                                  client_id=client.client_id,
+                                  api_key=client.api_key,
+                                  date_now=date_now)
+
+        results = await run_cabinets(db_conn=db_conn, cabinets=clients, job=job)
+        raise_on_failure(results)
     except OperationalError:
         logger.error(f'Не доступна база данных. Осталось попыток подключения: {retries - 1}')
         if retries > 0:
             await asyncio.sleep(10)
-            await main_oz_services(retries=retries - 1)
+            await main_oz_services(retries=retries - 1, raise_errors=raise_errors)
+        elif raise_errors:
+            raise
     except Exception as e:
         logger.error(f'{e}')
+        if raise_errors:
+            raise
 
 if __name__ == "__main__":
     loop = asyncio.get_event_loop()
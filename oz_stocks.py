@@ -4,11 +4,13 @@ import logging
 import nest_asyncio
 
 from datetime import datetime
+from dataclasses import replace
 
 from sqlalchemy.exc import OperationalError
 
 from ozon_sdk.ozon_api import OzonApi
-from database import OzDbConnection
+from runners import run_cabinets, raise_on_failure
+from database import OzDbConnection, Client
 from data_classes import DataOzStock
 
 nest_asyncio.apply()
@@ -30,18 +32,11 @@ async def get_stocks(db_conn: OzDbConnection, client_id: str, api_key: str) -> N
     product_ids = {}
 
     # Инициализация API-клиента Ozon
-    api_user = OzonApi(client_id=client_id, api_key=api_key)
+    async with OzonApi(client_id=client_id, api_key=api_key) as api_user:
+        visibility_params = ['ALL', 'ARCHIVED']
 
-    visibility_params = ['ALL', 'ARCHIVED']
-
-    for visibility in visibility_params:
-        last_id = None
-        total = 1000
-
-        while total >= 1000:
-            answer = await api_user.get_product_info_stocks(limit=1000, last_id=last_id, visibility=visibility)
-
-            for item in answer.result.items:
+        for visibility in visibility_params:
+            async for item in api_user.iter_product_info_stocks(visibility=visibility, limit=1000):
                 for stock in item.stocks:
                     if stock.type in ['fbo']:
                         if stock.reserved or stock.present:
@@ -60,27 +55,25 @@ async def get_stocks(db_conn: OzDbConnection, client_id: str, api_key: str) -> N
                                                            size=size,
                                                            quantity=stock.present,
                                                            reserved=stock.reserved))
-            total = answer.result.total
-            last_id = answer.result.last_id
 
-    list_product_ids = list(product_ids.keys())
-    for ids in [list_product_ids[i:i + 1000] for i in range(0, len(list_product_ids), 1000)]:
-        answer_products = await api_user.get_product_info_list(product_id=ids)
-        for item in answer_products.result.items:
-            product_ids[str(item.id_field)] = item
+        if product_ids:
+            answer_products = await api_user.get_product_info_list(product_id=list(product_ids.keys()))
+            for item in answer_products.result.items:
+                product_ids[str(item.id_field)] = item
 
-    for row in list_stocks:
+    for i, row in enumerate(list_stocks):
         item = product_ids.get(row.sku)
         if item:
-            row.sku = item.sku
-            row.quantity += item.discounted_stocks.present
-            row.reserved += item.discounted_stocks.reserved
+            list_stocks[i] = replace(row,
+                                     sku=item.sku,
+                                     quantity=row.quantity + item.discounted_stocks.present,
+                                     reserved=row.reserved + item.discounted_stocks.reserved)
 
     logger.info(f"Количсетво строк: {len(list_stocks)}")
-    db_conn.add_oz_stock_entry(list_stocks=list_stocks)
+    await db_conn.aio.add_oz_stock_entry(list_stocks=list_stocks)
 
 
-async def main_oz_stock(retries: int = 6) -> None:
+async def main_oz_stock(retries: int = 6, raise_errors: bool = False) -> None:
     try:
         db_conn = OzDbConnection()
 
@@ -88,18 +81,25 @@ async def main_oz_stock(retries: int = 6) -> None:
 
         clients = db_conn.get_clients(marketplace="Ozon")
 
-        for client in clients:
+        async def job(db_conn: OzDbConnection, client: Client) -> None:
             logger.info(f'Сбор информации о остатках на складах {client.name_company}')
             await get_stocks(db_conn=db_conn,
                              client_id=client.client_id,
                              api_key=client.api_key)
+
+        results = await run_cabinets(db_conn=db_conn, cabinets=clients, job=job)
+        raise_on_failure(results)
     except OperationalError:
         logger.error(f'Не доступна база данных. Осталось попыток подключения: {retries - 1}')
         if retries > 0:
             await asyncio.sleep(10)
-            await main_oz_stock(retries=retries - 1)
+            await main_oz_stock(retries=retries - 1, raise_errors=raise_errors)
+        elif raise_errors:
+            raise
     except Exception as e:
         logger.error(f'{e}')
+        if raise_errors:
+            raise
 
 if __name__ == "__main__":
     loop = asyncio.get_event_loop()
@@ -1 +1,2 @@
+from .ozon_token_manager import *
 from .ozon_async_engine import *
@@ -1,117 +1,95 @@
-import asyncio
+import json
 import aiohttp
 import logging
 
+from base_sdk import AsyncTransport, ConnectorConfig, RetryPolicy, RetryRequest
 from ozon_sdk.errors import ClientError
+from .ozon_token_manager import OzonTokenManager, token_manager
 
 logger = logging.getLogger(__name__)
 
 
-class OzonAsyncEngine:
+class OzonAsyncEngine(AsyncTransport):
+    marketplace = 'ozon'
 
-    def __init__(self, client_id: str = '', api_key: str = ''):
-        self._base_url = 'https://api-seller.ozon.ru'
+    def __init__(self, client_id: str = '', api_key: str = '', connector_config: ConnectorConfig = None,
+                 retry_policy: RetryPolicy = None):
+        super().__init__(base_url='https://api-seller.ozon.ru',
+                         connector_config=connector_config or ConnectorConfig(ssl=False),
+                         retry_policy=retry_policy,
+                         limit_key=client_id)
         self.__headers = {
             'Client-Id': client_id,
             'Api-Key': api_key
         }
 
-    async def get(self, url: str, params: dict) -> dict:
-        url = await self._get_url(url)
-        response = await self._perform_get_request(url, params)
+    async def get(self, url: str, params: dict, raw: bool = False) -> dict:
+        response = await self.request('GET', url, params=params, raw=raw)
         return response
 
-    async def post(self, url: str, params: dict) -> dict:
-        url = await self._get_url(url)
-        response = await self._perform_post_request(url, params)
+    async def post(self, url: str, params: dict, raw: bool = False) -> dict:
+        response = await self.request('POST', url, json=params, raw=raw)
         return response
 
-    async def _get_url(self, url: str):
-        if url.startswith("/"):
-            return self._base_url + url
-        else:
-            return f"{self._base_url}/{url}"
-
-    async def _perform_get_request(self, url, params, retry: int = 6):
-        async with await self._get_session() as session:
-            while retry != 0:
-                try:
-                    new_params = {k: v for k, v in params.items() if v is not None}
-                    async with session.get(url, params=new_params, verify_ssl=False) as response:
-                        if response.status in [404, 403]:
-                            raise ClientError
-                        if response.status != 200:
-                            logger.info(f"Получен ответ от {url} ({response.status})")
-                            logger.error(f"Попытка повторного запроса. Осталось попыток: {retry - 1}")
-                            await asyncio.sleep(60)
-                            retry -= 1
-                            continue
-                        return await response.json(content_type=None)
-                except (aiohttp.ClientConnectionError, aiohttp.ClientError, asyncio.TimeoutError) as e:
-                    logger.error(f"Ошибка соединения: {e}")
-                    logger.error(f"Попытка повторного запроса. Осталось попыток: {retry - 1}")
-                    await asyncio.sleep(60)
-                    retry -= 1
-                    continue
-            raise Exception
-
-    async def _perform_post_request(self, url, params, retry: int = 6):
-        async with await self._get_session() as session:
-            while retry != 0:
-                try:
-                    async with session.post(url, json=params, verify_ssl=False) as response:
-                        if response.status in [404, 403]:
-                            raise ClientError
-                        if response.status == 400:
-                            r = await response.json()
-                            if r.get('code', 0) == 3:
-                                raise ClientError(r.get('message', ''))
-                        if response.status != 200:
-                            logger.info(f"Получен ответ от {url} ({response.status})")
-                            logger.error(f"Попытка повторного запроса. Осталось попыток: {retry - 1}")
-                            await asyncio.sleep(60)
-                            retry -= 1
-                            continue
-                        return await response.json()
-                except (aiohttp.ClientConnectionError, aiohttp.ClientError, asyncio.TimeoutError) as e:
-                    logger.error(f"Ошибка соединения: {e}")
-                    logger.error(f"Попытка повторного запроса. Осталось попыток: {retry - 1}")
-                    await asyncio.sleep(60)
-                    retry -= 1
-                    continue
-            raise Exception
-
-    async def _get_session(self):
-        session = aiohttp.ClientSession()
-
-        session.headers["Client-Id"] = self.__headers['Client-Id']
-        session.headers["Api-Key"] = self.__headers['Api-Key']
-
-        return session
+    async def _get_headers(self, file: bool = False) -> dict:
+        return self.__headers
+
+    async def _process_response(self, response: aiohttp.ClientResponse, url: str, file: bool = False,
+                                raw: bool = False):
+        if response.status in [404, 403]:
+            raise ClientError
+        if response.status == 400:
+            text = await response.text()
+            try:
+                r = json.loads(text)
+            except ValueError:
+                # Тело ответа не JSON (например, страница ошибки прокси)
+                raise ClientError(f"Получен ответ от {url} ({response.status}): {text[:500]}")
+            if isinstance(r, dict) and r.get('code', 0) == 3:
+                raise ClientError(r.get('message', ''))
+        return await super()._process_response(response, url, file=file, raw=raw)
 
 
 class OzonPerformanceAsyncEngine(OzonAsyncEngine):
-    def __init__(self, client_id: str = '', client_secret: str = ''):
-        super().__init__()
+    """
+        Движок Ozon Performance API.
+
+        Токен доступа берётся из общего `OzonTokenManager` перед каждой попыткой запроса
+        и обновляется заранее до истечения срока действия или после ответа 401.
+    """
+
+    def __init__(self, client_id: str = '', client_secret: str = '', connector_config: ConnectorConfig = None,
+                 retry_policy: RetryPolicy = None, tokens: OzonTokenManager = None):
+        super().__init__(client_id=client_id, connector_config=connector_config, retry_policy=retry_policy)
         self._base_url = 'https://performance.ozon.ru'
-        self.__headers = {}
-        url = '/api/client/token'
+        self._client_id = client_id
+        self._client_secret = client_secret
+        self._tokens = tokens or token_manager
+
+    async def _fetch_token(self) -> tuple[str, float]:
+        url = self._get_url('/api/client/token')
         data = {
-            "client_id": client_id,
-            "client_secret": client_secret,
+            "client_id": self._client_id,
+            "client_secret": self._client_secret,
             "grant_type": "client_credentials"
         }
-        response = asyncio.run(self.post(url, data))
-        token = response.get("access_token")
 
-        self.__headers = {
-            'Api-Key': f"Bearer {token}"
-        }
+        async def handler(response: aiohttp.ClientResponse) -> dict:
+            return await self._process_response(response, url)
 
-    async def _get_session(self):
-        session = aiohttp.ClientSession()
+        response = await self._perform_request('POST', url, handler, auth=False, json=data)
+        return response.get("access_token"), response.get("expires_in")
 
-        if self.__headers:
-            session.headers["Authorization"] = self.__headers['Api-Key']
+    async def _get_headers(self, file: bool = False) -> dict:
+        token = await self._tokens.get_token(self._client_id, self._fetch_token)
+        return {
+            'Authorization': f"Bearer {token}"
+        }
 
-        return session
+    async def _process_response(self, response: aiohttp.ClientResponse, url: str, file: bool = False,
+                                raw: bool = False):
+        authorization = response.request_info.headers.get('Authorization')
+        if response.status == 401 and authorization:
+            if self._tokens.invalidate(self._client_id, authorization.removeprefix('Bearer ')):
+                raise RetryRequest(f"Токен Ozon Performance отклонён ({url}), запрос нового токена", delay=0)
+        return await super()._process_response(response, url, file=file, raw=raw)
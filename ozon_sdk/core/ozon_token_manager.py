@@ -0,0 +1,98 @@
+import time
+import asyncio
+import logging
+
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Токен обновляется заранее, если до истечения осталось меньше REFRESH_MARGIN секунд.
+REFRESH_MARGIN = 60
+# Отказ (401) по токену моложе MIN_TOKEN_AGE секунд считается ошибкой доступа, а не истечением токена.
+MIN_TOKEN_AGE = 10
+DEFAULT_TOKEN_TTL = 1800
+
+TokenFetcher = Callable[[], Awaitable[tuple[str, Optional[float]]]]
+
+
+@dataclass
+class _Token:
+    value: str
+    expires_at: float
+    fetched_at: float
+
+
+class OzonTokenManager:
+    """
+        Кэш OAuth-токенов Ozon Performance по ID рекламного кабинета.
+
+        Токен запрашивается один раз на кабинет и переиспользуется всеми API-клиентами процесса
+        до истечения срока действия. Одновременные запросы токена одного кабинета объединяются
+        в один запрос, поэтому параллельные кабинеты не ждут друг друга.
+    """
+
+    def __init__(self, refresh_margin: float = REFRESH_MARGIN):
+        """
+            Args:
+                refresh_margin (float, optional): За сколько секунд до истечения токен обновляется.
+        """
+        self.refresh_margin = refresh_margin
+        self._tokens: dict[str, _Token] = {}
+        self._pending: dict[str, asyncio.Task] = {}
+
+    async def get_token(self, client_id: str, fetch: TokenFetcher) -> str:
+        """
+            Действующий токен кабинета.
+
+            Args:
+                client_id (str): ID рекламного кабинета.
+                fetch (TokenFetcher): Запрос нового токена. Возвращает (токен, срок действия в секундах).
+
+            Returns:
+                str: Токен доступа.
+        """
+        token = self._tokens.get(client_id)
+        if token is not None and token.expires_at - self.refresh_margin > time.monotonic():
+            return token.value
+        task = self._pending.get(client_id)
+        if task is None or task.done() or task.get_loop() is not asyncio.get_running_loop():
+            task = asyncio.ensure_future(self._refresh(client_id, fetch))
+            self._pending[client_id] = task
+        return await asyncio.shield(task)
+
+    def invalidate(self, client_id: str, value: str) -> bool:
+        """
+            Сброс токена, отклонённого сервером (401).
+
+            Args:
+                client_id (str): ID рекламного кабинета.
+                value (str): Отклонённый токен.
+
+            Returns:
+                bool: True, если запрос стоит повторить с новым токеном.
+        """
+        token = self._tokens.get(client_id)
+        if token is None or token.value != value:
+            # Токен уже обновлён другим запросом
+            return True
+        if time.monotonic() - token.fetched_at < MIN_TOKEN_AGE:
+            return False
+        del self._tokens[client_id]
+        return True
+
+    async def _refresh(self, client_id: str, fetch: TokenFetcher) -> str:
+        try:
+            value, expires_in = await fetch()
+            now = time.monotonic()
+            self._tokens[client_id] = _Token(value=value,
+                                             expires_at=now + (expires_in or DEFAULT_TOKEN_TTL),
+                                             fetched_at=now)
+            logger.debug(f"Получен токен Ozon Performance для {client_id}, срок действия {expires_in} с")
+            return value
+        finally:
+            if self._pending.get(client_id) is asyncio.current_task():
+                del self._pending[client_id]
+
+
+token_manager = OzonTokenManager()
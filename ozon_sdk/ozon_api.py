@@ -1,18 +1,25 @@
+from typing import Any, AsyncIterator, Type
+
+from base_sdk import PAGE_CONCURRENCY, PREFETCH_PAGES, iter_cursor_pages, iter_items, iter_numbered_pages, \
+    next_last_id, next_offset, split_params, gather_params, merge_responses
+
+from .entities import *
 from .requests import *
 from .response import *
-from .core import OzonAsyncEngine, OzonPerformanceAsyncEngine
+from .core import OzonAsyncEngine, OzonPerformanceAsyncEngine, ConnectorConfig
 from .ozon_endpoints_list import OzonAPIFactory, OzonPerformanceAPIFactory
 
 
 class OzonApi:
 
-    def __init__(self, client_id: str, api_key: str):
+    def __init__(self, client_id: str, api_key: str, connector_config: ConnectorConfig = None):
         """
             Args:
                 client_id (_type_): ID кабинета
                 api_key (_type_): API KEY кабинета
+                connector_config (ConnectorConfig, optional): Настройки пула соединений.
         """
-        self._engine = OzonAsyncEngine(client_id=client_id, api_key=api_key)
+        self._engine = OzonAsyncEngine(client_id=client_id, api_key=api_key, connector_config=connector_config)
         self._api_factory = OzonAPIFactory(self._engine)
 
         self._finance_transaction_list_api = self._api_factory.get_api(FinanceTransactionListResponse)
@@ -29,9 +36,20 @@ class OzonApi:
         self._product_info_stocks_api = self._api_factory.get_api(ProductInfoStocksResponse)
         self._finance_realization_api = self._api_factory.get_api(FinanceRealizationResponse)
 
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def close(self) -> None:
+        """Закрытие сессии кабинета."""
+        await self._engine.close()
+
     async def get_finance_transaction_list(self, from_field: str, to: str, posting_number: str = "",
                                            operation_type: list[str] = None, transaction_type: str = 'all',
-                                           page: int = 1, page_size: int = 1000) -> FinanceTransactionListResponse:
+                                           page: int = 1, page_size: int = 1000,
+                                           projection: Type[BaseResponse] = None) -> FinanceTransactionListResponse:
         """
             Список транзакций.
 
@@ -52,6 +70,7 @@ class OzonApi:
                 transaction_type (str, optional): Тип начисления.
                 page (int, optional): Номер страницы, возвращаемой в запросе.
                 page_size (int, optional): Количество элементов на странице.
+                projection (Type[BaseResponse], optional): Облегчённая модель ответа (см. `projections`).
         """
         if operation_type is None:
             operation_type = []
@@ -64,7 +83,8 @@ class OzonApi:
             page=page,
             page_size=page_size
         )
-        answer: FinanceTransactionListResponse = await self._finance_transaction_list_api.post(request)
+        answer: FinanceTransactionListResponse = await self._finance_transaction_list_api.post(request,
+                                                                                              response_type=projection)
 
         return answer
 
@@ -82,7 +102,8 @@ class OzonApi:
 
     async def get_posting_fbs(self, posting_number: str, analytics_data: bool = False, barcodes: bool = False,
                               financial_data: bool = False, product_exemplars: bool = False,
-                              related_postings: bool = False, translit: bool = False) -> PostingFBSGetResponse:
+                              related_postings: bool = False, translit: bool = False,
+                              projection: Type[BaseResponse] = None) -> PostingFBSGetResponse:
         """
             Получить информацию схемы доставки FBS об отправлении по идентификатору.
 
@@ -95,6 +116,7 @@ class OzonApi:
                 related_postings (bool, optional): Добавить в ответ номера связанных отправлений.
                     Связанные отправления — те, на которое было разделено родительское отправление при сборке.
                 translit (bool, optional): Выполнить транслитерацию возвращаемых значений.
+                projection (Type[BaseResponse], optional): Облегчённая модель ответа (см. `projections`).
         """
         request = PostingFBSGetRequest(posting_number=posting_number,
                                        with_field=PostingFBSGetWith(analytics_data=analytics_data,
@@ -103,11 +125,11 @@ class OzonApi:
                                                                     product_exemplars=product_exemplars,
                                                                     related_postings=related_postings,
                                                                     translit=translit))
-        answer: PostingFBSGetResponse = await self._posting_fbs_get_api.post(request)
+        answer: PostingFBSGetResponse = await self._posting_fbs_get_api.post(request, response_type=projection)
         return answer
 
     async def get_posting_fbo(self, posting_number: str, analytics_data: bool = False, financial_data: bool = False,
-                              translit: bool = False) -> PostingFBOGetResponse:
+                              translit: bool = False, projection: Type[BaseResponse] = None) -> PostingFBOGetResponse:
         """
             Получить информацию схемы доставки FBO об отправлении по идентификатору.
 
@@ -116,6 +138,7 @@ class OzonApi:
                 analytics_data (bool, optional): Добавить в ответ данные аналитики.
                 financial_data (bool, optional): Добавить в ответ финансовые данные.
                 translit (bool, optional): Выполнить транслитерацию возвращаемых значений.
+                projection (Type[BaseResponse], optional): Облегчённая модель ответа (см. `projections`).
 
             Returns:
                 PostingFBOGetResponse
@@ -124,7 +147,7 @@ class OzonApi:
                                        translit=translit,
                                        with_field=PostingFBOGetWith(analytics_data=analytics_data,
                                                                     financial_data=financial_data))
-        answer: PostingFBOGetResponse = await self._posting_fbo_get_api.post(request)
+        answer: PostingFBOGetResponse = await self._posting_fbo_get_api.post(request, response_type=projection)
         return answer
 
     async def get_product_list(self, offer_id: list[str] = None, product_id: list[str] = None, visibility: str = 'ALL',
@@ -180,13 +203,21 @@ class OzonApi:
         """
             Получение информации о таварах.
 
+            Списки могут быть любой длины: запрос разбивается на части по ограничению endpoint'а,
+            части выполняются одновременно, товары объединяются в одном ответе.
+
             Args:
                 offer_id (list[str], optional): Список артикулов товаров в системе продавца.
                 product_id (list[str], optional): Список id товаров в системе Ozon.
                 sku (list[int], optional): Список sku товаров в системе Ozon.
         """
-        request = ProductInfoListRequest(offer_id=offer_id, product_id=product_id, sku=sku)
-        answer: ProductInfoListResponse = await self._product_info_list_api.post(request)
+        async def fetch(offer_id: list[str], product_id: list[str], sku: list[int]) -> ProductInfoListResponse:
+            request = ProductInfoListRequest(offer_id=offer_id, product_id=product_id, sku=sku)
+            return await self._product_info_list_api.post(request)
+
+        parts = split_params(self._product_info_list_api.batch_limit, offer_id=offer_id, product_id=product_id,
+                             sku=sku)
+        answer: ProductInfoListResponse = merge_responses(await gather_params(fetch, parts), 'result.items')
         return answer
 
     async def get_products_info_attributes(self, offer_id: list[str] = None, product_id: list[str] = None,
@@ -366,11 +397,17 @@ class OzonApi:
             Метод для получения информации о состоянии и дефектах уценённого товара по его SKU.
             Также метод возвращает SKU основного товара.
 
+            Список может быть любой длины: запрос разбивается на части по ограничению endpoint'а.
+
             Args:
                 discounted_skus (list[str): Список SKU уценённых товаров.
         """
-        request = ProductInfoDiscountedRequest(discounted_skus=discounted_skus)
-        answer: ProductInfoDiscountedResponse = await self._product_info_discounted_api.post(request)
+        async def fetch(discounted_skus: list[str]) -> ProductInfoDiscountedResponse:
+            request = ProductInfoDiscountedRequest(discounted_skus=discounted_skus)
+            return await self._product_info_discounted_api.post(request)
+
+        parts = split_params(self._product_info_discounted_api.batch_limit, discounted_skus=discounted_skus)
+        answer: ProductInfoDiscountedResponse = merge_responses(await gather_params(fetch, parts), 'items')
         return answer
 
     async def get_product_related_sku_get(self, skus: list[str]) -> ProductRelatedSkuGetResponse:
@@ -378,13 +415,18 @@ class OzonApi:
             Метод для получения единого SKU по старым идентификаторам SKU FBS и SKU FBO.
             В ответе будут все SKU, связанные с переданными.
 
-            Передавайте до 200 SKU в одном запросе.
+            Список может быть любой длины: запрос разбивается на части по ограничению endpoint'а
+            (200 SKU).
 
             Args:
                 skus (list[str): Список SKU.
         """
-        request = ProductRelatedSkuGetRequest(sku=skus)
-        answer: ProductRelatedSkuGetResponse = await self._product_related_sku_get_api.post(request)
+        async def fetch(skus: list[str]) -> ProductRelatedSkuGetResponse:
+            request = ProductRelatedSkuGetRequest(sku=skus)
+            return await self._product_related_sku_get_api.post(request)
+
+        parts = split_params(self._product_related_sku_get_api.batch_limit, skus=skus)
+        answer: ProductRelatedSkuGetResponse = merge_responses(await gather_params(fetch, parts), 'items', 'errors')
         return answer
 
     async def get_product_info_stocks(self, offer_id: list[str] = None, product_id: list[str] = None,
@@ -436,16 +478,179 @@ class OzonApi:
         answer: ProductInfoStocksResponse = await self._product_info_stocks_api.post(request)
         return answer
 
+    def iter_finance_transaction_list(self, from_field: str, to: str, posting_number: str = "",
+                                      operation_type: list[str] = None, transaction_type: str = 'all',
+                                      page_size: int = 1000, projection: Type[BaseResponse] = None,
+                                      concurrency: int = PAGE_CONCURRENCY) -> AsyncIterator[Any]:
+        """
+            Транзакции за период по одной, со всех страниц.
+
+            После первой страницы остальные запрашиваются одновременно (см. `get_finance_transaction_list`).
+
+            Args:
+                concurrency (int, optional): Количество одновременных запросов страниц.
+
+            Yields:
+                FinanceTransactionListOperation: Транзакция (или её облегчённая модель `projection`).
+        """
+        pages = iter_numbered_pages(
+            fetch=lambda page: self.get_finance_transaction_list(from_field=from_field, to=to,
+                                                                 posting_number=posting_number,
+                                                                 operation_type=operation_type,
+                                                                 transaction_type=transaction_type,
+                                                                 page=page, page_size=page_size,
+                                                                 projection=projection),
+            page_count=lambda answer: answer.result.page_count if answer.result else 1,
+            concurrency=concurrency)
+        return iter_items(pages, lambda answer: answer.result.operations if answer.result else None)
+
+    def iter_product_list(self, offer_id: list[str] = None, product_id: list[str] = None, visibility: str = 'ALL',
+                          limit: int = 1000, prefetch: int = PREFETCH_PAGES) -> AsyncIterator[ProductListItem]:
+        """
+            Товары по одному, со всех страниц по `last_id` (см. `get_product_list`).
+
+            Args:
+                limit (int, optional): Количество значений на странице.
+                prefetch (int, optional): Количество страниц, загружаемых заранее.
+
+            Yields:
+                ProductListItem: Товар.
+        """
+        pages = iter_cursor_pages(
+            fetch=lambda last_id: self.get_product_list(offer_id=offer_id, product_id=product_id,
+                                                        visibility=visibility, last_id=last_id, limit=limit),
+            next_cursor=lambda answer, _: next_last_id(answer.result and answer.result.last_id,
+                                                     answer.result and answer.result.items, limit),
+            prefetch=prefetch)
+        return iter_items(pages, lambda answer: answer.result.items if answer.result else None)
+
+    def iter_products_info_attributes(self, offer_id: list[str] = None, product_id: list[str] = None,
+                                      visibility: str = 'ALL', limit: int = 1000, sort_by: str = None,
+                                      sort_dir: str = None, prefetch: int = PREFETCH_PAGES) \
+            -> AsyncIterator[ProductsInfoAttributes]:
+        """
+            Характеристики товаров по одному, со всех страниц по `last_id` (см. `get_products_info_attributes`).
+
+            Args:
+                limit (int, optional): Количество значений на странице.
+                prefetch (int, optional): Количество страниц, загружаемых заранее.
+
+            Yields:
+                ProductsInfoAttributes: Характеристики товара.
+        """
+        pages = iter_cursor_pages(
+            fetch=lambda last_id: self.get_products_info_attributes(offer_id=offer_id, product_id=product_id,
+                                                                    visibility=visibility, last_id=last_id,
+                                                                    limit=limit, sort_by=sort_by, sort_dir=sort_dir),
+            next_cursor=lambda answer, _: next_last_id(answer.last_id, answer.result, limit),
+            prefetch=prefetch)
+        return iter_items(pages, lambda answer: answer.result)
+
+    def iter_analytics_data(self, date_from: str, date_to: str, dimension: list[str] = None,
+                            filters: list[AnalyticsDataFilter] = None, limit: int = 1000, metrics: list[str] = None,
+                            sort: list[AnalyticsDataSort] = None,
+                            prefetch: int = PREFETCH_PAGES) -> AsyncIterator[AnalyticsDataData]:
+        """
+            Строки аналитики по одной, со всех страниц по `offset` (см. `get_analytics_data`).
+
+            Args:
+                limit (int, optional): Количество значений на странице.
+                prefetch (int, optional): Количество страниц, загружаемых заранее.
+
+            Yields:
+                AnalyticsDataData: Строка аналитики.
+        """
+        pages = iter_cursor_pages(
+            fetch=lambda offset: self.get_analytics_data(date_from=date_from, date_to=date_to, dimension=dimension,
+                                                         filters=filters, limit=limit, metrics=metrics,
+                                                         offset=offset, sort=sort),
+            next_cursor=lambda answer, offset: next_offset(offset, answer.result and answer.result.data, limit),
+            cursor=0,
+            prefetch=prefetch)
+        return iter_items(pages, lambda answer: answer.result.data if answer.result else None)
+
+    def iter_posting_fbo_list(self, since: str, to: str, order_by: str = 'asc', status: str = '', limit: int = 1000,
+                              translit: bool = False, analytics_data: bool = False, financial_data: bool = False,
+                              prefetch: int = PREFETCH_PAGES) -> AsyncIterator[PostingFBOList]:
+        """
+            Отправления FBO по одному, со всех страниц по `offset` (см. `get_posting_fbo_list`).
+
+            Args:
+                limit (int, optional): Количество значений на странице.
+                prefetch (int, optional): Количество страниц, загружаемых заранее.
+
+            Yields:
+                PostingFBOList: Отправление.
+        """
+        pages = iter_cursor_pages(
+            fetch=lambda offset: self.get_posting_fbo_list(since=since, to=to, order_by=order_by, status=status,
+                                                           limit=limit, offset=offset, translit=translit,
+                                                           analytics_data=analytics_data,
+                                                           financial_data=financial_data),
+            next_cursor=lambda answer, offset: next_offset(offset, answer.result, limit),
+            cursor=0,
+            prefetch=prefetch)
+        return iter_items(pages, lambda answer: answer.result)
+
+    def iter_posting_fbs_list(self, since: str, to: str, order_by: str = 'asc', status: str = '',
+                              limit: int = 1000, analytics_data: bool = False, barcodes: bool = False,
+                              financial_data: bool = False, translit: bool = False,
+                              prefetch: int = PREFETCH_PAGES, **filters) -> AsyncIterator[PostingFBSListPosting]:
+        """
+            Отправления FBS по одному, со всех страниц по `offset` и `has_next` (см. `get_posting_fbs_list`).
+
+            Args:
+                limit (int, optional): Количество значений на странице.
+                prefetch (int, optional): Количество страниц, загружаемых заранее.
+                **filters: Остальные фильтры `get_posting_fbs_list`.
+
+            Yields:
+                PostingFBSListPosting: Отправление.
+        """
+        pages = iter_cursor_pages(
+            fetch=lambda offset: self.get_posting_fbs_list(since=since, to=to, order_by=order_by, status=status,
+                                                           limit=limit, offset=offset, analytics_data=analytics_data,
+                                                           barcodes=barcodes, financial_data=financial_data,
+                                                           translit=translit, **filters),
+            next_cursor=lambda answer, offset: offset + limit if answer.result and answer.result.has_next else None,
+            cursor=0,
+            prefetch=prefetch)
+        return iter_items(pages, lambda answer: answer.result.postings if answer.result else None)
+
+    def iter_product_info_stocks(self, offer_id: list[str] = None, product_id: list[str] = None,
+                                 visibility: str = 'ALL', limit: int = 1000,
+                                 prefetch: int = PREFETCH_PAGES) -> AsyncIterator[ProductInfoStocksItem]:
+        """
+            Остатки товаров по одному, со всех страниц по `last_id` (см. `get_product_info_stocks`).
+
+            Args:
+                limit (int, optional): Количество значений на странице.
+                prefetch (int, optional): Количество страниц, загружаемых заранее.
+
+            Yields:
+                ProductInfoStocksItem: Остатки товара.
+        """
+        pages = iter_cursor_pages(
+            fetch=lambda last_id: self.get_product_info_stocks(offer_id=offer_id, product_id=product_id,
+                                                               visibility=visibility, last_id=last_id, limit=limit),
+            next_cursor=lambda answer, _: next_last_id(answer.result and answer.result.last_id,
+                                                     answer.result and answer.result.items, limit),
+            prefetch=prefetch)
+        return iter_items(pages, lambda answer: answer.result.items if answer.result else None)
+
 
 class OzonPerformanceAPI:
 
-    def __init__(self, client_id: str, client_secret: str):
+    def __init__(self, client_id: str, client_secret: str, connector_config: ConnectorConfig = None):
         """
             Args:
                 client_id (_type_): ID рекламного кабинета
                 client_secret (_type_): SECRET KEY рекламного кабинета
+                connector_config (ConnectorConfig, optional): Настройки пула соединений.
         """
-        self._engine = OzonPerformanceAsyncEngine(client_id=client_id, client_secret=client_secret)
+        self._engine = OzonPerformanceAsyncEngine(client_id=client_id,
+                                                  client_secret=client_secret,
+                                                  connector_config=connector_config)
         self._api_factory = OzonPerformanceAPIFactory(self._engine)
 
         self._client_campaign_api = self._api_factory.get_api(ClientCampaignResponse)
@@ -457,6 +662,34 @@ class OzonPerformanceAPI:
         self._client_campaign_search_promo_products_api = self._api_factory.get_api(
             ClientCampaignSearchPromoProductsResponse)
 
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def close(self) -> None:
+        """Закрытие сессии кабинета."""
+        await self._engine.close()
+
+    def split_statistics_campaigns(self, campaigns: list[str]) -> list[list[str]]:
+        """
+            Разбиение РК на части по ограничению `get_client_statistics_json`.
+
+            Ответ содержит UUID одного отчёта, поэтому части не объединяются в один запрос,
+            а запрашиваются отдельными отчётами.
+
+            Args:
+                campaigns (list[str]): Идентификаторы кампаний.
+
+            Returns:
+                list[list[str]]: Идентификаторы кампаний для каждого отчёта.
+        """
+        if not campaigns:
+            return []
+        return [part['campaigns'] for part in split_params(self._client_statistics_json_api.batch_limit,
+                                                           campaigns=campaigns)]
+
     async def get_client_campaign(self, campaign_ids: list[str] = None, adv_object_type: str = None,
                                   state: str = None) -> ClientCampaignResponse:
         """
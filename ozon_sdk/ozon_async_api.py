@@ -1,5 +1,6 @@
 from typing import Type, Union
 
+from base_sdk import RawResponse
 from .core import OzonAsyncEngine, OzonPerformanceAsyncEngine
 from .response import BaseResponse
 
@@ -7,37 +8,44 @@ from .response import BaseResponse
 class OzonAsyncApi:
 
     def __init__(self, engine: Union[OzonAsyncEngine, OzonPerformanceAsyncEngine], url: str,
-                 response_type: Type[BaseResponse]):
+                 response_type: Type[BaseResponse], batch_limit: int = None):
         self._engine = engine
         self._url = url
         self._response_type = response_type
+        # Максимальное количество значений списочного параметра в одном запросе
+        self.batch_limit = batch_limit
 
-    async def get(self, request, format_dict: dict = None):
+    async def get(self, request, format_dict: dict = None, response_type: Type[BaseResponse] = None):
         parameters = request.dict(by_alias=True)
         url = self._url
         if format_dict:
             url = url.format(**format_dict)
-        response = await self._engine.get(url, parameters)
-        data = await self._parse_response(response)
+        response = await self._engine.get(url, parameters, raw=True)
+        data = await self._parse_response(response, response_type or self._response_type)
         return data
 
-    async def post(self, request):
+    async def post(self, request, response_type: Type[BaseResponse] = None):
         parameters = request.dict(by_alias=True)
-        response = await self._engine.post(self._url, parameters)
-        data = await self._parse_response(response)
+        response = await self._engine.post(self._url, parameters, raw=True)
+        data = await self._parse_response(response, response_type or self._response_type)
         return data
 
-    async def _parse_response(self, response: dict or list):
+    async def _parse_response(self, response: RawResponse or dict, response_type: Type[BaseResponse]):
+        if isinstance(response, RawResponse):
+            if not response.has_key('error') and not response.has_digit_keys():
+                return response.validate(response_type)
+            response = response.json()
         if all(key.isdigit() for key in response.keys()):
             new_response = {'result': []}
             for k, v in response.items():
                 new_response['result'].append({'id': k, 'statistic': v})
-            data = await self._parse_response_object(new_response)
+            data = await self._parse_response_object(new_response, response_type)
         else:
-            data = await self._parse_response_object(response)
+            data = await self._parse_response_object(response, response_type)
         return data
 
-    async def _parse_response_object(self, response: dict):
+    @staticmethod
+    async def _parse_response_object(response: dict, response_type: Type[BaseResponse]):
         if response.get("error"):
             raise Exception(response.get("errorText"))
-        return self._response_type.parse_obj(response)
+        return response_type.model_validate(response)
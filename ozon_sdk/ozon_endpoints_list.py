@@ -1,5 +1,6 @@
 from typing import Type
 
+from base_sdk import RateLimit
 from .response import *
 from .ozon_async_api import OzonAsyncApi
 from .core import OzonAsyncEngine, OzonPerformanceAsyncEngine
@@ -24,12 +25,26 @@ class OzonAPIFactory:
         FinanceRealizationResponse: '/v2/finance/realization'
     }
 
+    rate_limits: dict[Type[BaseResponse], RateLimit] = {
+        AnalyticsDataResponse: RateLimit(1, 60),
+        PostingFBOGetResponse: RateLimit(10, 1, burst=10),
+        PostingFBSGetResponse: RateLimit(10, 1, burst=10),
+    }
+
+    batch_limits: dict[Type[BaseResponse], int] = {
+        ProductInfoListResponse: 1000,
+        ProductInfoDiscountedResponse: 50,
+        ProductRelatedSkuGetResponse: 200,
+    }
+
     def __init__(self, engine: OzonAsyncEngine):
         self._engine = engine
+        self._engine.set_rate_limits({OzonAPIFactory.api_list[response_type]: limit
+                                      for response_type, limit in OzonAPIFactory.rate_limits.items()})
 
     def get_api(self, response_type: Type[BaseResponse]):
         url = OzonAPIFactory.api_list.get(response_type)
-        api = OzonAsyncApi(self._engine, url, response_type)
+        api = OzonAsyncApi(self._engine, url, response_type, OzonAPIFactory.batch_limits.get(response_type))
 
         return api
 
@@ -47,11 +62,15 @@ class OzonPerformanceAPIFactory:
         ClientCampaignSearchPromoProductsResponse: '/api/client/campaign/{campaignId}/search_promo/products',
     }
 
+    batch_limits: dict[Type[BaseResponse], int] = {
+        ClientStatisticsJSONResponse: 10,
+    }
+
     def __init__(self, engine: OzonPerformanceAsyncEngine):
         self._engine = engine
 
     def get_api(self, response_type: Type[BaseResponse]):
         url = OzonPerformanceAPIFactory.api_list.get(response_type)
-        api = OzonAsyncApi(self._engine, url, response_type)
+        api = OzonAsyncApi(self._engine, url, response_type, OzonPerformanceAPIFactory.batch_limits.get(response_type))
 
         return api
@@ -0,0 +1,43 @@
+from base_sdk import project
+from .response import FinanceTransactionListResponse, PostingFBOGetResponse, PostingFBSGetResponse
+
+# Финансовые операции для продаж и возвратов (main_oz).
+FinanceTransactionSalesView = project(FinanceTransactionListResponse, {
+    'result': {
+        'operations': {
+            'operation_type': None,
+            'operation_date': None,
+            'posting': ['delivery_schema', 'posting_number'],
+            'items': ['sku'],
+        },
+        'page_count': None,
+    },
+}, name='FinanceTransactionSalesView')
+
+# Финансовые операции с услугами (oz_services).
+FinanceTransactionServicesView = project(FinanceTransactionListResponse, {
+    'result': {
+        'operations': {
+            'operation_type': None,
+            'operation_type_name': None,
+            'operation_date': None,
+            'accruals_for_sale': None,
+            'amount': None,
+            'posting': ['delivery_schema', 'posting_number'],
+            'items': ['sku'],
+            'services': None,
+        },
+        'page_count': None,
+    },
+}, name='FinanceTransactionServicesView')
+
+_POSTING_FINANCE_SPEC = {
+    'result': {
+        'products': ['sku', 'offer_id', 'price', 'quantity'],
+        'financial_data': {'products': ['product_id', 'commission_amount']},
+    },
+}
+
+# Товары и комиссии отправлений для распределения финансовых операций (main_oz, oz_services).
+PostingFBOFinanceView = project(PostingFBOGetResponse, _POSTING_FINANCE_SPEC, name='PostingFBOFinanceView')
+PostingFBSFinanceView = project(PostingFBSGetResponse, _POSTING_FINANCE_SPEC, name='PostingFBSFinanceView')
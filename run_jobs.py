@@ -0,0 +1,94 @@
+import sys
+import asyncio
+import logging
+
+import main_oz
+import main_sb
+import main_wb
+import main_ya
+import oz_advert_company
+import oz_bonus
+import oz_orders
+import oz_services
+import oz_stocks
+import wb_acceptance
+import wb_advert_company
+import wb_orders
+import wb_report
+import wb_stocks
+import wb_storage
+import ya_orders
+import ya_report
+import ya_stocks
+import google_sheet_orders
+import google_sheet_report
+
+from functools import partial
+from base_sdk import shared_connectors
+from database import DbConnection
+from runners import Job, run_dag, select_jobs
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)-8s %(message)s')
+logger = logging.getLogger(__name__)
+
+JOB_CONCURRENCY = 4
+
+# Карточки товаров (oz_card_product, wb_card_product) загружаются задачами рекламы,
+# остальные задачи маркетплейса используют их для сопоставления SKU и артикулов.
+# Задачи запускаются с raise_errors=True: ошибка задачи (в том числе ошибка всех кабинетов,
+# см. `raise_on_failure`) доходит до run_dag, и зависящие от неё задачи пропускаются.
+JOBS = [
+    Job('oz_advert', partial(oz_advert_company.main_oz_advert, raise_errors=True)),
+    Job('oz_main', partial(main_oz.main_func_oz, raise_errors=True), depends_on=('oz_advert',)),
+    Job('oz_orders', partial(oz_orders.main_func_oz, raise_errors=True), depends_on=('oz_advert',)),
+    Job('oz_services', partial(oz_services.main_oz_services, raise_errors=True), depends_on=('oz_advert',)),
+    Job('oz_bonus', partial(oz_bonus.main_oz_services, raise_errors=True), depends_on=('oz_advert',)),
+    Job('oz_stocks', partial(oz_stocks.main_oz_stock, raise_errors=True)),
+
+    Job('wb_advert', partial(wb_advert_company.main_wb_advert, raise_errors=True)),
+    Job('wb_main', partial(main_wb.main_func_wb, raise_errors=True)),
+    Job('wb_orders', partial(wb_orders.main_orders_wb, raise_errors=True)),
+    Job('wb_report', partial(wb_report.main_wb_report, raise_errors=True)),
+    Job('wb_stocks', partial(wb_stocks.main_wb_stock, raise_errors=True)),
+    Job('wb_storage', partial(wb_storage.main_wb_storage, raise_errors=True)),
+    Job('wb_acceptance', partial(wb_acceptance.main_wb_acceptance, raise_errors=True)),
+
+    Job('ya_main', partial(main_ya.main_func_yandex, raise_errors=True)),
+    Job('ya_orders', partial(ya_orders.main_orders_yandex, raise_errors=True)),
+    Job('ya_report', partial(ya_report.main_yandex_report, raise_errors=True)),
+    Job('ya_stocks', partial(ya_stocks.main_wb_stock, raise_errors=True)),
+
+    Job('sb_main', partial(main_sb.main_func_sb, raise_errors=True)),
+
+    # Выгрузки в Google Таблицы синхронные и строятся по уже загруженным данным
+    Job('google_sheet_orders', lambda: asyncio.to_thread(google_sheet_orders.main, raise_errors=True),
+        depends_on=('wb_advert',)),
+    Job('google_sheet_report', lambda: asyncio.to_thread(google_sheet_report.main, raise_errors=True),
+        depends_on=('wb_advert', 'wb_stocks')),
+]
+
+
+async def main_jobs(names: list[str] = None) -> None:
+    """
+        Выполнение задач всех маркетплейсов в одном процессе.
+
+        Таблицы создаются один раз, задачи используют общий пул соединений с базой данных
+        и общие HTTP-пулы, независимые задачи выполняются параллельно.
+
+        Args:
+            names (list[str], optional): Названия задач для запуска (вместе с зависимостями). По умолчанию все.
+    """
+    jobs = select_jobs(JOBS, names) if names else JOBS
+
+    db_conn = DbConnection()
+    try:
+        db_conn.start_db()
+    finally:
+        db_conn.close()
+
+    async with shared_connectors():
+        await run_dag(jobs, concurrency=JOB_CONCURRENCY)
+
+
+if __name__ == "__main__":
+    asyncio.run(main_jobs(sys.argv[1:]))
@@ -0,0 +1,4 @@
+from .cabinet_runner import *
+from .report_runner import *
+from .dag import *
+from .pipeline import *
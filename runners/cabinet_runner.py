@@ -0,0 +1,111 @@
+import time
+import asyncio
+import logging
+
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Iterable, Optional, TypeVar
+
+from database.db import DbConnection
+
+logger = logging.getLogger(__name__)
+
+CABINET_CONCURRENCY = 4
+
+T = TypeVar('T')
+
+
+@dataclass
+class CabinetResult:
+    """Результат обработки одного кабинета."""
+    name: str
+    elapsed: float
+    result: Any = None
+    error: Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class CabinetsFailed(Exception):
+    """Обработка кабинетов (отчётов) завершилась с ошибкой."""
+
+    def __init__(self, results: list[CabinetResult]):
+        self.results = results
+        failed = [result.name for result in results if not result.ok]
+        super().__init__(f"С ошибкой {len(failed)} из {len(results)}: {', '.join(failed)}")
+
+
+def raise_on_failure(results: list[CabinetResult], allow_partial: bool = True) -> list[CabinetResult]:
+    """
+        Проверка результатов `run_cabinets` / `run_reports`.
+
+        Ошибки отдельных кабинетов только записываются в журнал, поэтому точка входа проверяет
+        результаты, чтобы сбой дошёл до вызывающего (например, до `run_dag`).
+
+        Args:
+            results (list[CabinetResult]): Результаты обработки.
+            allow_partial (bool, optional): Ошибка только если с ошибкой завершились все кабинеты.
+                False — при любой ошибке (например, для частей одного отчёта).
+
+        Returns:
+            list[CabinetResult]: Те же результаты, если проверка пройдена, иначе `CabinetsFailed`.
+    """
+    failed = [result for result in results if not result.ok]
+    if failed and (not allow_partial or len(failed) == len(results)):
+        raise CabinetsFailed(results)
+    return results
+
+
+def _default_name(cabinet: Any) -> str:
+    return getattr(cabinet, 'name_company', None) or str(cabinet)
+
+
+async def run_cabinets(db_conn: DbConnection,
+                       cabinets: Iterable[T],
+                       job: Callable[[DbConnection, T], Awaitable[Any]],
+                       concurrency: int = CABINET_CONCURRENCY,
+                       name: Callable[[T], str] = _default_name) -> list[CabinetResult]:
+    """
+        Параллельная обработка кабинетов.
+
+        Одновременно обрабатывается не более `concurrency` кабинетов. Каждый кабинет получает
+        собственную сессию БД на общем пуле соединений `db_conn`, ошибка одного кабинета
+        не прерывает обработку остальных.
+
+        Args:
+            db_conn (DbConnection): Подключение, движок которого используется для сессий кабинетов.
+            cabinets (Iterable[T]): Кабинеты (или кабинеты с магазинами) для обработки.
+            job (Callable[[DbConnection, T], Awaitable[Any]]): Обработка кабинета.
+            concurrency (int, optional): Количество одновременно обрабатываемых кабинетов.
+            name (Callable[[T], str], optional): Название кабинета для журнала.
+
+        Returns:
+            list[CabinetResult]: Результаты в порядке следования кабинетов.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(cabinet: T) -> CabinetResult:
+        cabinet_name = name(cabinet)
+        async with semaphore:
+            cabinet_db_conn = type(db_conn)(engine=db_conn.engine)
+            started = time.perf_counter()
+            try:
+                result = await job(cabinet_db_conn, cabinet)
+                return CabinetResult(name=cabinet_name, elapsed=time.perf_counter() - started, result=result)
+            except Exception as e:
+                logger.error(f"{cabinet_name}: {e}")
+                return CabinetResult(name=cabinet_name, elapsed=time.perf_counter() - started, error=e)
+            finally:
+                cabinet_db_conn.close()
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*[run(cabinet) for cabinet in cabinets])
+
+    for result in results:
+        status = 'ок' if result.ok else f'ошибка: {result.error}'
+        logger.info(f"Кабинет '{result.name}': {result.elapsed:.1f} с, {status}")
+    failed = len([result for result in results if not result.ok])
+    logger.info(f"Обработано кабинетов: {len(results)}, с ошибкой: {failed}, "
+                f"общее время {time.perf_counter() - started:.1f} с")
+    return results
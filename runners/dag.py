@@ -0,0 +1,133 @@
+import time
+import asyncio
+import logging
+
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Iterable, Optional
+
+from .cabinet_runner import CabinetResult
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Job:
+    """
+        Задача конвейера.
+
+        Attributes:
+            name (str): Уникальное название задачи.
+            func (Callable[[], Awaitable[Any]]): Запуск задачи.
+            depends_on (tuple[str, ...]): Задачи, которые должны успешно завершиться до запуска.
+    """
+    name: str
+    func: Callable[[], Awaitable[Any]]
+    depends_on: tuple[str, ...] = ()
+
+
+class DagError(Exception):
+    """Некорректный граф задач: неизвестная зависимость или цикл."""
+
+
+class DependencyFailed(Exception):
+    """Задача пропущена, так как одна из её зависимостей завершилась с ошибкой."""
+
+
+def select_jobs(jobs: Iterable[Job], names: Iterable[str]) -> list[Job]:
+    """
+        Отбирает задачи вместе со всеми их зависимостями.
+
+        Args:
+            jobs (Iterable[Job]): Все задачи.
+            names (Iterable[str]): Названия нужных задач.
+
+        Returns:
+            list[Job]: Отобранные задачи в исходном порядке.
+    """
+    jobs = list(jobs)
+    by_name = {job.name: job for job in jobs}
+    selected = set()
+    stack = list(names)
+    while stack:
+        name = stack.pop()
+        if name in selected:
+            continue
+        if name not in by_name:
+            raise DagError(f"Неизвестная задача '{name}'")
+        selected.add(name)
+        stack.extend(by_name[name].depends_on)
+    return [job for job in jobs if job.name in selected]
+
+
+def _check_graph(jobs: list[Job]) -> None:
+    by_name = {}
+    for job in jobs:
+        if job.name in by_name:
+            raise DagError(f"Задача '{job.name}' объявлена повторно")
+        by_name[job.name] = job
+    for job in jobs:
+        for dependency in job.depends_on:
+            if dependency not in by_name:
+                raise DagError(f"Задача '{job.name}' зависит от неизвестной задачи '{dependency}'")
+
+    # Топологическая сортировка: оставшиеся задачи образуют цикл
+    remaining = {job.name: set(job.depends_on) for job in jobs}
+    while remaining:
+        ready = [name for name, dependencies in remaining.items() if not dependencies]
+        if not ready:
+            raise DagError(f"Цикл в зависимостях задач: {', '.join(sorted(remaining))}")
+        for name in ready:
+            del remaining[name]
+        for dependencies in remaining.values():
+            dependencies.difference_update(ready)
+
+
+async def run_dag(jobs: Iterable[Job], concurrency: Optional[int] = None) -> dict[str, CabinetResult]:
+    """
+        Выполнение графа задач в одном цикле событий.
+
+        Задача запускается, как только успешно завершены все её зависимости, поэтому независимые
+        задачи выполняются параллельно. Если зависимость завершилась с ошибкой, зависящие от неё
+        задачи пропускаются, остальные продолжают выполняться.
+
+        Args:
+            jobs (Iterable[Job]): Задачи графа.
+            concurrency (int, optional): Количество одновременно выполняемых задач. По умолчанию без ограничения.
+
+        Returns:
+            dict[str, CabinetResult]: Результаты по названиям задач.
+    """
+    jobs = list(jobs)
+    _check_graph(jobs)
+    semaphore = asyncio.Semaphore(concurrency or max(len(jobs), 1))
+    tasks: dict[str, asyncio.Task] = {}
+
+    async def run(job: Job) -> CabinetResult:
+        dependencies = [await tasks[name] for name in job.depends_on]
+        failed = [result.name for result in dependencies if not result.ok]
+        if failed:
+            error = DependencyFailed(f"не выполнены зависимости: {', '.join(failed)}")
+            return CabinetResult(name=job.name, elapsed=0, error=error)
+
+        async with semaphore:
+            logger.info(f"Запуск задачи '{job.name}'")
+            started = time.perf_counter()
+            try:
+                result = await job.func()
+                return CabinetResult(name=job.name, elapsed=time.perf_counter() - started, result=result)
+            except Exception as e:
+                logger.error(f"{job.name}: {e}")
+                return CabinetResult(name=job.name, elapsed=time.perf_counter() - started, error=e)
+
+    started = time.perf_counter()
+    for job in jobs:
+        tasks[job.name] = asyncio.ensure_future(run(job))
+    results = {job.name: await tasks[job.name] for job in jobs}
+
+    for result in results.values():
+        status = 'ок' if result.ok else f'ошибка: {result.error}'
+        logger.info(f"Задача '{result.name}': {result.elapsed:.1f} с, {status}")
+    failed = len([result for result in results.values() if not result.ok])
+    logger.info(f"Выполнено задач: {len(results) - failed}, с ошибкой: {failed}, "
+                f"общее время {time.perf_counter() - started:.1f} с")
+    return results
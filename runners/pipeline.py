@@ -0,0 +1,116 @@
+import time
+import asyncio
+import inspect
+import logging
+
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterable, Awaitable, Callable, Optional, TypeVar, Union
+
+logger = logging.getLogger(__name__)
+
+# Количество страниц, ожидающих следующего этапа. Заполненный буфер приостанавливает предыдущий этап.
+PIPELINE_BUFFER = 2
+
+P = TypeVar('P')
+R = TypeVar('R')
+
+_DONE = object()
+
+
+@dataclass
+class StageStats:
+    """Время работы этапа конвейера."""
+    items: int = 0
+    busy: float = 0
+
+
+@dataclass
+class PipelineStats:
+    """Статистика конвейера по этапам: получение, обработка и запись страниц."""
+    fetch: StageStats = field(default_factory=StageStats)
+    parse: StageStats = field(default_factory=StageStats)
+    write: StageStats = field(default_factory=StageStats)
+    elapsed: float = 0
+
+
+async def run_pipeline(pages: AsyncIterable[P],
+                       parse: Callable[[P], Union[R, Awaitable[R]]],
+                       write: Optional[Callable[[R], Awaitable[Any]]] = None,
+                       buffer: int = PIPELINE_BUFFER,
+                       name: str = 'Конвейер') -> PipelineStats:
+    """
+        Постраничная загрузка с одновременной работой этапов.
+
+        Пока обрабатывается страница N, уже запрошена страница N+1 и записывается результат
+        страницы N-1. Между этапами не более `buffer` страниц: если следующий этап не успевает,
+        предыдущий ожидает. Ошибка любого этапа останавливает конвейер и передаётся вызывающему.
+
+        Args:
+            pages (AsyncIterable[P]): Страницы ответа API. Следующая страница запрашивается
+                сразу после передачи предыдущей в обработку.
+            parse (Callable[[P], R | Awaitable[R]]): Обработка страницы.
+            write (Callable[[R], Awaitable[Any]], optional): Запись результата обработки страницы.
+                Если не указана, результаты не передаются дальше обработки.
+            buffer (int, optional): Размер буфера между этапами.
+            name (str, optional): Название конвейера для журнала.
+
+        Returns:
+            PipelineStats: Время работы каждого этапа.
+    """
+    stats = PipelineStats()
+    fetched = asyncio.Queue(maxsize=buffer)
+    parsed = asyncio.Queue(maxsize=buffer)
+
+    async def fetch() -> None:
+        iterator = aiter(pages)
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    page = await anext(iterator)
+                except StopAsyncIteration:
+                    break
+                _add(stats.fetch, started)
+                await fetched.put(page)
+        finally:
+            if hasattr(iterator, 'aclose'):
+                await iterator.aclose()
+        await fetched.put(_DONE)
+
+    async def process() -> None:
+        while (page := await fetched.get()) is not _DONE:
+            started = time.perf_counter()
+            result = parse(page)
+            if inspect.isawaitable(result):
+                result = await result
+            _add(stats.parse, started)
+            if write is not None:
+                await parsed.put(result)
+        await parsed.put(_DONE)
+
+    async def store() -> None:
+        while (result := await parsed.get()) is not _DONE:
+            started = time.perf_counter()
+            await write(result)
+            _add(stats.write, started)
+
+    started = time.perf_counter()
+    tasks = [asyncio.ensure_future(stage()) for stage in (fetch, process, store)]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    stats.elapsed = time.perf_counter() - started
+
+    logger.info(f"{name}: страниц {stats.fetch.items}, получение {stats.fetch.busy:.1f} с, "
+                f"обработка {stats.parse.busy:.1f} с, запись {stats.write.busy:.1f} с, "
+                f"общее время {stats.elapsed:.1f} с")
+    return stats
+
+
+def _add(stage: StageStats, started: float) -> None:
+    stage.items += 1
+    stage.busy += time.perf_counter() - started
@@ -0,0 +1,112 @@
+import time
+import asyncio
+import logging
+
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Iterable, Optional
+
+from .cabinet_runner import CabinetResult
+
+logger = logging.getLogger(__name__)
+
+# Состояния отчёта, возвращаемые `ReportJob.poll`.
+REPORT_PENDING = 'pending'
+REPORT_READY = 'ready'
+REPORT_FAILED = 'failed'
+
+FIRST_DELAY = 5
+MAX_DELAY = 60
+BACKOFF = 1.5
+TIMEOUT = 30 * 60
+
+
+@dataclass
+class ReportJob:
+    """
+        Отчёт, формируемый маркетплейсом асинхронно: создание → ожидание готовности → загрузка.
+
+        Attributes:
+            name (str): Название отчёта для журнала.
+            create (Callable[[], Awaitable[Any]]): Создание отчёта. Возвращает идентификатор отчёта
+                или None, если отчёт не создан.
+            poll (Callable[[Any], Awaitable[str]]): Проверка готовности по идентификатору:
+                REPORT_PENDING, REPORT_READY или REPORT_FAILED.
+            download (Callable[[Any], Awaitable[Any]]): Загрузка и обработка готового отчёта.
+            first_delay (float): Пауза перед первой проверкой готовности, с.
+    """
+    name: str
+    create: Callable[[], Awaitable[Any]]
+    poll: Callable[[Any], Awaitable[str]]
+    download: Callable[[Any], Awaitable[Any]]
+    first_delay: float = FIRST_DELAY
+
+
+class ReportError(Exception):
+    """Отчёт не создан, не сформирован или не дождался готовности."""
+
+
+async def run_reports(jobs: Iterable[ReportJob], max_delay: float = MAX_DELAY, backoff: float = BACKOFF,
+                      timeout: float = TIMEOUT, concurrency: Optional[int] = None) -> list[CabinetResult]:
+    """
+        Одновременное формирование отчётов.
+
+        Все отчёты создаются сразу, готовность каждого проверяется с увеличивающейся паузой
+        (от `first_delay` до `max_delay`), и каждый отчёт загружается, как только готов. Общее время
+        близко ко времени самого долгого отчёта, а не к сумме. Ошибка одного отчёта
+        не прерывает остальные.
+
+        Args:
+            jobs (Iterable[ReportJob]): Отчёты всех кабинетов.
+            max_delay (float, optional): Максимальная пауза между проверками готовности, с.
+            backoff (float, optional): Множитель паузы после каждой проверки.
+            timeout (float, optional): Максимальное время ожидания готовности отчёта, с.
+            concurrency (int, optional): Количество одновременно обрабатываемых отчётов. По умолчанию без ограничения.
+
+        Returns:
+            list[CabinetResult]: Результаты загрузки в порядке следования отчётов.
+    """
+    jobs = list(jobs)
+    semaphore = asyncio.Semaphore(concurrency or max(len(jobs), 1))
+
+    async def run(job: ReportJob) -> CabinetResult:
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                result = await _run_report(job, max_delay=max_delay, backoff=backoff, timeout=timeout)
+                return CabinetResult(name=job.name, elapsed=time.perf_counter() - started, result=result)
+            except Exception as e:
+                logger.error(f"{job.name}: {e}")
+                return CabinetResult(name=job.name, elapsed=time.perf_counter() - started, error=e)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*[run(job) for job in jobs])
+
+    for result in results:
+        status = 'ок' if result.ok else f'ошибка: {result.error}'
+        logger.info(f"Отчёт '{result.name}': {result.elapsed:.1f} с, {status}")
+    failed = len([result for result in results if not result.ok])
+    logger.info(f"Сформировано отчётов: {len(results) - failed}, с ошибкой: {failed}, "
+                f"общее время {time.perf_counter() - started:.1f} с")
+    return results
+
+
+async def _run_report(job: ReportJob, max_delay: float, backoff: float, timeout: float) -> Any:
+    report_id = await job.create()
+    if report_id is None:
+        raise ReportError("Отчёт не создан")
+    logger.info(f"{job.name}: запрос отправлен ({report_id})")
+
+    deadline = time.monotonic() + timeout
+    delay = job.first_delay
+    while True:
+        await asyncio.sleep(delay)
+        state = await job.poll(report_id)
+        if state == REPORT_READY:
+            break
+        if state == REPORT_FAILED:
+            raise ReportError(f"Ошибка формирования отчёта {report_id}")
+        if time.monotonic() >= deadline:
+            raise ReportError(f"Отчёт {report_id} не сформирован за {timeout:.0f} с")
+        delay = min(delay * backoff, max_delay)
+
+    return await job.download(report_id)
@@ -1,13 +1,13 @@
 from .requests import *
 from .response import *
-from .core import SberAsyncEngine
+from .core import SberAsyncEngine, ConnectorConfig
 from .sb_endpoints_list import SberAPIFactory
 
 
 class SberApi:
 
-    def __init__(self, client_id: str, api_key: str):
-        self._engine = SberAsyncEngine()
+    def __init__(self, client_id: str, api_key: str, connector_config: ConnectorConfig = None):
+        self._engine = SberAsyncEngine(connector_config=connector_config)
         self._api_factory = SberAPIFactory(self._engine)
         self._client_id = client_id
         self._api_key = api_key
@@ -15,6 +15,16 @@ class SberApi:
         self._order_service_order_get_api = self._api_factory.get_api(OrderServiceOrderGetResponse)
         self._order_service_order_search_api = self._api_factory.get_api(OrderServiceOrderSearchResponse)
 
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def close(self) -> None:
+        """Закрытие сессии кабинета."""
+        await self._engine.close()
+
     async def get_order_service_order_search(self, date_from: str, date_to: str, statuses: list[str],
                                              count: int = 1000) -> OrderServiceOrderSearchResponse:
         request = OrderServiceOrderSearchRequest(data=OrderServiceOrderSearchDataRequest(token=self._api_key,
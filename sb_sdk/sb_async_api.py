@@ -1,5 +1,6 @@
 from .core import SberAsyncEngine
 from typing import Type
+from base_sdk import RawResponse
 from .response import BaseResponse
 
 
@@ -12,17 +13,21 @@ class SberAsyncApi:
 
     async def get(self, request):
         parameters = request.dict(by_alias=True)
-        response = await self._engine.get(self._url, parameters)
+        response = await self._engine.get(self._url, parameters, raw=True)
         data = await self._parse_response(response)
         return data
 
     async def post(self, params):
         params = params.dict(by_alias=True)
-        response = await self._engine.post(self._url, params=params)
+        response = await self._engine.post(self._url, params=params, raw=True)
         data = await self._parse_response(response)
         return data
 
-    async def _parse_response(self, response: dict or list):
+    async def _parse_response(self, response: RawResponse or dict):
+        if isinstance(response, RawResponse):
+            if not response.has_key('error'):
+                return response.validate(self._response_type)
+            response = response.json()
         if response.get("error"):
             raise Exception(response.get("errorText"))
         data = await self._parse_response_object(response)
@@ -31,4 +36,4 @@ class SberAsyncApi:
     async def _parse_response_object(self, response: dict):
         if response.get("error"):
             raise Exception(response.get("errorText"))
-        return self._response_type.parse_obj(response)
+        return self._response_type.model_validate(response)
@@ -0,0 +1,3 @@
+from .oz_postings import *
+from .oz_sku_resolver import *
+from .ya_united_report import *
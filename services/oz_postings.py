@@ -0,0 +1,202 @@
+import os
+import time
+import asyncio
+import logging
+
+import config
+
+from collections import OrderedDict
+from typing import Iterable, Optional, Union
+from datetime import timedelta
+
+from ozon_sdk.ozon_api import OzonApi
+from ozon_sdk.projections import PostingFBOFinanceView, PostingFBSFinanceView
+
+logger = logging.getLogger(__name__)
+
+# Каталог дискового кэша отправлений (`OZ_POSTING_CACHE_DIR` в config). Не задан — кэш только в памяти.
+POSTING_CACHE_DIR = getattr(config, 'OZ_POSTING_CACHE_DIR', None)
+# Количество отправлений в кэше процесса, при переполнении удаляются давно использованные.
+POSTING_CACHE_SIZE = 50000
+
+# Отправления хранятся в проекции: только товары и комиссии, нужные для финансовых операций.
+PostingResponse = Union[PostingFBOFinanceView, PostingFBSFinanceView]
+
+# Кэш отправлений процесса: (ID кабинета, номер отправления) -> (время получения, ответ).
+_postings: OrderedDict[tuple[str, str], tuple[float, PostingResponse]] = OrderedDict()
+# Каталоги, из которых в этом процессе уже удалены устаревшие файлы.
+_purged_dirs: set[str] = set()
+
+
+class OzPostingFetcher:
+    """
+        Получение данных отправлений Ozon для обогащения финансовых операций.
+
+        Номера отправлений страницы операций дедуплицируются и загружаются параллельно
+        (лимит endpoint'а соблюдает транспорт). Результаты кэшируются в памяти процесса
+        (не более `POSTING_CACHE_SIZE` отправлений, не дольше `ttl`) и, если указан `cache_dir`,
+        на диске, чтобы задания одного дня не запрашивали одно отправление повторно.
+        Устаревшие файлы дискового кэша удаляются при первом обращении к каталогу.
+    """
+
+    def __init__(self, api_user: OzonApi, client_id: str, cache_dir: str = None,
+                 ttl: timedelta = timedelta(days=1), concurrency: int = 10):
+        """
+            Args:
+                api_user (OzonApi): API-клиент кабинета.
+                client_id (str): ID кабинета.
+                cache_dir (str, optional): Каталог дискового кэша вне репозитория. Если не указан, кэш только в памяти.
+                ttl (timedelta, optional): Время жизни записи кэша.
+                concurrency (int, optional): Количество одновременных запросов.
+        """
+        self._api_user = api_user
+        self._client_id = client_id
+        self._cache_dir = os.path.join(cache_dir, client_id) if cache_dir else None
+        self._ttl = ttl.total_seconds()
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self.hits = 0
+        self.misses = 0
+
+    async def prefetch(self, postings: Iterable[tuple[str, str]]) -> None:
+        """
+            Загрузка отправлений, отсутствующих в кэше.
+
+            Args:
+                postings (Iterable[tuple[str, str]]): Пары (номер отправления, схема доставки).
+        """
+        await self._purge()
+        missing = {}
+        for posting_number, delivery_schema in postings:
+            if not posting_number or posting_number in missing:
+                continue
+            if self._from_cache(posting_number) is None and self._get_response_type(delivery_schema):
+                missing[posting_number] = delivery_schema
+        if missing:
+            await asyncio.gather(*[self._fetch(posting_number, delivery_schema)
+                                   for posting_number, delivery_schema in missing.items()])
+
+    async def get(self, posting_number: str, delivery_schema: str) -> Optional[PostingResponse]:
+        """
+            Данные отправления.
+
+            Args:
+                posting_number (str): Номер отправления.
+                delivery_schema (str): Схема доставки (FBO, FBS, RFBS).
+
+            Returns:
+                PostingFBOFinanceView or PostingFBSFinanceView or None: None для прочих схем доставки.
+        """
+        if self._get_response_type(delivery_schema) is None:
+            return None
+        await self._purge()
+        answer = self._from_cache(posting_number)
+        if answer is not None:
+            self.hits += 1
+            return answer
+        return await self._fetch(posting_number, delivery_schema)
+
+    def log_stats(self) -> None:
+        logger.info(f"Отправления: получено {self.hits}, загружено из API {self.misses}")
+
+    async def _fetch(self, posting_number: str, delivery_schema: str) -> PostingResponse:
+        async with self._semaphore:
+            if delivery_schema == 'FBO':
+                answer = await self._api_user.get_posting_fbo(posting_number=posting_number,
+                                                              analytics_data=True,
+                                                              financial_data=True,
+                                                              translit=True,
+                                                              projection=PostingFBOFinanceView)
+            else:
+                answer = await self._api_user.get_posting_fbs(posting_number=posting_number,
+                                                              analytics_data=True,
+                                                              financial_data=True,
+                                                              translit=True,
+                                                              projection=PostingFBSFinanceView)
+        self.misses += 1
+        self._remember(posting_number, answer, time.time())
+        self._save(posting_number, answer)
+        return answer
+
+    def _from_cache(self, posting_number: str) -> Optional[PostingResponse]:
+        key = (self._client_id, posting_number)
+        cached = _postings.get(key)
+        if cached is not None:
+            stored_at, answer = cached
+            if time.time() - stored_at <= self._ttl:
+                _postings.move_to_end(key)
+                return answer
+            del _postings[key]
+        if self._cache_dir:
+            loaded = self._load(posting_number)
+            if loaded is not None:
+                self._remember(posting_number, loaded[1], loaded[0])
+                return loaded[1]
+        return None
+
+    def _remember(self, posting_number: str, answer: PostingResponse, stored_at: float) -> None:
+        key = (self._client_id, posting_number)
+        _postings[key] = (stored_at, answer)
+        _postings.move_to_end(key)
+        while len(_postings) > POSTING_CACHE_SIZE:
+            _postings.popitem(last=False)
+
+    async def _purge(self) -> None:
+        if not self._cache_dir or self._cache_dir in _purged_dirs:
+            return
+        _purged_dirs.add(self._cache_dir)
+        await asyncio.to_thread(self._remove_expired)
+
+    def _remove_expired(self) -> None:
+        try:
+            entries = list(os.scandir(self._cache_dir))
+        except OSError:
+            return
+        removed = 0
+        for entry in entries:
+            try:
+                if time.time() - entry.stat().st_mtime > self._ttl:
+                    os.remove(entry.path)
+                    removed += 1
+            except OSError:
+                continue
+        if removed:
+            logger.info(f"Удалено устаревших отправлений из кэша: {removed}")
+
+    def _load(self, posting_number: str) -> Optional[tuple[float, PostingResponse]]:
+        for response_type in (PostingFBOFinanceView, PostingFBSFinanceView):
+            path = self._get_path(posting_number, response_type)
+            try:
+                stored_at = os.path.getmtime(path)
+                if time.time() - stored_at > self._ttl:
+                    os.remove(path)
+                    continue
+                with open(path, 'r', encoding='utf-8') as file:
+                    return stored_at, response_type.model_validate_json(file.read())
+            except (OSError, ValueError):
+                continue
+        return None
+
+    def _save(self, posting_number: str, answer: PostingResponse) -> None:
+        if not self._cache_dir:
+            return
+        try:
+            os.makedirs(self._cache_dir, exist_ok=True)
+            path = self._get_path(posting_number, type(answer))
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                file.write(answer.model_dump_json(by_alias=True, exclude_unset=True))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.error(f"Не удалось сохранить отправление {posting_number} в кэш: {e}")
+
+    def _get_path(self, posting_number: str, response_type: type) -> str:
+        suffix = 'fbo' if response_type is PostingFBOFinanceView else 'fbs'
+        return os.path.join(self._cache_dir, f'{posting_number}.{suffix}.json')
+
+    @staticmethod
+    def _get_response_type(delivery_schema: str) -> Optional[type]:
+        if delivery_schema == 'FBO':
+            return PostingFBOFinanceView
+        if delivery_schema in ['FBS', 'RFBS']:
+            return PostingFBSFinanceView
+        return None
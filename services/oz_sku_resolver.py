@@ -0,0 +1,126 @@
+import logging
+
+from typing import Iterable, Optional
+from datetime import timedelta
+
+from database import OzDbConnection
+from ozon_sdk.ozon_api import OzonApi
+
+logger = logging.getLogger(__name__)
+
+
+class OzSkuResolver:
+    """
+        Приведение SKU Ozon к SKU основного товара кабинета.
+
+        SKU уценённых и связанных товаров, отсутствующие в списке товаров кабинета, собираются
+        пакетом и разрешаются одним вызовом API на пакет (на части по ограничению endpoint'а
+        запрос разбивает SDK). Найденные соответствия (в том числе отсутствие соответствия)
+        сохраняются в таблице `oz_sku_mapping` и переиспользуются до истечения `ttl`.
+    """
+
+    def __init__(self, db_conn: OzDbConnection, api_user: OzonApi, client_id: str, known_skus: Iterable[str],
+                 related: bool = True, ttl: timedelta = timedelta(days=7)):
+        """
+            Args:
+                db_conn (OzDbConnection): Объект соединения с базой данных.
+                api_user (OzonApi): API-клиент кабинета.
+                client_id (str): ID кабинета.
+                known_skus (Iterable[str]): SKU товаров кабинета.
+                related (bool, optional): Искать основной товар также среди связанных SKU.
+                ttl (timedelta, optional): Время жизни сохранённого соответствия.
+        """
+        self._db_conn = db_conn
+        self._api_user = api_user
+        self._client_id = client_id
+        self._known_skus = set(known_skus)
+        self._related = related
+        self._ttl = ttl
+        self._discounted = {}
+        self._related_skus = {}
+
+    @classmethod
+    async def create(cls, db_conn: OzDbConnection, api_user: OzonApi, client_id: str, known_skus: Iterable[str],
+                     related: bool = True, ttl: timedelta = timedelta(days=7)) -> 'OzSkuResolver':
+        """
+            Создание разрешителя с загруженными из базы соответствиями (см. `load`).
+
+            Args:
+                db_conn (OzDbConnection): Объект соединения с базой данных.
+                api_user (OzonApi): API-клиент кабинета.
+                client_id (str): ID кабинета.
+                known_skus (Iterable[str]): SKU товаров кабинета.
+                related (bool, optional): Искать основной товар также среди связанных SKU.
+                ttl (timedelta, optional): Время жизни сохранённого соответствия.
+
+            Returns:
+                OzSkuResolver: Разрешитель SKU кабинета.
+        """
+        resolver = cls(db_conn=db_conn, api_user=api_user, client_id=client_id, known_skus=known_skus,
+                       related=related, ttl=ttl)
+        await resolver.load()
+        return resolver
+
+    async def load(self) -> None:
+        """Загрузка сохранённых соответствий из базы вне цикла событий."""
+        self._discounted = await self._db_conn.aio.get_oz_sku_mapping(client_id=self._client_id, kind='discounted',
+                                                                      ttl=self._ttl)
+        if self._related:
+            self._related_skus = await self._db_conn.aio.get_oz_sku_mapping(client_id=self._client_id,
+                                                                            kind='related', ttl=self._ttl)
+
+    async def prepare(self, skus: Iterable[str]) -> None:
+        """
+            Разрешение SKU, отсутствующих в списке товаров кабинета и в кэше соответствий.
+
+            Args:
+                skus (Iterable[str]): SKU товаров пакета.
+        """
+        unknown = {str(sku) for sku in skus if sku} - self._known_skus
+
+        missing = sorted(sku for sku in unknown if sku not in self._discounted)
+        if missing:
+            mapping = dict.fromkeys(missing)
+            answer = await self._api_user.get_product_info_discounted(discounted_skus=missing)
+            for info in answer.items if answer else []:
+                if str(info.discounted_sku) in mapping:
+                    mapping[str(info.discounted_sku)] = str(info.sku)
+            self._discounted.update(mapping)
+            await self._db_conn.aio.add_oz_sku_mapping(client_id=self._client_id, kind='discounted', mapping=mapping)
+
+        if not self._related:
+            return
+
+        candidates = {self._discounted.get(sku) or sku for sku in unknown} - self._known_skus
+        missing = sorted(sku for sku in candidates if sku not in self._related_skus)
+        if missing:
+            mapping = dict.fromkeys(missing)
+            answer = await self._api_user.get_product_related_sku_get(skus=missing)
+            products = {}
+            for info in answer.items if answer else []:
+                products.setdefault(info.product_id, []).append(str(info.sku))
+            for related_skus in products.values():
+                base_sku = next((sku for sku in related_skus if sku in self._known_skus), None)
+                if base_sku is None:
+                    continue
+                for sku in related_skus:
+                    if sku in mapping:
+                        mapping[sku] = base_sku
+            self._related_skus.update(mapping)
+            await self._db_conn.aio.add_oz_sku_mapping(client_id=self._client_id, kind='related', mapping=mapping)
+
+    def resolve(self, sku: str) -> str:
+        """
+            SKU основного товара.
+
+            Args:
+                sku (str): SKU товара.
+
+            Returns:
+                str: SKU основного товара или исходный SKU, если соответствие не найдено.
+        """
+        if sku not in self._known_skus:
+            sku = self._discounted.get(sku) or sku
+        if self._related and sku not in self._known_skus:
+            sku = self._related_skus.get(sku) or sku
+        return sku
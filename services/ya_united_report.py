@@ -0,0 +1,252 @@
+import asyncio
+import logging
+
+from functools import partial
+from datetime import datetime, date
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, Iterator, Optional
+
+from openpyxl import load_workbook
+
+from data_classes import DataYaReport
+
+logger = logging.getLogger(__name__)
+
+# Количество записей в пачке для записи в базу.
+REPORT_BATCH_SIZE = 10000
+
+# Листы отчёта по стоимости услуг. Листы «Платное хранение …» находятся по названию.
+YA_REPORT_SHEETS = ['Обработка заказов в СЦ или ПВЗ',
+                    'Размещение товаров на витрине',
+                    'Обработка заказов на складе',
+                    'Приём платежа',
+                    'Перевод платежа',
+                    'Доставка покупателю',
+                    'Экспресс-доставка покупателю',
+                    'Поставка через транзитный склад',  # new
+                    'Доставка из-за рубежа',  # new pass
+                    'Программа лояльности и отзывы',
+                    'Буст продаж, оплата за показы',
+                    'Буст продаж, оплата за продажи',
+                    'Полки',
+                    'Баннеры',  # new pass
+                    'Хранение невыкупов и возвратов',
+                    'Рассрочка',  # new pass
+                    'Приём излишков на складе',  # new pass
+                    'Организация утилизации',
+                    'Вывоз со склада, СЦ, ПВЗ',
+                    'Организация забора заказов',  # new pass
+                    'Вознаграждение за продажу',  # new pass
+                    'Расширенный доступ к сервисам',  # new pass
+                    'Складская обработка'  # new
+                    ]
+STORAGE_SHEET = 'Платное хранение'
+
+# Колонки полей отчёта в порядке приоритета: значение берётся из первой непустой колонки.
+YA_REPORT_HEADERS = {'client_id': ('ID бизнес-аккаунта',),
+                     'posting_number': ('Номер заказа',),
+                     'operation_date': ('Дата оказания услуги',
+                                        'Дата и время оказания услуги'),
+                     'service': ('Услуга',),
+                     'vendor_code': ('Ваш SKU',),
+                     'cost': ('Стоимость услуги (',
+                              'Стоимость услуги, ₽',
+                              'Стоимость услуги',
+                              'Постоплата, ₽',
+                              'Стоимость платного хранения, ₽')
+                     }
+# Заголовки, которые ищутся как часть названия колонки (валюта указана в скобках).
+_PARTIAL_HEADERS = {'Стоимость услуги ('}
+_HEADERS = {header for names in YA_REPORT_HEADERS.values() for header in names}
+
+
+def convert_id(number):
+    if number is not None:
+        number = str(number).split('.')[0]
+    return number
+
+
+def report_sheet_groups(sheet_names: list[str]) -> list[list[str]]:
+    """
+        Листы отчёта, которые есть в файле, сгруппированные по типу операции.
+
+        Каждый лист — отдельная группа, все листы «Платное хранение» — одна группа,
+        так как записи этих листов агрегируются вместе.
+
+        Args:
+            sheet_names (list[str]): Названия листов файла.
+
+        Returns:
+            list[list[str]]: Группы листов.
+    """
+    groups = []
+    for sheet in YA_REPORT_SHEETS:
+        if sheet in sheet_names:
+            groups.append([sheet])
+        else:
+            logger.error(f'Лист "{sheet}" не найден в файле.')
+    storage = [sheet for sheet in sheet_names if STORAGE_SHEET in sheet]
+    if storage:
+        groups.append(storage)
+    return groups
+
+
+def parse_report(path_file: str, campaign_id: str, groups: list[list[str]] = None) -> Iterator[list[DataYaReport]]:
+    """
+        Разбор файла отчёта по стоимости услуг за один проход по каждому листу.
+
+        Файл открывается в режиме `read_only`: строки листа читаются по одной, строка заголовков
+        определяется по первой строке с известным заголовком, колонки сопоставляются полям один раз.
+        Записи агрегируются по группе листов, поэтому память определяется количеством
+        уникальных записей группы, а не размером файла.
+
+        Args:
+            path_file (str): Путь к файлу отчёта.
+            campaign_id (str): ID магазина.
+            groups (list[list[str]], optional): Группы листов (см. `report_sheet_groups`).
+                По умолчанию все листы отчёта, найденные в файле.
+
+        Yields:
+            list[DataYaReport]: Агрегированные записи группы листов.
+    """
+    workbook = load_workbook(path_file, read_only=True, data_only=True)
+    try:
+        for group in groups if groups is not None else report_sheet_groups(workbook.sheetnames):
+            operation_type = STORAGE_SHEET if STORAGE_SHEET in group[0] else group[0]
+            aggregate = {}
+            for sheet in group:
+                for key, cost in _iter_sheet(workbook[sheet]):
+                    if key in aggregate:
+                        aggregate[key] += cost
+                    else:
+                        aggregate[key] = cost
+            yield [DataYaReport(client_id=client_id,
+                                campaign_id=campaign_id,
+                                date=operation_date,
+                                posting_number=posting_number,
+                                operation_type=operation_type,
+                                vendor_code=vendor_code,
+                                service=service,
+                                cost=cost)
+                   for (client_id, posting_number, operation_date, vendor_code, service), cost in aggregate.items()]
+    finally:
+        workbook.close()
+
+
+def parse_report_groups(path_file: str, campaign_id: str, groups: list[list[str]]) -> list[list[DataYaReport]]:
+    """Разбор групп листов в отдельном процессе (см. `parse_report`)."""
+    return list(parse_report(path_file=path_file, campaign_id=campaign_id, groups=groups))
+
+
+async def iter_yandex_report(path_file: str, campaign_id: str, batch_size: int = REPORT_BATCH_SIZE,
+                             processes: int = 0) -> AsyncIterator[list[DataYaReport]]:
+    """
+        Пачки записей отчёта по стоимости услуг для записи в базу.
+
+        Разбор выполняется вне цикла событий: по умолчанию в потоке, лист за листом,
+        при `processes` > 1 — группы листов распределяются между процессами.
+
+        Args:
+            path_file (str): Путь к файлу отчёта.
+            campaign_id (str): ID магазина.
+            batch_size (int, optional): Максимальное количество записей в пачке.
+            processes (int, optional): Количество процессов разбора. 0 — без пула процессов.
+
+        Yields:
+            list[DataYaReport]: Пачки записей.
+    """
+    if processes > 1:
+        groups = await asyncio.to_thread(_sheet_groups, path_file)
+        loop = asyncio.get_running_loop()
+        executor = ProcessPoolExecutor(max_workers=processes)
+        try:
+            futures = [loop.run_in_executor(executor, partial(parse_report_groups, path_file, campaign_id,
+                                                              groups[i::processes]))
+                       for i in range(min(processes, len(groups)))]
+            for future in asyncio.as_completed(futures):
+                for rows in await future:
+                    for i in range(0, len(rows), batch_size):
+                        yield rows[i:i + batch_size]
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        return
+
+    sheets = parse_report(path_file=path_file, campaign_id=campaign_id)
+    try:
+        while (rows := await asyncio.to_thread(next, sheets, None)) is not None:
+            for i in range(0, len(rows), batch_size):
+                yield rows[i:i + batch_size]
+    finally:
+        await asyncio.to_thread(sheets.close)
+
+
+def _sheet_groups(path_file: str) -> list[list[str]]:
+    workbook = load_workbook(path_file, read_only=True)
+    try:
+        return report_sheet_groups(workbook.sheetnames)
+    finally:
+        workbook.close()
+
+
+def _iter_sheet(sheet) -> Iterator[tuple[tuple, float]]:
+    # Размеры листа в файле могут быть указаны неверно, строки читаются целиком
+    sheet.reset_dimensions()
+    rows = sheet.iter_rows(values_only=True)
+
+    for row in rows:
+        if any(cell in _HEADERS for cell in row if isinstance(cell, str)):
+            columns = _header_columns(row)
+            break
+    else:
+        return
+
+    for row in rows:
+        client_id = _first(row, columns['client_id'])
+        posting_number = _first(row, columns['posting_number'])
+        operation_date = _to_date(_first(row, columns['operation_date']))
+        cost = _to_cost(_first(row, columns['cost']))
+        if operation_date is None or cost is None:
+            continue
+        vendor_code = _first(row, columns['vendor_code'])
+        service = _first(row, columns['service'])
+        yield (convert_id(client_id),
+               convert_id(posting_number),
+               operation_date,
+               str(vendor_code) if vendor_code is not None else None,
+               str(service) if service is not None else None), cost
+
+
+def _header_columns(row: tuple) -> dict[str, list[int]]:
+    names = [str(cell) if cell is not None else '' for cell in row]
+    columns = {}
+    for metric, headers in YA_REPORT_HEADERS.items():
+        columns[metric] = []
+        for header in headers:
+            if header in _PARTIAL_HEADERS:
+                columns[metric].extend(i for i, name in enumerate(names) if header in name)
+            elif header in names:
+                columns[metric].append(names.index(header))
+    return columns
+
+
+def _first(row: tuple, indexes: list[int]):
+    return next((row[i] for i in indexes if i < len(row) and row[i]), None)
+
+
+def _to_date(value) -> Optional[date]:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    try:
+        # Формат 'YYYY-MM-DD HH:MM:SS'; fromisoformat заметно быстрее strptime
+        return datetime.fromisoformat(value).date()
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_cost(value) -> Optional[float]:
+    try:
+        return round(float(value), 2) if value is not None else None
+    except (TypeError, ValueError):
+        return None
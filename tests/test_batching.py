@@ -0,0 +1,80 @@
+import asyncio
+
+from typing import Optional
+
+from pydantic import BaseModel
+
+from base_sdk import gather_params, merge_responses, split_params
+
+
+class Item(BaseModel):
+    id: str
+
+
+class Result(BaseModel):
+    items: list[Item]
+    total: int
+
+
+class Response(BaseModel):
+    result: Optional[Result] = None
+    cursor: str = ''
+
+
+def test_split_params_keeps_small_request():
+    assert split_params(3, offer_id=['a'], product_id=[1, 2]) == [{'offer_id': ['a'], 'product_id': [1, 2]}]
+    assert split_params(None, product_id=list(range(10))) == [{'product_id': list(range(10))}]
+
+
+def test_split_params_splits_each_list_separately():
+    parts = split_params(2, offer_id=['a', 'b', 'c'], product_id=[1, 2], sku=None)
+
+    assert parts == [{'offer_id': ['a', 'b'], 'product_id': None, 'sku': None},
+                     {'offer_id': ['c'], 'product_id': None, 'sku': None},
+                     {'offer_id': None, 'product_id': [1, 2], 'sku': None}]
+
+
+def test_split_and_merge_round_trip():
+    ids = [str(i) for i in range(7)]
+    offer_ids = [f'offer-{i}' for i in range(3)]
+    active = 0
+    max_active = 0
+
+    async def fetch(product_id: list = None, offer_id: list = None) -> Optional[Response]:
+        nonlocal active, max_active
+        active += 1
+        max_active = max(max_active, active)
+        # Первые части отвечают дольше, порядок ответов определяется порядком частей
+        await asyncio.sleep(0.01 * len(product_id or offer_id))
+        active -= 1
+        values = (product_id or []) + (offer_id or [])
+        if values == ['6']:
+            return None
+        return Response(result=Result(items=[Item(id=value) for value in values], total=len(values)),
+                        cursor=values[0])
+
+    parts = split_params(2, product_id=ids, offer_id=offer_ids)
+    responses = asyncio.run(gather_params(fetch, parts, concurrency=2))
+    merged = merge_responses(responses, 'result.items')
+
+    assert len(parts) == 6
+    assert max_active == 2
+    # Пустой ответ части пропускается, остальные элементы идут в порядке частей
+    assert [item.id for item in merged.result.items] == ids[:6] + offer_ids
+    # Поля вне объединяемого пути берутся из первого ответа
+    assert merged.result.total == 2
+    assert merged.cursor == '0'
+    assert responses[0].result.items == [Item(id='0'), Item(id='1')]
+
+
+def test_merge_takes_base_from_first_filled_response():
+    empty = Response(cursor='empty')
+    filled = Response(result=Result(items=[Item(id='1')], total=1), cursor='filled')
+    other = Response(result=Result(items=[Item(id='2')], total=1), cursor='other')
+
+    merged = merge_responses([empty, filled, other], 'result.items')
+
+    assert [item.id for item in merged.result.items] == ['1', '2']
+    assert merged.result.total == 1
+    assert merge_responses([None, None], 'result.items') is None
+    assert merge_responses([None, other], 'result.items') is other
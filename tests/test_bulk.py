@@ -0,0 +1,100 @@
+import datetime
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects import postgresql
+
+from data_classes import DataWBStatisticAdvert
+from database import wb_db
+from database.bulk import MAX_PARAMETERS, bulk_insert, bulk_upsert
+from database.models import WBAdverts, WBStatisticAdvert, WBStock
+
+
+class RecordingSession:
+    def __init__(self):
+        self.statements = []
+
+    def flush(self) -> None:
+        pass
+
+    def execute(self, statement) -> None:
+        self.statements.append(statement.compile(dialect=postgresql.dialect()))
+
+
+def quantities(statement) -> list[int]:
+    return sorted(value for name, value in statement.params.items() if name.startswith('quantity_warehouse'))
+
+
+def test_upsert_keeps_last_row_per_key_and_updates_columns():
+    session = RecordingSession()
+    rows = [{'sku': '1', 'vendor_code': 'a', 'quantity_warehouse': 1},
+            {'sku': '2', 'vendor_code': 'b', 'quantity_warehouse': 2},
+            {'sku': '1', 'vendor_code': 'c', 'quantity_warehouse': 3}]
+
+    assert bulk_upsert(session, WBStock, rows, index_elements=['sku'], update_columns=['quantity_warehouse']) == 2
+
+    [statement] = session.statements
+    sql = str(statement)
+    assert 'ON CONFLICT (sku) DO UPDATE SET quantity_warehouse = excluded.quantity_warehouse' in sql
+    assert 'vendor_code = excluded' not in sql
+    assert quantities(statement) == [2, 3]
+
+
+def test_upsert_without_update_columns_keeps_first_row():
+    session = RecordingSession()
+    rows = [{'sku': '1', 'quantity_warehouse': 1},
+            {'sku': '1', 'quantity_warehouse': 3},
+            {'sku': None, 'quantity_warehouse': 4},
+            {'sku': None, 'quantity_warehouse': 5}]
+
+    # Строки с NULL в ключе не конфликтуют и передаются все
+    assert bulk_upsert(session, WBStock, rows, index_elements=['sku']) == 3
+
+    [statement] = session.statements
+    assert 'ON CONFLICT (sku) DO NOTHING' in str(statement)
+    assert quantities(statement) == [1, 4, 5]
+
+
+def test_chunks_fit_parameter_limit():
+    session = RecordingSession()
+    columns = ['date', 'client_id', 'sku', 'vendor_code', 'size', 'category', 'subject']
+    rows = ({column: n for column in columns} for n in range(20000))
+
+    assert bulk_insert(session, WBStock, rows, chunk_size=100000) == 20000
+
+    sizes = [len(statement.params) for statement in session.statements]
+    assert all(size <= MAX_PARAMETERS for size in sizes)
+    assert sizes[0] == MAX_PARAMETERS // len(columns) * len(columns)
+    assert sum(sizes) == 20000 * len(columns)
+
+
+def test_bulk_functions_skip_empty_rows():
+    session = RecordingSession()
+
+    assert bulk_upsert(session, WBStock, [], index_elements=['sku']) == 0
+    assert bulk_insert(session, WBStock, iter([])) == 0
+    assert session.statements == []
+
+
+def test_advert_statistics_upsert_writes_sum_price(monkeypatch):
+    # В исходной версии при обновлении существующей записи в sum_price записывалось значение atbs
+    engine = create_engine('sqlite://')
+    WBAdverts.__table__.create(engine)
+    WBStatisticAdvert.__table__.create(engine)
+    db_conn = wb_db.WBDbConnection(engine=engine)
+    recording = RecordingSession()
+    monkeypatch.setattr(db_conn, 'get_wb_sku_vendor_code', lambda client_id: {'100': 'art-1'})
+    monkeypatch.setattr(wb_db, 'bulk_upsert', lambda session, **kwargs: bulk_upsert(recording, **kwargs))
+
+    statistic = DataWBStatisticAdvert(client_id='1', sku='100', advert_id='7', date=datetime.date(2024, 6, 1),
+                                      views=50, clicks=5, atbs=3, orders_count=2, shks=2, sum_price=1234.5,
+                                      sum_cost=99.0, app_type='1')
+    db_conn.add_wb_adverts_statistics(client_id='1', product_advertising_campaign=[statistic],
+                                      start_date=datetime.date(2024, 6, 1), end_date=datetime.date(2024, 6, 1))
+    db_conn.close()
+
+    [statement] = recording.statements
+    assert statement.params['sum_price_m0'] == 1234.5
+    assert statement.params['atbs_m0'] == 3
+    # При конфликте sum_price обновляется своим значением, а не atbs
+    assert 'sum_price = excluded.sum_price' in str(statement)
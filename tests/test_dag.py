@@ -0,0 +1,100 @@
+import asyncio
+
+from types import SimpleNamespace
+
+import pytest
+
+import run_jobs
+import wb_stocks
+
+from database.db import DB_POOL_SIZE
+from runners import CABINET_CONCURRENCY, CabinetResult, CabinetsFailed, DependencyFailed, Job, raise_on_failure, run_dag
+
+
+class FakeDbConnection:
+    def __init__(self, engine: object = None):
+        self.engine = engine
+
+    def start_db(self) -> None:
+        pass
+
+    def get_clients(self, marketplace: str) -> list:
+        return [SimpleNamespace(name_company='Кабинет', client_id='1', api_key='key')]
+
+    def close(self) -> None:
+        pass
+
+
+def test_failed_dependency_skips_dependents():
+    started = []
+
+    async def ok(name: str) -> str:
+        started.append(name)
+        return name
+
+    async def fail() -> None:
+        started.append('cards')
+        raise RuntimeError('карточки не загружены')
+
+    jobs = [Job('cards', fail),
+            Job('orders', lambda: ok('orders'), depends_on=('cards',)),
+            Job('sheets', lambda: ok('sheets'), depends_on=('orders',)),
+            Job('stocks', lambda: ok('stocks'))]
+
+    results = asyncio.run(run_dag(jobs))
+
+    assert isinstance(results['cards'].error, RuntimeError)
+    assert isinstance(results['orders'].error, DependencyFailed)
+    assert isinstance(results['sheets'].error, DependencyFailed)
+    assert results['stocks'].ok and results['stocks'].result == 'stocks'
+    assert sorted(started) == ['cards', 'stocks']
+
+
+def test_entry_point_error_reaches_dag(monkeypatch):
+    def unavailable():
+        raise RuntimeError('нет соединения')
+
+    monkeypatch.setattr(wb_stocks, 'WBDbConnection', unavailable)
+
+    # Без raise_errors ошибка только записывается в журнал, как при запуске скрипта
+    assert asyncio.run(wb_stocks.main_wb_stock()) is None
+    with pytest.raises(RuntimeError):
+        asyncio.run(wb_stocks.main_wb_stock(raise_errors=True))
+
+    results = asyncio.run(run_dag([Job('wb_stocks', lambda: wb_stocks.main_wb_stock(raise_errors=True)),
+                                   Job('google_sheet_report', lambda: asyncio.sleep(0),
+                                       depends_on=('wb_stocks',))]))
+    assert not results['wb_stocks'].ok
+    assert isinstance(results['google_sheet_report'].error, DependencyFailed)
+
+
+def test_cabinet_failure_inside_run_cabinets_skips_dependents(monkeypatch):
+    async def get_stocks(**kwargs) -> None:
+        raise RuntimeError('API недоступен')
+
+    monkeypatch.setattr(wb_stocks, 'WBDbConnection', FakeDbConnection)
+    monkeypatch.setattr(wb_stocks, 'get_stocks', get_stocks)
+
+    results = asyncio.run(run_dag([Job('wb_stocks', lambda: wb_stocks.main_wb_stock(raise_errors=True)),
+                                   Job('google_sheet_report', lambda: asyncio.sleep(0),
+                                       depends_on=('wb_stocks',))]))
+
+    assert isinstance(results['wb_stocks'].error, CabinetsFailed)
+    assert isinstance(results['google_sheet_report'].error, DependencyFailed)
+
+
+def test_raise_on_failure_allows_partial_results():
+    ok = CabinetResult(name='first', elapsed=0)
+    failed = CabinetResult(name='second', elapsed=0, error=RuntimeError())
+
+    assert raise_on_failure([]) == []
+    assert raise_on_failure([ok, failed]) == [ok, failed]
+    with pytest.raises(CabinetsFailed, match='second'):
+        raise_on_failure([failed])
+    with pytest.raises(CabinetsFailed):
+        raise_on_failure([ok, failed], allow_partial=False)
+
+
+def test_db_pool_covers_concurrent_sessions():
+    # Внешняя сессия каждой задачи и сессии её кабинетов
+    assert DB_POOL_SIZE >= run_jobs.JOB_CONCURRENCY * (1 + CABINET_CONCURRENCY)
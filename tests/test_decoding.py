@@ -0,0 +1,23 @@
+from pydantic import BaseModel
+
+from base_sdk import RawResponse, decoding
+
+
+class Item(BaseModel):
+    id: int
+    name: str
+
+
+def test_validate_without_orjson_uses_model_validate_json(monkeypatch):
+    calls = []
+
+    def model_validate(*args, **kwargs):
+        calls.append(args)
+        raise AssertionError('без orjson ответ не должен разбираться через json.loads')
+
+    monkeypatch.setattr(decoding, '_json_loads', None)
+    monkeypatch.setattr(Item, 'model_validate', model_validate)
+
+    assert RawResponse(b'{"id": 1, "name": "a"}').validate(Item) == Item(id=1, name='a')
+    assert RawResponse(b'[1, 2]').json() == [1, 2]
+    assert calls == []
@@ -0,0 +1,74 @@
+import os
+import time
+import asyncio
+
+from datetime import timedelta
+
+import pytest
+
+from ozon_sdk.projections import PostingFBOFinanceView
+from services import oz_postings
+from services.oz_postings import OzPostingFetcher
+
+
+class FakeOzonApi:
+    def __init__(self):
+        self.calls = []
+
+    async def get_posting_fbo(self, posting_number: str, **kwargs) -> PostingFBOFinanceView:
+        self.calls.append(posting_number)
+        return PostingFBOFinanceView.model_validate({'result': {}})
+
+
+@pytest.fixture(autouse=True)
+def clear_cache(monkeypatch):
+    monkeypatch.setattr(oz_postings, '_postings', oz_postings.OrderedDict())
+    monkeypatch.setattr(oz_postings, '_purged_dirs', set())
+
+
+def test_memory_cache_drops_least_recently_used(monkeypatch):
+    monkeypatch.setattr(oz_postings, 'POSTING_CACHE_SIZE', 2)
+    api = FakeOzonApi()
+    fetcher = OzPostingFetcher(api_user=api, client_id='1')
+
+    async def main() -> None:
+        for posting_number in ('a', 'b', 'a', 'c', 'a', 'b'):
+            await fetcher.get(posting_number, 'FBO')
+
+    asyncio.run(main())
+
+    # «b» вытеснено при добавлении «c», так как «a» использовалось позже
+    assert api.calls == ['a', 'b', 'c', 'b']
+    assert len(oz_postings._postings) == 2
+
+
+def test_memory_cache_expires_by_ttl():
+    api = FakeOzonApi()
+    fetcher = OzPostingFetcher(api_user=api, client_id='1', ttl=timedelta(seconds=0.1))
+
+    asyncio.run(fetcher.get('a', 'FBO'))
+    time.sleep(0.15)
+    asyncio.run(fetcher.get('a', 'FBO'))
+
+    assert api.calls == ['a', 'a']
+
+
+def test_stale_disk_cache_files_are_removed(tmp_path):
+    client_dir = tmp_path / '1'
+    client_dir.mkdir()
+    stale = client_dir / 'old.fbo.json'
+    stale.write_text('{"result": {}}', encoding='utf-8')
+    day_ago = time.time() - 2 * 24 * 3600
+    os.utime(stale, (day_ago, day_ago))
+
+    api = FakeOzonApi()
+    fetcher = OzPostingFetcher(api_user=api, client_id='1', cache_dir=str(tmp_path))
+    asyncio.run(fetcher.get('a', 'FBO'))
+
+    assert not stale.exists()
+    assert (client_dir / 'a.fbo.json').exists()
+
+    # Новый процесс читает отправление с диска без запроса к API
+    oz_postings._postings.clear()
+    asyncio.run(fetcher.get('a', 'FBO'))
+    assert api.calls == ['a']
@@ -0,0 +1,158 @@
+import asyncio
+
+import pytest
+
+from base_sdk import iter_cursor_pages, iter_items, iter_numbered_pages, next_last_id, next_offset
+
+
+class NumberedApi:
+    def __init__(self, page_count: int, delays: dict = None):
+        self.page_count = page_count
+        self.delays = delays or {}
+        self.requested = []
+        self.active = 0
+        self.max_active = 0
+        self.cancelled = []
+
+    async def fetch(self, page: int) -> dict:
+        self.requested.append(page)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delays.get(page, 0.01))
+        except asyncio.CancelledError:
+            self.cancelled.append(page)
+            raise
+        finally:
+            self.active -= 1
+        return {'page': page, 'page_count': self.page_count}
+
+
+def test_numbered_pages_keep_order_under_concurrency():
+    # Страницы с меньшими номерами отвечают дольше
+    api = NumberedApi(page_count=8, delays={page: 0.01 * (10 - page) for page in range(1, 9)})
+
+    async def main() -> list:
+        return [answer['page'] async for answer in iter_numbered_pages(api.fetch, lambda answer: answer['page_count'],
+                                                                       concurrency=3)]
+
+    assert asyncio.run(main()) == list(range(1, 9))
+    assert api.max_active == 3
+
+
+def test_numbered_pages_single_page_when_count_missing():
+    api = NumberedApi(page_count=0)
+
+    async def main() -> list:
+        return [answer['page'] async for answer in iter_numbered_pages(api.fetch, lambda answer: answer['page_count'])]
+
+    assert asyncio.run(main()) == [1]
+    assert api.requested == [1]
+
+
+def test_numbered_pages_cancel_pending_requests_on_early_stop():
+    api = NumberedApi(page_count=10, delays={page: 1 for page in range(3, 11)})
+
+    async def main() -> list:
+        pages = iter_numbered_pages(api.fetch, lambda answer: answer['page_count'], concurrency=4)
+        received = []
+        async for answer in pages:
+            received.append(answer['page'])
+            if answer['page'] == 2:
+                break
+        await pages.aclose()
+        return received
+
+    assert asyncio.run(asyncio.wait_for(main(), 5)) == [1, 2]
+    # Запрошены только страницы в пределах concurrency, ожидающие ответа отменены
+    assert sorted(api.cancelled) == [3, 4, 5]
+    assert api.active == 0
+
+
+class CursorApi:
+    """Список товаров с пагинацией по `last_id`: `total` — общее количество, а не размер страницы."""
+
+    def __init__(self, count: int, limit: int, fail_on: str = None):
+        self.items = [f'item-{i}' for i in range(count)]
+        self.limit = limit
+        self.fail_on = fail_on
+        self.requested = []
+
+    async def fetch(self, last_id: str = None) -> dict:
+        self.requested.append(last_id)
+        await asyncio.sleep(0.01)
+        if last_id is not None and last_id == self.fail_on:
+            raise RuntimeError('ошибка страницы')
+        start = int(last_id) if last_id else 0
+        page = self.items[start:start + self.limit]
+        return {'items': page, 'last_id': str(start + len(page)) if page else '', 'total': len(self.items)}
+
+    def next_cursor(self, answer: dict, last_id: str = None) -> str:
+        return next_last_id(answer['last_id'], answer['items'], self.limit)
+
+
+def collect(pages) -> list:
+    async def main() -> list:
+        return [item async for item in iter_items(pages, lambda answer: answer['items'])]
+
+    return asyncio.run(asyncio.wait_for(main(), 5))
+
+
+def test_short_page_stop_rule():
+    assert next_offset(0, [1, 2], limit=2) == 2
+    assert next_offset(2, [1], limit=2) is None
+    assert next_offset(4, [], limit=2) is None
+    assert next_offset(4, None, limit=2) is None
+    assert next_last_id('abc', [1, 2], limit=2) == 'abc'
+    assert next_last_id('abc', [1], limit=2) is None
+    assert next_last_id('', [1, 2], limit=2) is None
+
+
+@pytest.mark.parametrize('count', [0, 5, 6, 1000, 1001])
+def test_cursor_pages_stop_after_short_page(count):
+    # `total` >= limit не останавливает загрузку, останавливает неполная страница
+    api = CursorApi(count=count, limit=1000 if count >= 1000 else 3)
+
+    items = collect(iter_cursor_pages(api.fetch, api.next_cursor))
+
+    assert items == api.items
+    # Последний запрос возвращает неполную (или пустую) страницу
+    assert len(api.requested) == count // api.limit + 1
+
+
+def test_cursor_pages_prefetch_next_page():
+    api = CursorApi(count=9, limit=3)
+
+    async def main() -> list:
+        requested = []
+        async for answer in iter_cursor_pages(api.fetch, api.next_cursor, prefetch=1):
+            await asyncio.sleep(0.05)
+            requested.append(len(api.requested))
+        return requested
+
+    # Пока обрабатывается страница, следующая уже загружена (`prefetch`), а за ней запрошена ещё одна
+    assert asyncio.run(main()) == [3, 4, 4, 4]
+
+
+def test_cursor_pages_error_reaches_caller():
+    api = CursorApi(count=9, limit=3, fail_on='3')
+
+    with pytest.raises(RuntimeError, match='ошибка страницы'):
+        collect(iter_cursor_pages(api.fetch, api.next_cursor))
+
+
+def test_cursor_pages_stop_producer_on_early_stop():
+    api = CursorApi(count=100, limit=3)
+
+    async def main() -> None:
+        pages = iter_cursor_pages(api.fetch, api.next_cursor, prefetch=2)
+        async for _ in pages:
+            break
+        await pages.aclose()
+        requested = len(api.requested)
+        await asyncio.sleep(0.1)
+        assert len(api.requested) == requested
+
+    asyncio.run(main())
+    # Первая страница, не более `prefetch` загруженных заранее и одна в запросе
+    assert len(api.requested) <= 4
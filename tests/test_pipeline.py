@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from runners import run_pipeline
+
+
+async def numbered_pages(count: int, delay: float = 0, fetched: list = None):
+    for number in range(count):
+        await asyncio.sleep(delay)
+        if fetched is not None:
+            fetched.append(number)
+        yield number
+
+
+def test_pages_keep_order_through_stages():
+    written = []
+
+    async def parse(page: int) -> int:
+        # Первые страницы обрабатываются дольше последующих
+        await asyncio.sleep(0.01 * (5 - page))
+        return page * 10
+
+    async def write(result: int) -> None:
+        written.append(result)
+
+    stats = asyncio.run(run_pipeline(numbered_pages(5), parse=parse, write=write))
+
+    assert written == [0, 10, 20, 30, 40]
+    assert stats.fetch.items == stats.parse.items == stats.write.items == 5
+
+
+def test_stages_overlap():
+    async def parse(page: int) -> int:
+        await asyncio.sleep(0.05)
+        return page
+
+    async def write(result: int) -> None:
+        await asyncio.sleep(0.05)
+
+    stats = asyncio.run(run_pipeline(numbered_pages(4, delay=0.05), parse=parse, write=write))
+
+    # Последовательно 4 × 3 × 0.05 = 0.6 с, с перекрытием этапов около (4 + 2) × 0.05
+    assert stats.elapsed < 0.45
+
+
+def test_full_buffer_pauses_fetch():
+    fetched = []
+    release = asyncio.Event()
+    buffer = 2
+
+    async def write(result: int) -> None:
+        await release.wait()
+
+    async def main() -> list:
+        pipeline = asyncio.ensure_future(run_pipeline(numbered_pages(20, fetched=fetched), parse=lambda page: page,
+                                                      write=write, buffer=buffer))
+        await asyncio.sleep(0.1)
+        snapshot = list(fetched)
+        release.set()
+        await pipeline
+        return snapshot
+
+    snapshot = asyncio.run(main())
+
+    # Одна страница записывается, по `buffer` ждут записи и обработки, одна в обработке, одна в получении
+    assert len(snapshot) == 1 + 2 * buffer + 2
+    assert len(fetched) == 20
+
+
+def test_stage_error_reaches_caller_and_cancels_other_stages():
+    cancelled = []
+
+    async def pages():
+        try:
+            number = 0
+            while True:
+                yield number
+                number += 1
+        finally:
+            cancelled.append('fetch')
+
+    async def write(result: int) -> None:
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append('write')
+            raise
+
+    def parse(page: int) -> int:
+        if page == 3:
+            raise ValueError('битая страница')
+        return page
+
+    async def main() -> None:
+        await asyncio.wait_for(run_pipeline(pages(), parse=parse, write=write), 5)
+
+    with pytest.raises(ValueError, match='битая страница'):
+        asyncio.run(main())
+    assert sorted(cancelled) == ['fetch', 'write']
@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from base_sdk import AsyncTransport, EndpointLimits, RateLimit, RateLimiter, TokenBucket
+
+from tests.test_transport import FakeResponse, FakeSession, make_transport
+
+
+def test_bucket_spaces_requests_by_interval():
+    bucket = TokenBucket(RateLimit(2, 1))
+
+    waits = [bucket.reserve() for _ in range(3)]
+
+    assert waits[0] == 0
+    assert waits[1] == pytest.approx(0.5, abs=0.01)
+    assert waits[2] == pytest.approx(1.0, abs=0.01)
+
+
+def test_bucket_burst_allows_requests_without_waiting():
+    bucket = TokenBucket(RateLimit(1, 1, burst=3))
+
+    assert [bucket.reserve() for _ in range(3)] == [0, 0, 0]
+    assert bucket.reserve() == pytest.approx(1.0, abs=0.01)
+
+
+def test_buckets_are_shared_per_marketplace_key_and_endpoint():
+    limiter = RateLimiter()
+    limit = RateLimit(1, 60)
+
+    bucket = limiter.get_bucket('wb', 'client-1', '/api/v2/fullstats', limit)
+
+    assert limiter.get_bucket('wb', 'client-1', '/api/v2/fullstats', limit) is bucket
+    assert limiter.get_bucket('wb', 'client-2', '/api/v2/fullstats', limit) is not bucket
+    assert limiter.get_bucket('ozon', 'client-1', '/api/v2/fullstats', limit) is not bucket
+    assert limiter.get_bucket('wb', 'client-1', '/api/v1/stocks', limit) is not bucket
+
+    # Другой лимит того же ключа — новый бакет
+    assert limiter.get_bucket('wb', 'client-1', '/api/v2/fullstats', RateLimit(2, 60)) is not bucket
+
+
+def test_endpoint_template_matches_single_path_segment():
+    limits = EndpointLimits()
+    limit = RateLimit(1, 5)
+    template = 'https://api.test/api/v1/tasks/{task_id}/status'
+    limits.add(template, limit)
+    limits.add('https://api.test/api/v1/tasks', RateLimit(1, 60))
+
+    assert limits.match('https://api.test/api/v1/tasks/42/status') == (template, limit)
+    assert limits.match('https://api.test/api/v1/tasks/abc-1/status') == (template, limit)
+    assert limits.match('https://api.test/api/v1/tasks/1/2/status') is None
+    assert limits.match('https://api.test/api/v1/tasks/1/status/extra') is None
+    assert limits.match('https://api.test/api/v1/tasks') == ('https://api.test/api/v1/tasks', RateLimit(1, 60))
+
+
+def test_transport_throttles_each_cabinet_separately():
+    limiter = RateLimiter()
+    sessions = {}
+    transports = {}
+    for key in ('client-1', 'client-2'):
+        sessions[key] = FakeSession(*[FakeResponse(200) for _ in range(2)])
+        transports[key] = make_transport(sessions[key], transport=AsyncTransport(base_url='https://api.test',
+                                                                                  limit_key=key, limiter=limiter))
+        transports[key].set_rate_limits({'/api/v1/tasks/{task_id}/status': RateLimit(5, 1)})
+
+    async def main() -> None:
+        await asyncio.gather(*[transports[key].request('GET', f'/api/v1/tasks/{i}/status')
+                               for key in transports for i in range(2)])
+
+    asyncio.run(main())
+
+    for session in sessions.values():
+        first, second = sorted(call[2] for call in session.calls)
+        assert second - first >= 0.19
+    # Кабинеты не ждут друг друга: первые запросы отправлены сразу
+    assert abs(sessions['client-1'].calls[0][2] - sessions['client-2'].calls[0][2]) < 0.1
@@ -0,0 +1,102 @@
+import time
+import asyncio
+
+import pytest
+
+from types import SimpleNamespace
+
+from base_sdk import AsyncTransport, RetryPolicy, ResponseError, TransportError
+from ozon_sdk.core.ozon_async_engine import OzonAsyncEngine
+from ozon_sdk.errors import ClientError
+
+
+class FakeResponse:
+    def __init__(self, status: int, body: bytes = b'{}', headers: dict = None):
+        self.status = status
+        self.headers = headers or {}
+        self.request_info = SimpleNamespace(headers={})
+        self._body = body
+
+    async def read(self) -> bytes:
+        return self._body
+
+    async def text(self) -> str:
+        return self._body.decode()
+
+    async def __aenter__(self) -> 'FakeResponse':
+        return self
+
+    async def __aexit__(self, *args) -> bool:
+        return False
+
+
+class FakeSession:
+    def __init__(self, *responses: FakeResponse):
+        self.responses = list(responses)
+        self.calls = []
+
+    def request(self, method: str, url: str, **kwargs) -> FakeResponse:
+        self.calls.append((method, url, time.monotonic()))
+        return self.responses.pop(0)
+
+
+def make_transport(session: FakeSession, transport: AsyncTransport = None, **policy) -> AsyncTransport:
+    transport = transport or AsyncTransport(base_url='https://api.test',
+                                            retry_policy=RetryPolicy(jitter=0, **policy))
+
+    async def get_session() -> FakeSession:
+        return session
+
+    transport._get_session = get_session
+    return transport
+
+
+def run(coroutine, timeout: float = 5):
+    return asyncio.run(asyncio.wait_for(coroutine, timeout))
+
+
+def test_retry_after_header_sets_delay():
+    session = FakeSession(FakeResponse(500, headers={'Retry-After': '0.2'}), FakeResponse(200, b'{"ok": 1}'))
+    # Без заголовка пауза была бы 100 с и тест не уложился бы в таймаут
+    transport = make_transport(session, backoff=100)
+
+    assert run(transport.request('GET', '/items')) == {'ok': 1}
+    assert len(session.calls) == 2
+    assert session.calls[1][2] - session.calls[0][2] >= 0.2
+
+
+def test_retry_after_is_capped_and_respects_status_minimum():
+    policy = RetryPolicy(jitter=0, max_retry_after=30)
+
+    assert policy.get_delay(0, 500, {'Retry-After': '7'}) == 7
+    assert policy.get_delay(0, 500, {'retry-after': '3600'}) == 30
+    assert policy.get_delay(0, 429, {'Retry-After': '0'}) == 1
+    assert policy.get_delay(3, 500) == 8
+
+
+def test_client_error_status_raises_without_retry():
+    session = FakeSession(FakeResponse(404), FakeResponse(200))
+    transport = make_transport(session, backoff=100)
+
+    with pytest.raises(ResponseError) as error:
+        run(transport.request('GET', '/items'))
+    assert error.value.status == 404
+    assert len(session.calls) == 1
+
+
+def test_deadline_stops_retries():
+    session = FakeSession(*[FakeResponse(500, headers={'Retry-After': '0.2'}) for _ in range(10)])
+    transport = make_transport(session, retries=10, deadline=0.3)
+
+    with pytest.raises(TransportError):
+        run(transport.request('GET', '/items'))
+    assert len(session.calls) == 2
+
+
+def test_ozon_non_json_400_raises_client_error():
+    session = FakeSession(FakeResponse(400, b'<html>Bad Gateway</html>'))
+    transport = make_transport(session, transport=OzonAsyncEngine(client_id='1', api_key='key'))
+
+    with pytest.raises(ClientError) as error:
+        run(transport.request('POST', '/v1/items'))
+    assert '400' in str(error.value)
@@ -8,7 +8,8 @@ from datetime import datetime, timedelta
 from sqlalchemy.exc import OperationalError
 
 from wb_sdk.wb_api import WBApi
-from database import WBDbConnection
+from runners import run_cabinets, raise_on_failure
+from database import WBDbConnection, Client
 from data_classes import DataWBAcceptance
 
 nest_asyncio.apply()
@@ -36,10 +37,9 @@ async def add_acceptance(db_conn: WBDbConnection, client_id: str, api_key: str,
     list_acceptance = []
 
     # Инициализация API-клиента WB
-    api_user = WBApi(api_key=api_key)
-
-    # Получение отчёта по приёмке товара
-    answer = await api_user.get_analytics_acceptance_report(date_from=from_date, date_to=to_date)
+    async with WBApi(api_key=api_key) as api_user:
+        # Получение отчёта по приёмке товара
+        answer = await api_user.get_analytics_acceptance_report(date_from=from_date, date_to=to_date)
 
     # Обработка полученных результатов
     for acceptance in answer.report:
@@ -69,10 +69,10 @@ async def add_acceptance(db_conn: WBDbConnection, client_id: str, api_key: str,
                                                 cost=cost))
 
     logger.info(f"Количсетво строк: {len(list_acceptance)}")
-    db_conn.add_wb_acceptance_entry(client_id=client_id, list_acceptance=list_acceptance)
+    await db_conn.aio.add_wb_acceptance_entry(client_id=client_id, list_acceptance=list_acceptance)
 
 
-async def main_wb_acceptance(retries: int = 6) -> None:
+async def main_wb_acceptance(retries: int = 6, raise_errors: bool = False) -> None:
     try:
         db_conn = WBDbConnection()
 
@@ -84,7 +84,7 @@ async def main_wb_acceptance(retries: int = 6) -> None:
         from_date = date_now - timedelta(days=1)
         to_date = date_now - timedelta(microseconds=1)
 
-        for client in clients:
+        async def job(db_conn: WBDbConnection, client: Client) -> None:
             logger.info(f'Сбор информации о приёмке товара маназина {client.name_company} '
                         f'за дату {from_date.date().isoformat()}')
             await add_acceptance(db_conn=db_conn,
@@ -92,13 +92,20 @@ async def main_wb_acceptance(retries: int = 6) -> None:
                                  api_key=client.api_key,
                                  from_date=from_date.isoformat(),
                                  to_date=to_date.isoformat())
+
+        results = await run_cabinets(db_conn=db_conn, cabinets=clients, job=job)
+        raise_on_failure(results)
     except OperationalError:
         logger.error(f'Не доступна база данных. Осталось попыток подключения: {retries - 1}')
         if retries > 0:
             await asyncio.sleep(10)
-            await main_wb_acceptance(retries=retries - 1)
+            await main_wb_acceptance(retries=retries - 1, raise_errors=raise_errors)
+        elif raise_errors:
+            raise
     except Exception as e:
         logger.error(f'{e}')
+        if raise_errors:
+            raise
 
 if __name__ == "__main__":
     loop = asyncio.get_event_loop()
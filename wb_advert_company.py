@@ -8,10 +8,15 @@ import zipfile
 import nest_asyncio
 
 from datetime import datetime, timedelta
+from contextlib import AsyncExitStack
 from sqlalchemy.exc import OperationalError
 
+from base_sdk import batches
 from wb_sdk.wb_api import WBApi
-from database import WBDbConnection
+from wb_sdk.entities import ListGood
+from runners import (run_cabinets, run_pipeline, run_reports,
+                     ReportJob, REPORT_PENDING, REPORT_READY, REPORT_FAILED, raise_on_failure)
+from database import WBDbConnection, Client
 from data_classes import DataWBAdvert, DataWBCardProduct, DataWBStatisticAdvert, DataWBStatisticCardProduct
 
 nest_asyncio.apply()
@@ -35,45 +40,44 @@ async def add_adverts(db_conn: WBDbConnection, client_id: str, api_key: str) ->
         return datetime.strptime(date_format.split('T')[0], time_format).date()
 
     # Инициализация API-клиента WB
-    api_user = WBApi(api_key=api_key)
-
-    adverts_list = []
-
-    status_dict = {
-        7: 'Кампания завершена',
-        9: 'Идут показы',
-        11: 'Кампания на паузе',
-    }
-    type_dict = {
-        8: 'Автоматическая кампания',
-        9: 'Аукцион'
-    }
-
-    # Запрос данных по статусу и типу РК
-    for status in status_dict.keys():
-        for type_field in type_dict.keys():
-            # Получение списка РК
-            answer_advent = await api_user.get_promotion_adverts(status=status, type_field=type_field)
-
-            # Обработка полученных результатов
-            if answer_advent:
-                for advert in answer_advent.result:
-                    create_time = format_date(date_format=advert.createTime)  # Дата создания РК
-                    change_time = format_date(date_format=advert.changeTime)  # Дата последнего изменения РК
-                    start_time = format_date(date_format=advert.startTime)  # Дата последнего старта РК
-                    end_time = format_date(date_format=advert.endTime)  # Дата окончания РК
-
-                    adverts_list.append(DataWBAdvert(id_advert=str(advert.advertId),
-                                                     id_type=advert.type,
-                                                     id_status=advert.status,
-                                                     name_advert=advert.name,
-                                                     create_time=create_time,
-                                                     change_time=change_time,
-                                                     start_time=start_time,
-                                                     end_time=end_time))
+    async with WBApi(api_key=api_key) as api_user:
+        adverts_list = []
+
+        status_dict = {
+            7: 'Кампания завершена',
+            9: 'Идут показы',
+            11: 'Кампания на паузе',
+        }
+        type_dict = {
+            8: 'Автоматическая кампания',
+            9: 'Аукцион'
+        }
+
+        # Запрос данных по статусу и типу РК
+        for status in status_dict.keys():
+            for type_field in type_dict.keys():
+                # Получение списка РК
+                answer_advent = await api_user.get_promotion_adverts(status=status, type_field=type_field)
+
+                # Обработка полученных результатов
+                if answer_advent:
+                    for advert in answer_advent.result:
+                        create_time = format_date(date_format=advert.createTime)  # Дата создания РК
+                        change_time = format_date(date_format=advert.changeTime)  # Дата последнего изменения РК
+                        start_time = format_date(date_format=advert.startTime)  # Дата последнего старта РК
+                        end_time = format_date(date_format=advert.endTime)  # Дата окончания РК
+
+                        adverts_list.append(DataWBAdvert(id_advert=str(advert.advertId),
+                                                         id_type=advert.type,
+                                                         id_status=advert.status,
+                                                         name_advert=advert.name,
+                                                         create_time=create_time,
+                                                         change_time=change_time,
+                                                         start_time=start_time,
+                                                         end_time=end_time))
 
     logger.info(f"Обновление информации о рекламных компаний")
-    db_conn.add_wb_adverts(client_id=client_id, adverts_list=adverts_list)
+    await db_conn.aio.add_wb_adverts(client_id=client_id, adverts_list=adverts_list)
 
 
 async def get_product_card(db_conn: WBDbConnection, client_id: str, api_key: str) -> None:
@@ -85,20 +89,9 @@ async def get_product_card(db_conn: WBDbConnection, client_id: str, api_key: str
             client_id (str): ID кабинета.
             api_key (str): API KEY кабинета.
     """
-    offset = 0
-    limit = 1000
-
-    # Инициализация API-клиента WB
-    api_user = WBApi(api_key=api_key)
-
-    list_card_product = []
-
-    while True:
-        # Получение списка КТ
-        answer = await api_user.get_list_goods_filter(limit=limit, offset=offset)
-
-        # Обработка полученных результатов
-        for product in answer.data.listGoods:
+    def parse(products: list[ListGood]) -> list[DataWBCardProduct]:
+        list_card_product = []
+        for product in products:
             price = round(product.sizes[0].price, 2)  # Цена товара
             discount_price = round(product.sizes[0].discountedPrice, 2)  # Цена товара со скидкой
             link = f"https://www.wildberries.ru/catalog/{product.nmID}/detail.aspx"  # Ссылка на товар
@@ -108,15 +101,18 @@ async def get_product_card(db_conn: WBDbConnection, client_id: str, api_key: str
                                                        link=link,
                                                        price=price,
                                                        discount_price=discount_price))
+        return list_card_product
 
-        # Получение остальных страниц результата
-        if len(answer.data.listGoods) < 1000:
-            break
-
-        offset += limit
+    async def write(list_card_product: list[DataWBCardProduct]) -> None:
+        await db_conn.aio.add_wb_cards_products(list_card_product=list_card_product)
 
     logger.info(f"Обновление информации о карточках товаров")
-    db_conn.add_wb_cards_products(list_card_product=list_card_product)
+
+    # Инициализация API-клиента WB
+    async with WBApi(api_key=api_key) as api_user:
+        pages = batches(api_user.iter_list_goods_filter(limit=1000), size=1000)
+        await run_pipeline(pages=pages, parse=parse, write=write,
+                           name=f"Карточки товаров {client_id}")
 
 
 async def add_statistic_adverts(db_conn: WBDbConnection, client_id: str, api_key: str,
@@ -138,7 +134,7 @@ async def add_statistic_adverts(db_conn: WBDbConnection, client_id: str, api_key
     sd = start_date
 
     # Получение ID РК и время создания и окончания
-    adverts = db_conn.get_wb_adverts_id(client_id=client_id, from_date=start_date)
+    adverts = await db_conn.aio.get_wb_adverts_id(client_id=client_id, from_date=start_date)
     company_ids = [company_id for company_id in adverts]
 
     date_list = []
@@ -154,28 +150,26 @@ async def add_statistic_adverts(db_conn: WBDbConnection, client_id: str, api_key
         return
 
     # Инициализация API-клиента WB
-    api_user = WBApi(api_key=api_key)
-
-    app_type = {
-        0: 'Неизвестно',
-        1: 'Сайт',
-        32: 'Android',
-        64: 'IOS'
-    }
-
-    # Запрос статистики РК по 100 компаний за цикл
-    for dates in [date_list[i:i + 10] for i in range(0, len(date_list), 10)]:
-        filter_company_ids = []
-        for company_id in company_ids:
-            create = adverts.get(company_id)[0].isoformat()
-            end = adverts.get(company_id)[1].isoformat()
-            if not all(create > d for d in dates):
-                if not all(end < d for d in dates):
-                    filter_company_ids.append(company_id)
-        if not filter_company_ids:
-            continue
-        for ids in [company_ids[i:i+100] for i in range(0, len(company_ids), 100)]:
-            answer = await api_user.get_fullstats(company_ids=ids, dates=dates)
+    async with WBApi(api_key=api_key) as api_user:
+        app_type = {
+            0: 'Неизвестно',
+            1: 'Сайт',
+            32: 'Android',
+            64: 'IOS'
+        }
+
+        # Запрос статистики РК по 10 дней за цикл
+        for dates in [date_list[i:i + 10] for i in range(0, len(date_list), 10)]:
+            filter_company_ids = []
+            for company_id in company_ids:
+                create = adverts.get(company_id)[0].isoformat()
+                end = adverts.get(company_id)[1].isoformat()
+                if not all(create > d for d in dates):
+                    if not all(end < d for d in dates):
+                        filter_company_ids.append(company_id)
+            if not filter_company_ids:
+                continue
+            answer = await api_user.get_fullstats(company_ids=filter_company_ids, dates=dates)
 
             # Обработка полученных результатов
             if answer:
@@ -216,72 +210,100 @@ async def add_statistic_adverts(db_conn: WBDbConnection, client_id: str, api_key
                                         )
 
     logger.info(f"Количество записей: {len(product_advertising_campaign)}")
-    db_conn.add_wb_adverts_statistics(client_id=client_id,
-                                      product_advertising_campaign=product_advertising_campaign,
-                                      start_date=start_date,
-                                      end_date=end_date)
+    await db_conn.aio.add_wb_adverts_statistics(client_id=client_id,
+                                                product_advertising_campaign=product_advertising_campaign,
+                                                start_date=start_date,
+                                                end_date=end_date)
 
 
-async def get_statistic_card_product(db_conn: WBDbConnection, client_id: str, api_key: str,
-                                     from_date: datetime) -> None:
+def statistic_card_product_report(db_conn: WBDbConnection, api_user: WBApi, client: Client,
+                                  from_date: datetime) -> ReportJob:
     """
-        Получение списка статистики карточек товара за указанную дату.
+        Отчёт статистики карточек товара за 30 дней до указанной даты.
 
         Args:
             db_conn (WBDbConnection): Объект соединения с базой данных.
-            client_id (str): ID кабинета.
-            api_key (str): API KEY кабинета.
+            api_user (WBApi): API-клиент кабинета.
+            client (Client): Кабинет.
             from_date (datetime): Дата, за которую собираются данные.
-    """
-    list_card_product = []
 
+        Returns:
+            ReportJob: Отчёт для `run_reports`.
+    """
     end_date = from_date.date()
     start_date = end_date - timedelta(days=30)
 
-    # Инициализация API-клиента WB
-    api_user = WBApi(api_key=api_key)
+    async def create() -> str or None:
+        new_uuid = str(uuid.uuid4())
+
+        # Создание отчёта статистики КТ
+        answer_report = await api_user.get_mm_report_downloads(uuid=new_uuid,
+                                                               start_date=start_date.isoformat(),
+                                                               end_date=end_date.isoformat())
+        if answer_report.error:
+            logger.error(f"Ошибка создания отчёта статистики КТ: {answer_report.errorText}")
+            return None
+        return new_uuid
+
+    async def poll(report_uuid: str) -> str:
+        answer = await api_user.get_nm_report_downloads_list(uuid=report_uuid)
+        for report in (answer.data or []) if answer else []:
+            if report.id_field != report_uuid:
+                continue
+            if report.status == 'SUCCESS':
+                return REPORT_READY
+            if report.status == 'FAILED':
+                return REPORT_FAILED
+        return REPORT_PENDING
+
+    async def download(report_uuid: str) -> None:
+        # Получение отчёта статистики КТ
+        answer_download = await api_user.get_nm_report_downloads_file(uuid=report_uuid)
+        await add_statistic_card_product(db_conn=db_conn, client_id=client.client_id, file=answer_download.file)
 
-    new_uuid = str(uuid.uuid4())
+    return ReportJob(name=client.name_company, create=create, poll=poll, download=download)
 
-    # Создание отчёта статистики КТ
-    answer_report = await api_user.get_mm_report_downloads(uuid=new_uuid,
-                                                           start_date=start_date.isoformat(),
-                                                           end_date=end_date.isoformat())
-    if not answer_report.error:
-        await asyncio.sleep(5)
 
-        # Получение отчёта статистики КТ
-        answer_download = await api_user.get_nm_report_downloads_file(uuid=new_uuid)
-        zip_file = io.BytesIO(answer_download.file)
-        with zipfile.ZipFile(zip_file, 'r') as zip_ref:
-            csv_filename = zip_ref.namelist()[0]
-            with zip_ref.open(csv_filename) as csv_file:
-                csv_reader = csv.DictReader(io.TextIOWrapper(csv_file, encoding='utf-8'))
-                data = [row for row in csv_reader]
-                skus = db_conn.get_wb_sku_vendor_code(client_id=client_id)
-                for row in data:
-                    sku = row.get('nmID', 0)
-                    vendor_code = skus.get(sku)
-                    if not vendor_code:
-                        continue
-                    list_card_product.append(DataWBStatisticCardProduct(
-                        sku=sku,
-                        vendor_code=skus.get(sku),
-                        client_id=client_id,
-                        date=datetime.strptime(row.get('dt'), '%Y-%m-%d').date(),
-                        open_card_count=int(row.get('openCardCount', 0)),
-                        add_to_cart_count=int(row.get('addToCartCount', 0)),
-                        orders_count=int(row.get('ordersCount', 0)),
-                        buyouts_count=int(row.get('buyoutsCount', 0)),
-                        cancel_count=int(row.get('cancelCount', 0)),
-                        orders_sum=round(float(row.get('ordersSumRub', 0)), 2)
-                    ))
+async def add_statistic_card_product(db_conn: WBDbConnection, client_id: str, file: bytes) -> None:
+    """
+        Добавление статистики карточек товара из архива отчёта.
+
+        Args:
+            db_conn (WBDbConnection): Объект соединения с базой данных.
+            client_id (str): ID кабинета.
+            file (bytes): ZIP-архив отчёта статистики КТ.
+    """
+    list_card_product = []
+
+    with zipfile.ZipFile(io.BytesIO(file), 'r') as zip_ref:
+        csv_filename = zip_ref.namelist()[0]
+        with zip_ref.open(csv_filename) as csv_file:
+            csv_reader = csv.DictReader(io.TextIOWrapper(csv_file, encoding='utf-8'))
+            data = [row for row in csv_reader]
+            skus = await db_conn.aio.get_wb_sku_vendor_code(client_id=client_id)
+            for row in data:
+                sku = row.get('nmID', 0)
+                vendor_code = skus.get(sku)
+                if not vendor_code:
+                    continue
+                list_card_product.append(DataWBStatisticCardProduct(
+                    sku=sku,
+                    vendor_code=skus.get(sku),
+                    client_id=client_id,
+                    date=datetime.strptime(row.get('dt'), '%Y-%m-%d').date(),
+                    open_card_count=int(row.get('openCardCount', 0)),
+                    add_to_cart_count=int(row.get('addToCartCount', 0)),
+                    orders_count=int(row.get('ordersCount', 0)),
+                    buyouts_count=int(row.get('buyoutsCount', 0)),
+                    cancel_count=int(row.get('cancelCount', 0)),
+                    orders_sum=round(float(row.get('ordersSumRub', 0)), 2)
+                ))
 
     logger.info(f"Количество записей: {len(list_card_product)}")
-    db_conn.add_wb_cards_products_statistics(client_id=client_id, list_card_product=list_card_product)
+    await db_conn.aio.add_wb_cards_products_statistics(client_id=client_id, list_card_product=list_card_product)
 
 
-async def main_wb_advert(retries: int = 6) -> None:
+async def main_wb_advert(retries: int = 6, raise_errors: bool = False) -> None:
     try:
         db_conn = WBDbConnection()
         db_conn.start_db()
@@ -290,31 +312,45 @@ async def main_wb_advert(retries: int = 6) -> None:
         date_now = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
         from_date = date_now - timedelta(days=1)
 
-        for client in clients:
+        async def job(db_conn: WBDbConnection, client: Client) -> None:
             logger.info(f"Сбор карточек товаров {client.name_company}")
             await get_product_card(db_conn=db_conn, client_id=client.client_id, api_key=client.api_key)
 
             logger.info(f"Сбор рекламных компаний {client.name_company}")
             await add_adverts(db_conn=db_conn, client_id=client.client_id, api_key=client.api_key)
 
-            logger.info(f"Статистика карточек товара {client.name_company} за {from_date.date().isoformat()}")
-            await get_statistic_card_product(db_conn=db_conn,
-                                             client_id=client.client_id,
-                                             api_key=client.api_key,
-                                             from_date=from_date)
-
             logger.info(f"Статистика рекламы {client.name_company}")
             await add_statistic_adverts(db_conn=db_conn,
                                         client_id=client.client_id,
                                         api_key=client.api_key,
                                         from_date=from_date)
+
+        results = await run_cabinets(db_conn=db_conn, cabinets=clients, job=job)
+        raise_on_failure(results)
+
+        # Отчёты статистики КТ всех кабинетов создаются сразу и загружаются по готовности
+        logger.info(f"Статистика карточек товара за {from_date.date().isoformat()}")
+        async with AsyncExitStack() as stack:
+            jobs = []
+            for client in clients:
+                api_user = await stack.enter_async_context(WBApi(api_key=client.api_key))
+                jobs.append(statistic_card_product_report(db_conn=db_conn,
+                                                          api_user=api_user,
+                                                          client=client,
+                                                          from_date=from_date))
+            results = await run_reports(jobs)
+            raise_on_failure(results)
     except OperationalError:
         logger.error(f'Не доступна база данных. Осталось попыток подключения: {retries - 1}')
         if retries > 0:
             await asyncio.sleep(10)
-            await main_wb_advert(retries=retries - 1)
+            await main_wb_advert(retries=retries - 1, raise_errors=raise_errors)
+        elif raise_errors:
+            raise
     except Exception as e:
         logger.error(f'{e}')
+        if raise_errors:
+            raise
 
 
 if __name__ == "__main__":
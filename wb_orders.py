@@ -3,24 +3,32 @@ import logging
 
 import nest_asyncio
 
-from datetime import timedelta, date
+from datetime import datetime, timedelta, date, time
 
 from sqlalchemy.exc import OperationalError
 
 from wb_sdk.wb_api import WBApi
 from data_classes import DataWBOrder
-from database import WBDbConnection
+from runners import run_cabinets, raise_on_failure
+from database import WBDbConnection, Client
 
 nest_asyncio.apply()
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)-8s %(message)s')
 logger = logging.getLogger(__name__)
 
+SYNC_ENDPOINT = 'wb_supplier_orders'
+# Запас перекрытия с уже загруженными изменениями (lastChangeDate).
+SYNC_OVERLAP = timedelta(hours=1)
+
 
 async def add_wb_orders_entry(db_conn: WBDbConnection, client_id: str, api_key: str, date_now: date) -> None:
     """
         Получает список заказов для указанного клиента за определенный период времени.
 
+        Загружаются заказы, изменённые с момента последней успешной синхронизации кабинета
+        (с запасом `SYNC_OVERLAP`); при первом запуске — за последние 10 дней.
+
         Args:
             db_conn (WBDbConnection): Объект соединения с базой данных.
             client_id (str): ID кабинета.
@@ -29,19 +37,24 @@ async def add_wb_orders_entry(db_conn: WBDbConnection, client_id: str, api_key:
                 Формат: YYYY-MM-DDTHH:mm:ss.sssZ.
                 Пример: 2019-11-25T10:43:06.51Z.
     """
-    date_from = date_now - timedelta(days=10)
+    today = datetime.combine(date_now, time())
+    date_from = await db_conn.aio.get_sync_start(client_id=client_id, endpoint=SYNC_ENDPOINT,
+                                                 default=today - timedelta(days=10), overlap=SYNC_OVERLAP)
     logger.info(f"За дату {date_now - timedelta(days=1)}")
 
     list_orders = []
 
     # Инициализация API-клиента WB
-    api_user = WBApi(api_key=api_key)
-
-    # Получение списка заказов
-    answer_orders = await api_user.get_supplier_orders(date_from=date_from.isoformat(), flag=0)
+    async with WBApi(api_key=api_key) as api_user:
+        # Получение списка заказов
+        answer_orders = await api_user.get_supplier_orders(date_from=date_from.isoformat(), flag=0)
 
     # Обработка полученных результатов
+    watermark = None
     for order in answer_orders.result:
+        if order.lastChangeDate:
+            last_change = order.lastChangeDate.replace(tzinfo=None)
+            watermark = max(watermark, last_change) if watermark else last_change
         if order.orderType != "Клиентский":
             continue
 
@@ -72,10 +85,15 @@ async def add_wb_orders_entry(db_conn: WBDbConnection, client_id: str, api_key:
                                        warehouse_type=warehouse_type))
 
     logger.info(f"Количество записей: {len(list_orders)}")
-    db_conn.add_wb_orders(list_orders=list_orders)
+    await db_conn.aio.add_wb_orders(list_orders=list_orders)
 
+    if watermark:
+        # Заказы текущего дня пропускаются, поэтому отметка не может быть позже его начала
+        await db_conn.aio.set_sync_state(client_id=client_id, endpoint=SYNC_ENDPOINT,
+                                         watermark=min(watermark, today))
 
-async def main_orders_wb(retries: int = 6) -> None:
+
+async def main_orders_wb(retries: int = 6, raise_errors: bool = False) -> None:
     try:
         db_conn = WBDbConnection()
         db_conn.start_db()
@@ -83,19 +101,26 @@ async def main_orders_wb(retries: int = 6) -> None:
 
         date_now = date.today()
 
-        for client in clients:
+        async def job(db_conn: WBDbConnection, client: Client) -> None:
             logger.info(f"Добавление в базу данных компании {client.name_company}")
             await add_wb_orders_entry(db_conn=db_conn,
                                       client_id=client.client_id,
                                       api_key=client.api_key,
                                       date_now=date_now)
+
+        results = await run_cabinets(db_conn=db_conn, cabinets=clients, job=job)
+        raise_on_failure(results)
     except OperationalError:
         logger.error(f'Не доступна база данных. Осталось попыток подключения: {retries - 1}')
         if retries > 0:
             await asyncio.sleep(10)
-            await main_orders_wb(retries=retries - 1)
+            await main_orders_wb(retries=retries - 1, raise_errors=raise_errors)
+        elif raise_errors:
+            raise
     except Exception as e:
         logger.error(f'{e}')
+        if raise_errors:
+            raise
 
 
 if __name__ == "__main__":
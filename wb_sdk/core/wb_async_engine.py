@@ -1,94 +1,50 @@
-import asyncio
 import aiohttp
 import logging
 
+from base_sdk import AsyncTransport, ConnectorConfig, RetryPolicy, RetryRequest
 from config import PROXY
 
 logger = logging.getLogger(__name__)
 
 
-class WBAsyncEngine:
-    def __init__(self, api_key: str = ''):
+class WBAsyncEngine(AsyncTransport):
+    marketplace = 'wb'
+    ok_statuses = (200, 201, 204)
+
+    def __init__(self, api_key: str = '', connector_config: ConnectorConfig = None, retry_policy: RetryPolicy = None):
+        super().__init__(proxy=PROXY, timeout=120, connector_config=connector_config or ConnectorConfig(ssl=False),
+                         retry_policy=retry_policy, limit_key=api_key)
         self.__headers = {
             'Authorization': api_key
         }
-        self.proxy_url = PROXY
 
-    async def get(self, url: str, json: dict, params: dict, file: bool) -> dict:
-        response = await self._perform_get_request(url, file, json, params)
+    async def get(self, url: str, json: dict, params: dict, file: bool, raw: bool = False) -> dict:
+        response = await self.request('GET', url, params=params, json=json, file=file, raw=raw)
         return response
 
-    async def post(self, url: str, json: dict, params: dict) -> dict:
-        response = await self._perform_post_request(url, json, params)
+    async def post(self, url: str, json: dict, params: dict, raw: bool = False) -> dict:
+        response = await self.request('POST', url, params=params, json=json, raw=raw)
         return response
 
-    async def _perform_get_request(self, url, file: bool, json=None, params=None, retry: int = 6):
-        async with await self._get_session(file) as session:
-            while retry != 0:
-                try:
-                    if params:
-                        params = {k: v for k, v in params.items() if v is not None}
-                    async with session.get(url, json=json, params=params, proxy=self.proxy_url, ssl=False,
-                                           timeout=120) as response:
-                        if response.status not in [200, 201, 204]:
-                            logger.info(f"Получен ответ от {url} ({response.status})")
-                            logger.error(f"Попытка повторного запроса. Осталось попыток: {retry - 1}")
-                            await asyncio.sleep(60)
-                            retry -= 1
-                            continue
-                        if file:
-                            content = await response.read()
-                            return {'file': content}
-                        return await response.json(content_type=None)
-                except (aiohttp.ClientConnectionError, aiohttp.ClientError, asyncio.TimeoutError) as e:
-                    logger.error(f"Ошибка соединения: {e}")
-                    logger.error(f"Попытка повторного запроса. Осталось попыток: {retry - 1}")
-                    await asyncio.sleep(60)
-                    retry -= 1
-                    continue
-            raise Exception
-
-    async def _perform_post_request(self, url, json=None, params=None, retry: int = 6):
-        async with await self._get_session() as session:
-            while retry != 0:
-                try:
-                    async with session.post(url, json=json, params=params, proxy=self.proxy_url, ssl=False,
-                                            timeout=120) as response:
-                        if response.content_type != 'application/json':
-                            logger.info(f"Получен ответ от {url} (html)")
-                            logger.error(f"Попытка повторного запроса.")
-                            await asyncio.sleep(60)
-                            if response.status == 503:
-                                await asyncio.sleep(60)
-                            continue
-                        if response.status not in [200, 204]:
-                            r = await response.json()
-                            if r.get('error') == 'некорректные параметры запроса: нет кампаний с корректными интервалами':
-                                logger.error(f"Получен ответ от {url} ({response.status}) {r.get('error')}")
-                                return None
-                            elif r.get('detail') == 'Authorization error':
-                                logger.error(f"Получен ответ от {url} ({response.status}) {r.get('detail')}")
-                                return None
-                            logger.info(f"Получен ответ от {url} ({response.status})")
-                            logger.error(f"Попытка повторного запроса. Осталось попыток: {retry - 1}")
-                            await asyncio.sleep(60)
-                            retry -= 1
-                            continue
-                        return await response.json()
-                except (aiohttp.ClientConnectionError, aiohttp.ClientError, asyncio.TimeoutError) as e:
-                    logger.error(f"Ошибка соединения: {e}")
-                    logger.error(f"Попытка повторного запроса. Осталось попыток: {retry - 1}")
-                    await asyncio.sleep(60)
-                    retry -= 1
-                    continue
-            raise Exception
-
-    async def _get_session(self, file: bool = False):
-        session = aiohttp.ClientSession()
-
-        session.headers["Authorization"] = self.__headers['Authorization']
-        session.headers["Accept"] = 'application/json'
-        if file:
-            session.headers["Accept"] = 'text/csv'
+    async def _get_headers(self, file: bool = False) -> dict:
+        return {
+            'Authorization': self.__headers['Authorization'],
+            'Accept': 'text/csv' if file else 'application/json'
+        }
 
-        return session
+    async def _process_response(self, response: aiohttp.ClientResponse, url: str, file: bool = False,
+                                raw: bool = False):
+        if response.content_type == 'text/html':
+            logger.info(f"Получен ответ от {url} (html)")
+            raise RetryRequest(f"Получен ответ от {url} ({response.status})",
+                               status=response.status if response.status not in self.ok_statuses else None,
+                               headers=response.headers)
+        if response.status not in self.ok_statuses and response.content_type == 'application/json':
+            r = await response.json()
+            if r.get('error') == 'некорректные параметры запроса: нет кампаний с корректными интервалами':
+                logger.error(f"Получен ответ от {url} ({response.status}) {r.get('error')}")
+                return None
+            elif r.get('detail') == 'Authorization error':
+                logger.error(f"Получен ответ от {url} ({response.status}) {r.get('detail')}")
+                return None
+        return await super()._process_response(response, url, file=file, raw=raw)
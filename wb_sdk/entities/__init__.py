@@ -15,3 +15,4 @@ from .warehouse_remains import *
 from .warehouse_remains_tasks_status import *
 from .warehouse_remains_tasks_download import *
 from .supplier_stocks import *
+from .nm_report_downloads_list import *
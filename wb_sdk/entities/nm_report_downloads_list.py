@@ -0,0 +1,14 @@
+from pydantic import Field
+
+from .base import BaseEntity
+
+
+class NmReportDownload(BaseEntity):
+    """Отчёт по воронке продаж."""
+    id_field: str = Field(default=None, alias='id')
+    createdAt: str = None
+    status: str = None
+    name: str = None
+    size: int = None
+    startDate: str = None
+    endDate: str = None
@@ -12,6 +12,7 @@ from .analytics_acceptance_report_request import *
 from .analytics_antifraud_details_request import *
 from .nm_report_downloads_request import *
 from .nm_report_downloads_file_request import *
+from .nm_report_downloads_list_request import *
 from .warehouse_remains_request import *
 from .warehouse_remains_tasks_status_request import *
 from .warehouse_remains_tasks_download_request import *
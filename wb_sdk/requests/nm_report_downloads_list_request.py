@@ -0,0 +1,7 @@
+from pydantic import Field
+
+from .base import BaseRequest
+
+
+class NmReportDownloadsListRequest(BaseRequest):
+    filter_download_ids: str = Field(default=None, serialization_alias='filter[downloadIds]')
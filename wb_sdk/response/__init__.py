@@ -12,6 +12,7 @@ from .analytics_acceptance_report_response import *
 from .analytics_antifraud_details_response import *
 from .nm_report_downloads_response import *
 from .nm_report_downloads_file_response import *
+from .nm_report_downloads_list_response import *
 from .warehouse_remains_response import *
 from .warehouse_remains_tasks_status_response import *
 from .warehouse_remains_tasks_download_response import *
@@ -0,0 +1,12 @@
+from typing import Optional
+
+from .base import BaseResponse
+from ..entities import NmReportDownload, Error
+
+
+class NmReportDownloadsListResponse(BaseResponse):
+    """Получить список отчётов по воронке продаж."""
+    data: Optional[list[NmReportDownload]] = []
+    error: Optional[bool] = None
+    errorText: Optional[str] = None
+    additionalErrors: Optional[list[Error]] = []
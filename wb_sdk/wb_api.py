@@ -1,13 +1,19 @@
+from typing import Any, AsyncIterator, Type
+
+from base_sdk import PREFETCH_PAGES, iter_cursor_pages, iter_items, next_offset, split_params, gather_params, \
+    merge_responses
+
+from .entities import *
 from .requests import *
 from .response import *
-from .core import WBAsyncEngine
+from .core import WBAsyncEngine, ConnectorConfig
 from .wb_endpoints_list import WBAPIFactory
 
 
 class WBApi:
 
-    def __init__(self, api_key: str):
-        self._engine = WBAsyncEngine(api_key=api_key)
+    def __init__(self, api_key: str, connector_config: ConnectorConfig = None):
+        self._engine = WBAsyncEngine(api_key=api_key, connector_config=connector_config)
         self._api_factory = WBAPIFactory(self._engine)
 
         self._supplier_sales_api = self._api_factory.get_api(SupplierSalesResponse)
@@ -23,12 +29,23 @@ class WBApi:
         self._analytics_acceptance_report_api = self._api_factory.get_api(AnalyticsAcceptanceReportResponse)
         self._analytics_antifraud_details_api = self._api_factory.get_api(AnalyticsAntifraudDetailsResponse)
         self._mm_report_downloads_api = self._api_factory.get_api(NmReportDownloadsResponse)
+        self._nm_report_downloads_list_api = self._api_factory.get_api(NmReportDownloadsListResponse)
         self._nm_report_downloads_file_api = self._api_factory.get_api(NmReportDownloadsFileResponse)
         self._warehouse_remains_api = self._api_factory.get_api(WarehouseRemainsResponse)
         self._warehouse_remains_tasks_status_api = self._api_factory.get_api(WarehouseRemainsTasksStatusResponse)
         self._warehouse_remains_tasks_download_api = self._api_factory.get_api(WarehouseRemainsTasksDownloadResponse)
         self._supplier_stocks_api = self._api_factory.get_api(SupplierStocksResponse)
 
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def close(self) -> None:
+        """Закрытие сессии кабинета."""
+        await self._engine.close()
+
     async def get_supplier_sales(self, date_from: str, flag: int = 0) -> SupplierSalesResponse:
         """
             Продажи. \n
@@ -133,14 +150,21 @@ class WBApi:
                     "2023-10-07" \n
                     "2023-12-06"
 
+            Кампаний может быть любое количество: запрос разбивается на части по ограничению endpoint'а
+            (100 кампаний), части выполняются одновременно в пределах лимита запросов.
+
             Args:
-                company_ids (list[int]): ID кампании, не более 100.
+                company_ids (list[int]): ID кампаний.
                 dates (list[str]): Даты, за которые необходимо выдать информацию.
         """
-        request = []
-        for company_id in company_ids:
-            request.append(FullstatsRequest(id=company_id, dates=dates))
-        answer: FullstatsResponse = await self._fullstats_api.post(body=request)
+        async def fetch(company_ids: list[int]) -> FullstatsResponse:
+            request = []
+            for company_id in company_ids:
+                request.append(FullstatsRequest(id=company_id, dates=dates))
+            return await self._fullstats_api.post(body=request)
+
+        parts = split_params(self._fullstats_api.batch_limit, company_ids=company_ids)
+        answer: FullstatsResponse = merge_responses(await gather_params(fetch, parts), 'result')
 
         return answer
 
@@ -216,15 +240,88 @@ class WBApi:
         return answer
 
     async def get_supplier_report_detail_by_period(self, date_from: str, date_to: str, limit: int = 100000,
-                                                   rrdid: int = 0) -> SupplierReportDetailByPeriodResponse:
+                                                   rrdid: int = 0, projection: Type[BaseResponse] = None
+                                                   ) -> SupplierReportDetailByPeriodResponse:
         request = SupplierReportDetailByPeriodRequest(dateFrom=date_from,
                                                       limit=limit,
                                                       dateTo=date_to,
                                                       rrdid=rrdid)
-        answer: SupplierReportDetailByPeriodResponse = await self._supplier_report_detail_by_period_api.get(query=request)
+        answer: SupplierReportDetailByPeriodResponse = await self._supplier_report_detail_by_period_api.get(
+            query=request, response_type=projection)
 
         return answer
 
+    def iter_nm_report_detail(self, date_from: str, date_to: str, brand_names: list[str] = None,
+                              object_ids: list[int] = None, tag_ids: list[int] = None, nm_ids: list[int] = None,
+                              timezone: str = 'Europe/Moscow', field: str = 'openCard', mode: str = 'asc',
+                              prefetch: int = PREFETCH_PAGES) -> AsyncIterator[NMReportDetailCard]:
+        """
+            Статистика КТ по одной карточке, со всех страниц до `isNextPage` (см. `get_nm_report_detail`).
+
+            Args:
+                prefetch (int, optional): Количество страниц, загружаемых заранее.
+
+            Yields:
+                NMReportDetailCard: Статистика КТ.
+        """
+        pages = iter_cursor_pages(
+            fetch=lambda page: self.get_nm_report_detail(date_from=date_from, date_to=date_to,
+                                                         brand_names=brand_names, object_ids=object_ids,
+                                                         tag_ids=tag_ids, nm_ids=nm_ids, timezone=timezone,
+                                                         field=field, mode=mode, page=page),
+            next_cursor=lambda answer, page: page + 1 if answer.data and answer.data.isNextPage else None,
+            cursor=1,
+            prefetch=prefetch)
+        return iter_items(pages, lambda answer: answer.data.cards if answer.data else None)
+
+    def iter_list_goods_filter(self, limit: int = 1000, filter_nm_id: int = None,
+                               prefetch: int = PREFETCH_PAGES) -> AsyncIterator[ListGood]:
+        """
+            Товары по одному, со всех страниц по `offset` (см. `get_list_goods_filter`).
+
+            Args:
+                limit (int, optional): Количество товаров на странице. Максимум 1 000.
+                filter_nm_id (int, optional): Артикул Wildberries, по которому искать товар.
+                prefetch (int, optional): Количество страниц, загружаемых заранее.
+
+            Yields:
+                ListGood: Товар.
+        """
+        pages = iter_cursor_pages(
+            fetch=lambda offset: self.get_list_goods_filter(limit=limit, offset=offset, filter_nm_id=filter_nm_id),
+            next_cursor=lambda answer, offset: next_offset(offset, answer.data and answer.data.listGoods, limit),
+            cursor=0,
+            prefetch=prefetch)
+        return iter_items(pages, lambda answer: answer.data.listGoods if answer.data else None)
+
+    def iter_supplier_report_detail_by_period(self, date_from: str, date_to: str, limit: int = 100000,
+                                              projection: Type[BaseResponse] = None,
+                                              prefetch: int = PREFETCH_PAGES) -> AsyncIterator[Any]:
+        """
+            Строки отчёта о реализации по одной, со всех страниц по `rrd_id`
+            (см. `get_supplier_report_detail_by_period`).
+
+            Пустой ответ означает конец отчёта; ожидание ещё не сформированного отчёта
+            остаётся за вызывающим.
+
+            Args:
+                limit (int, optional): Количество строк на странице.
+                projection (Type[BaseResponse], optional): Облегчённая модель ответа (см. `projections`).
+                prefetch (int, optional): Количество страниц, загружаемых заранее.
+
+            Yields:
+                SupplierReportDetailByPeriod: Строка отчёта (или её облегчённая модель `projection`).
+        """
+        pages = iter_cursor_pages(
+            fetch=lambda rrdid: self.get_supplier_report_detail_by_period(date_from=date_from, date_to=date_to,
+                                                                          limit=limit, rrdid=rrdid,
+                                                                          projection=projection),
+            next_cursor=lambda answer, _: answer.result[-1].rrd_id
+            if answer.result and len(answer.result) >= limit else None,
+            cursor=0,
+            prefetch=prefetch)
+        return iter_items(pages, lambda answer: answer.result)
+
     async def get_paid_storage(self, date_from: str, date_to: str) -> PaidStorageResponse:
         request = PaidStorageRequest(dateFrom=date_from,
                                      dateTo=date_to)
@@ -284,6 +381,12 @@ class WBApi:
 
         return answer
 
+    async def get_nm_report_downloads_list(self, uuid: str) -> NmReportDownloadsListResponse:
+        request = NmReportDownloadsListRequest(filter_download_ids=uuid)
+        answer: NmReportDownloadsListResponse = await self._nm_report_downloads_list_api.get(query=request)
+
+        return answer
+
     async def get_nm_report_downloads_file(self, uuid: str) -> NmReportDownloadsFileResponse:
         request = NmReportDownloadsFileRequest()
         answer: NmReportDownloadsFileResponse = await self._nm_report_downloads_file_api.get(query=request,
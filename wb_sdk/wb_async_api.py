@@ -1,17 +1,22 @@
 from typing import Type
 
+from base_sdk import RawResponse
 from .core import WBAsyncEngine
 from .response import BaseResponse
 
 
 class WBAsyncApi:
 
-    def __init__(self, engine: WBAsyncEngine, url: str, response_type: Type[BaseResponse]):
+    def __init__(self, engine: WBAsyncEngine, url: str, response_type: Type[BaseResponse],
+                 batch_limit: int = None):
         self._engine = engine
         self._url = url
         self._response_type = response_type
+        # Максимальное количество значений списочного параметра в одном запросе
+        self.batch_limit = batch_limit
 
-    async def get(self, body=None, query=None, file: bool = False, format_dict: dict = None):
+    async def get(self, body=None, query=None, file: bool = False, format_dict: dict = None,
+                  response_type: Type[BaseResponse] = None):
         if body:
             body = await self.params_to_dict(body)
         if query:
@@ -19,17 +24,17 @@ class WBAsyncApi:
         url = self._url
         if format_dict:
             url = url.format(**format_dict)
-        response = await self._engine.get(url, file=file, json=body, params=query)
-        data = await self._parse_response(response)
+        response = await self._engine.get(url, file=file, json=body, params=query, raw=True)
+        data = await self._parse_response(response, response_type or self._response_type)
         return data
 
-    async def post(self, body=None, query=None):
+    async def post(self, body=None, query=None, response_type: Type[BaseResponse] = None):
         if body:
             body = await self.params_to_dict(body)
         if query:
             query = await self.params_to_dict(query)
-        response = await self._engine.post(self._url, json=body, params=query)
-        data = await self._parse_response(response)
+        response = await self._engine.post(self._url, json=body, params=query, raw=True)
+        data = await self._parse_response(response, response_type or self._response_type)
         return data
 
     @staticmethod
@@ -40,15 +45,20 @@ class WBAsyncApi:
             parameters = params.dict(by_alias=True)
         return parameters
 
-    async def _parse_response(self, response: dict or list):
+    async def _parse_response(self, response: RawResponse or dict or list, response_type: Type[BaseResponse]):
         if response is None:
             return None
+        if isinstance(response, RawResponse):
+            if response.is_list():
+                return RawResponse(b'{"result":' + response.content + b'}').validate(response_type)
+            return response.validate(response_type)
         if isinstance(response, list):
-            data = await self._parse_response_object({"result": response})
+            data = await self._parse_response_object({"result": response}, response_type)
             return data
         else:
-            data = await self._parse_response_object(response)
+            data = await self._parse_response_object(response, response_type)
             return data
 
-    async def _parse_response_object(self, response: dict):
-        return self._response_type.parse_obj(response)
+    @staticmethod
+    async def _parse_response_object(response: dict, response_type: Type[BaseResponse]):
+        return response_type.model_validate(response)
@@ -1,5 +1,6 @@
 from typing import Type
 
+from base_sdk import RateLimit
 from .response import *
 from .response import BaseResponse
 from .wb_async_api import WBAsyncApi
@@ -22,6 +23,7 @@ class WBAPIFactory:
         AnalyticsAcceptanceReportResponse: 'https://seller-analytics-api.wildberries.ru/api/v1/analytics/acceptance-report',
         AnalyticsAntifraudDetailsResponse: 'https://seller-analytics-api.wildberries.ru/api/v1/analytics/antifraud-details',
         NmReportDownloadsResponse: 'https://seller-analytics-api.wildberries.ru/api/v2/nm-report/downloads',
+        NmReportDownloadsListResponse: 'https://seller-analytics-api.wildberries.ru/api/v2/nm-report/downloads',
         NmReportDownloadsFileResponse: 'https://seller-analytics-api.wildberries.ru/api/v2/nm-report/downloads/file/{downloadId}',
         WarehouseRemainsResponse: 'https://seller-analytics-api.wildberries.ru/api/v1/warehouse_remains',
         WarehouseRemainsTasksStatusResponse: 'https://seller-analytics-api.wildberries.ru/api/v1/warehouse_remains/tasks/{task_id}/status',
@@ -29,10 +31,37 @@ class WBAPIFactory:
         SupplierStocksResponse: 'https://statistics-api.wildberries.ru/api/v1/supplier/stocks'
     }
 
+    rate_limits: dict[Type[BaseResponse], RateLimit] = {
+        SupplierSalesResponse: RateLimit(1, 60),
+        SupplierOrdersResponse: RateLimit(1, 60),
+        SupplierStocksResponse: RateLimit(1, 60),
+        SupplierReportDetailByPeriodResponse: RateLimit(1, 60),
+        PromotionAdvertsResponse: RateLimit(5, 1),
+        FullstatsResponse: RateLimit(1, 60),
+        NMReportDetailResponse: RateLimit(3, 60),
+        ListGoodsFilterResponse: RateLimit(10, 6),
+        PaidStorageResponse: RateLimit(1, 60),
+        PaidStorageStatusResponse: RateLimit(1, 5),
+        PaidStorageDownloadResponse: RateLimit(1, 60),
+        AnalyticsAcceptanceReportResponse: RateLimit(1, 60),
+        NmReportDownloadsResponse: RateLimit(3, 60),
+        NmReportDownloadsListResponse: RateLimit(3, 60),
+        NmReportDownloadsFileResponse: RateLimit(3, 60),
+        WarehouseRemainsResponse: RateLimit(1, 60),
+        WarehouseRemainsTasksStatusResponse: RateLimit(1, 5),
+        WarehouseRemainsTasksDownloadResponse: RateLimit(1, 60),
+    }
+
+    batch_limits: dict[Type[BaseResponse], int] = {
+        FullstatsResponse: 100,
+    }
+
     def __init__(self, engine: WBAsyncEngine):
         self._engine = engine
+        self._engine.set_rate_limits({WBAPIFactory.api_list[response_type]: limit
+                                      for response_type, limit in WBAPIFactory.rate_limits.items()})
 
     def get_api(self, response_type: Type[BaseResponse]):
         url = WBAPIFactory.api_list.get(response_type)
-        api = WBAsyncApi(self._engine, url, response_type)
+        api = WBAsyncApi(self._engine, url, response_type, WBAPIFactory.batch_limits.get(response_type))
         return api
@@ -8,7 +8,8 @@ from datetime import datetime
 from sqlalchemy.exc import OperationalError
 
 from wb_sdk.wb_api import WBApi
-from database import WBDbConnection
+from runners import run_cabinets, raise_on_failure
+from database import WBDbConnection, Client
 from data_classes import DataWBStock
 
 nest_asyncio.apply()
@@ -29,10 +30,9 @@ async def get_stocks(db_conn: WBDbConnection, client_id: str, api_key: str) -> N
     list_stocks = []
 
     # Инициализация API-клиента WB
-    api_user = WBApi(api_key=api_key)
-
-    # Создание отчёта по хранению
-    answer = await api_user.get_supplier_stocks(date_from=datetime(year=2000, month=1, day=1).date().isoformat())
+    async with WBApi(api_key=api_key) as api_user:
+        # Создание отчёта по хранению
+        answer = await api_user.get_supplier_stocks(date_from=datetime(year=2000, month=1, day=1).date().isoformat())
 
     if answer:
         for stock in answer.result:
@@ -97,10 +97,10 @@ async def get_stocks(db_conn: WBDbConnection, client_id: str, api_key: str) -> N
             quantity_from_client=quantity_from_client)
         )
     logger.info(f"Количсетво строк: {len(list_stocks)}")
-    db_conn.add_wb_stock_entry(list_stocks=list_stocks)
+    await db_conn.aio.add_wb_stock_entry(list_stocks=list_stocks)
 
 
-async def main_wb_stock(retries: int = 6) -> None:
+async def main_wb_stock(retries: int = 6, raise_errors: bool = False) -> None:
     try:
         db_conn = WBDbConnection()
 
@@ -108,18 +108,25 @@ async def main_wb_stock(retries: int = 6) -> None:
 
         clients = db_conn.get_clients(marketplace="WB")
 
-        for client in clients:
+        async def job(db_conn: WBDbConnection, client: Client) -> None:
             logger.info(f'Сбор информации о остатках на складах {client.name_company}')
             await get_stocks(db_conn=db_conn,
                              client_id=client.client_id,
                              api_key=client.api_key)
+
+        results = await run_cabinets(db_conn=db_conn, cabinets=clients, job=job)
+        raise_on_failure(results)
     except OperationalError:
         logger.error(f'Не доступна база данных. Осталось попыток подключения: {retries - 1}')
         if retries > 0:
             await asyncio.sleep(10)
-            await main_wb_stock(retries=retries - 1)
+            await main_wb_stock(retries=retries - 1, raise_errors=raise_errors)
+        elif raise_errors:
+            raise
     except Exception as e:
         logger.error(f'{e}')
+        if raise_errors:
+            raise
 
 if __name__ == "__main__":
     loop = asyncio.get_event_loop()
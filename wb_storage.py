@@ -4,11 +4,13 @@ import logging
 import nest_asyncio
 
 from datetime import datetime, timedelta
+from contextlib import AsyncExitStack
 
 from sqlalchemy.exc import OperationalError
 
 from wb_sdk.wb_api import WBApi
-from database import WBDbConnection
+from runners import ReportJob, run_reports, REPORT_PENDING, REPORT_READY, REPORT_FAILED, raise_on_failure
+from database import WBDbConnection, Client
 from data_classes import DataWBStorage
 
 nest_asyncio.apply()
@@ -17,77 +19,80 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)-8s %(me
 logger = logging.getLogger(__name__)
 
 
-async def get_storage(db_conn: WBDbConnection, client_id: str, api_key: str, from_date: str, to_date: str) -> None:
+def storage_report(db_conn: WBDbConnection, api_user: WBApi, client: Client, from_date: str,
+                   to_date: str) -> ReportJob:
     """
-        Получает список расходов по хранению для указанного клиента за определенный период времени.
+        Отчёт по платному хранению кабинета за определенный период времени.
 
         Args:
             db_conn (WBDbConnection): Объект соединения с базой данных.
-            client_id (str): ID кабинета.
-            api_key (str): API KEY кабинета.
+            api_user (WBApi): API-клиент кабинета.
+            client (Client): Кабинет.
             from_date (str): Начальная дата периода (В формате строки).
                 Формат: YYYY-MM-DDTHH:mm:ss.sssZ.
                 Пример: 2019-11-25T10:43:06.51Z.
             to_date (str): Конечная дата периода (В формате строки).
                 Формат: YYYY-MM-DDTHH:mm:ss.sssZ.
                 Пример: 2019-11-25T10:43:06.51Z.
-    """
-    def format_date(date_format: str) -> datetime.date:
-        """Форматирование даты."""
-        time_format = "%Y-%m-%d"
-        return datetime.strptime(date_format.split('T')[0], time_format).date()
-
-    list_storage = []
-
-    # Инициализация API-клиента WB
-    api_user = WBApi(api_key=api_key)
 
-    # Создание отчёта по хранению
-    answer = await api_user.get_paid_storage(date_from=from_date, date_to=to_date)
+        Returns:
+            ReportJob: Отчёт для `run_reports`.
+    """
+    async def create() -> str or None:
+        # Создание отчёта по хранению
+        answer = await api_user.get_paid_storage(date_from=from_date, date_to=to_date)
+        return answer.data.taskId if answer else None
+
+    async def poll(task_id: str) -> str:
+        answer_status = await api_user.get_paid_storage_status(task_id=task_id)
+        if answer_status:
+            if answer_status.data.status == 'done':
+                return REPORT_READY
+            elif answer_status.data.status == 'canceled':
+                logger.info(f"Отчет отменен")
+                return REPORT_FAILED
+        return REPORT_PENDING
+
+    async def download(task_id: str) -> None:
+        # Получение отчёта
+        answer_download = await api_user.get_paid_storage_download(task_id=task_id)
+        if not answer_download:
+            logger.error(f"Ошибка ответа или пустой отчет {answer_download}")
+        await add_storage(db_conn=db_conn, client_id=client.client_id,
+                          storages=answer_download.result if answer_download else [])
 
-    if answer:
-        task_id = answer.data.taskId  # ID отчёта
+    return ReportJob(name=client.name_company, create=create, poll=poll, download=download)
 
-        # Проверка готовности отчёта
-        while True:
-            await asyncio.sleep(5)
-            answer_status = await api_user.get_paid_storage_status(task_id=task_id)
-            if answer_status:
-                if answer_status.data.status == 'done':
-                    break
-                elif answer_status.data.status == 'canceled':
-                    logger.info(f"Отчет отменен")
-                    return
 
-        # Получение отчёта
-        answer_download = await api_user.get_paid_storage_download(task_id=task_id)
+async def add_storage(db_conn: WBDbConnection, client_id: str, storages: list) -> None:
+    """
+        Агрегирование строк отчёта по хранению и запись в базу данных.
 
-        # Обработка полученных результатов
-        if answer_download:
-            for storage in answer_download.result:
-                list_storage.append(DataWBStorage(client_id=client_id,
-                                                  date=format_date(storage.date),
-                                                  vendor_code=storage.vendorCode,
-                                                  sku=str(storage.nmId),
-                                                  calc_type=storage.calcType,
-                                                  cost=round(float(storage.warehousePrice), 2)))
-        else:
-            logger.error(f"Ошибка ответа или пустой отчет {answer_download}")
+        Args:
+            db_conn (WBDbConnection): Объект соединения с базой данных.
+            client_id (str): ID кабинета.
+            storages (list): Строки отчёта по хранению.
+    """
+    def format_date(date_format: str) -> datetime.date:
+        """Форматирование даты."""
+        time_format = "%Y-%m-%d"
+        return datetime.strptime(date_format.split('T')[0], time_format).date()
 
     # Агрегирование данных
     aggregate = {}
-    for row in list_storage:
+    for storage in storages:
         key = (
-            row.client_id,
-            row.date,
-            row.vendor_code,
-            row.sku,
-            row.calc_type
+            client_id,
+            format_date(storage.date),
+            storage.vendorCode,
+            str(storage.nmId),
+            storage.calcType
         )
+        cost = round(float(storage.warehousePrice), 2)
         if key in aggregate:
-            aggregate[key] += row.cost
+            aggregate[key] += cost
         else:
-            aggregate[key] = row.cost
+            aggregate[key] = cost
     list_storage = []
     for key, cost in aggregate.items():
         client_id, date, vendor_code, sku, calc_type = key
@@ -99,10 +104,10 @@ async def get_storage(db_conn: WBDbConnection, client_id: str, api_key: str, fro
                                           cost=cost))
 
     logger.info(f"Количсетво строк: {len(list_storage)}")
-    db_conn.add_wb_storage_entry(list_storage=list_storage)
+    await db_conn.aio.add_wb_storage_entry(list_storage=list_storage)
 
 
-async def main_wb_storage(retries: int = 6) -> None:
+async def main_wb_storage(retries: int = 6, raise_errors: bool = False) -> None:
     try:
         db_conn = WBDbConnection()
 
@@ -112,21 +117,31 @@ async def main_wb_storage(retries: int = 6) -> None:
         date_now = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
         from_date = date_now - timedelta(days=1)
         to_date = date_now - timedelta(microseconds=1)
-
-        for client in clients:
-            logger.info(f'Сбор информации о хранении маназина {client.name_company} за дату {from_date.date().isoformat()}')
-            await get_storage(db_conn=db_conn,
-                              client_id=client.client_id,
-                              api_key=client.api_key,
-                              from_date=from_date.isoformat(),
-                              to_date=to_date.isoformat())
+        logger.info(f'Сбор информации о хранении магазинов за дату {from_date.date().isoformat()}')
+
+        # Отчёты всех кабинетов создаются сразу и загружаются по готовности
+        async with AsyncExitStack() as stack:
+            jobs = []
+            for client in clients:
+                api_user = await stack.enter_async_context(WBApi(api_key=client.api_key))
+                jobs.append(storage_report(db_conn=db_conn,
+                                           api_user=api_user,
+                                           client=client,
+                                           from_date=from_date.isoformat(),
+                                           to_date=to_date.isoformat()))
+            results = await run_reports(jobs)
+            raise_on_failure(results)
     except OperationalError:
         logger.error(f'Не доступна база данных. Осталось попыток подключения: {retries - 1}')
         if retries > 0:
             await asyncio.sleep(10)
-            await main_wb_storage(retries=retries - 1)
+            await main_wb_storage(retries=retries - 1, raise_errors=raise_errors)
+        elif raise_errors:
+            raise
     except Exception as e:
         logger.error(f'{e}')
+        if raise_errors:
+            raise
 
 if __name__ == "__main__":
     loop = asyncio.get_event_loop()
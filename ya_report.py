@@ -1,18 +1,20 @@
 import asyncio
 import os
-import requests
 import warnings
 
 import nest_asyncio
 import logging
-import pandas as pd
 
-from datetime import datetime, timedelta, date
+from datetime import timedelta, date
+from contextlib import AsyncExitStack
 from sqlalchemy.exc import OperationalError
 
-from data_classes import DataYaReport, DataYaCampaigns
+from data_classes import DataYaCampaigns
+from base_sdk import TransportError
 from ya_sdk.ya_api import YandexApi
-from database import YaDbConnection
+from services import iter_yandex_report
+from runners import ReportJob, run_reports, REPORT_PENDING, REPORT_READY, REPORT_FAILED, raise_on_failure
+from database import YaDbConnection, Client
 
 nest_asyncio.apply()
 
@@ -24,20 +26,13 @@ warnings.simplefilter(action='ignore', category=UserWarning)
 PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
 
 
-def download_file(url, file_name) -> str or None:
+async def download_file(api_user: YandexApi, url: str, file_name: str) -> str or None:
+    save_path = os.path.join(PROJECT_ROOT, 'templates', 'yandex_report', f'{file_name}.xlsx')
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-
-        save_path = os.path.join(PROJECT_ROOT, 'templates', 'yandex_report', f'{file_name}.xlsx')
-
-        os.makedirs(os.path.dirname(save_path), exist_ok=True)
-
-        with open(save_path, 'wb') as file:
-            file.write(response.content)
+        await api_user.download_file(url=url, path=save_path)
         logger.info(f'Файл сохранен по пути: {save_path}')
         return save_path
-    except requests.exceptions.RequestException as e:
+    except TransportError as e:
         logger.error(f'Ошибка при скачивании файла: {e}')
         return None
     except Exception as e:
@@ -45,18 +40,10 @@ def download_file(url, file_name) -> str or None:
         return None
 
 
-def convert_id(number):
-    if number is not None:
-        number = str(number).split('.')[0]
-    return number
-
-
 async def get_campaign_ids(api_key: str) -> list[DataYaCampaigns]:
     list_campaigns = []
-    api_user = YandexApi(api_key=api_key)
-    answer = await api_user.get_campaigns()
-    if answer:
-        for campaign in answer.campaigns:
+    async with YandexApi(api_key=api_key) as api_user:
+        async for campaign in api_user.iter_campaigns():
             list_campaigns.append(DataYaCampaigns(client_id=str(campaign.business.field_id),
                                                   campaign_id=str(campaign.field_id),
                                                   name=campaign.domain,
@@ -64,203 +51,80 @@ async def get_campaign_ids(api_key: str) -> list[DataYaCampaigns]:
     return list_campaigns
 
 
-async def report_generate(client_id: str, api_key: str, campaign_id: str, date_now: date) -> str or None:
+def united_services_report(db_conn: YaDbConnection, api_user: YandexApi, client: Client, campaign: DataYaCampaigns,
+                           date_now: date) -> ReportJob:
+    """
+        Отчёт по стоимости услуг магазина за 7 дней до указанной даты.
+
+        Args:
+            db_conn (YaDbConnection): Объект соединения с базой данных.
+            api_user (YandexApi): API-клиент кабинета.
+            client (Client): Кабинет.
+            campaign (DataYaCampaigns): Магазин кабинета.
+            date_now (date): Дата, до которой формируется отчёт.
+
+        Returns:
+            ReportJob: Отчёт для `run_reports`.
+    """
     date_from = date_now - timedelta(days=7)
     date_to = date_now - timedelta(days=1)
 
-    report_id = None
-    link_report = None
     substatus = {'NO_DATA': 'Для такого отчета нет данных.',
                  'TOO_LARGE': 'Отчет превысил допустимый размер — укажите меньший период времени '
                               'или уточните условия запроса.',
                  'RESOURCE_NOT_FOUND': 'Для такого отчета не удалось найти часть сущностей.'}
-    api_user = YandexApi(api_key=api_key)
-    answer = await api_user.get_reports_united_marketplace_services_generate(business_id=int(client_id),
-                                                                             campaign_ids=[int(campaign_id)],
-                                                                             date_from=date_from.isoformat(),
-                                                                             date_to=date_to.isoformat())
-    if answer:
-        if answer.result:
-            report_id = answer.result.reportId
-            logger.info(f"Запрос отправлен: {report_id}")
-
-    if report_id is not None:
-        retry = 3
-        while True:
-            await asyncio.sleep(10)
-            answer_report_info = await api_user.get_reports_info(report_id=report_id)
-            if answer_report_info:
-                if answer_report_info.result:
-                    if answer_report_info.result.status == 'DONE':
-                        link_report = answer_report_info.result.file
-                        if link_report is not None:
-                            logger.info(f"Отчёт: {link_report}")
-                        else:
-                            logger.info(f"{substatus.get(answer_report_info.result.subStatus, None)}")
-                        break
-                    elif answer_report_info.result.status == 'FAILED':
-                        logger.error(f"Ошибка формирования отчёта: FAILED")
-                        break
-                else:
-                    retry -= 1
-                    if not retry:
-                        logger.error(f"Ошибка формирования отчёта: пустой result")
-                        break
-            else:
-                retry -= 1
-                if not retry:
-                    logger.error(f"Ошибка формирования отчёта: пустой answer_report_info")
-                    break
-    else:
+    links = {}
+    retry = 3
+
+    async def create() -> str or None:
+        answer = await api_user.get_reports_united_marketplace_services_generate(
+            business_id=int(client.client_id),
+            campaign_ids=[int(campaign.campaign_id)],
+            date_from=date_from.isoformat(),
+            date_to=date_to.isoformat())
+        if answer and answer.result:
+            return answer.result.reportId
         logger.error(f"Не получилось отправить запрос")
-
-    if link_report is not None:
-        path_file = download_file(url=link_report, file_name=f'{campaign_id}_{date_to}')
-        return path_file
-    else:
         return None
 
-
-async def add_yandex_report_entry(path_file: str) -> list[DataYaReport]:
-    headers_dict = {'client_id': {'ID бизнес-аккаунта': None},
-                    'posting_number': {'Номер заказа': None},
-                    'operation_date': {'Дата оказания услуги': None,
-                                     'Дата и время оказания услуги': None},
-                    'service': {'Услуга': None},
-                    'vendor_code': {'Ваш SKU': None},
-                    'cost': {'Стоимость услуги (': None,
-                             'Стоимость услуги, ₽': None,
-                             'Стоимость услуги': None,
-                             'Постоплата, ₽': None,
-                             'Стоимость платного хранения, ₽': None}
-                    }
-    headers = [key for val in headers_dict.values() for key in val.keys()]
-
-    name_sheets = ['Обработка заказов в СЦ или ПВЗ',
-                   'Размещение товаров на витрине',
-                   'Обработка заказов на складе',
-                   'Приём платежа',
-                   'Перевод платежа',
-                   'Доставка покупателю',
-                   'Экспресс-доставка покупателю',
-                   'Поставка через транзитный склад',  # new
-                   'Доставка из-за рубежа',  # new pass
-                   'Программа лояльности и отзывы',
-                   'Буст продаж, оплата за показы',
-                   'Буст продаж, оплата за продажи',
-                   'Полки',
-                   'Баннеры',  # new pass
-                   'Хранение невыкупов и возвратов',
-                   'Рассрочка',  # new pass
-                   'Приём излишков на складе',  # new pass
-                   'Организация утилизации',
-                   'Вывоз со склада, СЦ, ПВЗ',
-                   'Организация забора заказов',  # new pass
-                   'Вознаграждение за продажу',  # new pass
-                   'Расширенный доступ к сервисам',  # new pass
-                   'Складская обработка'  # new
-                   ]
-
-    if '/' in path_file:
-        campaign_id = path_file.split('/')[-1].split('_')[0]
-    else:
-        campaign_id = path_file.split('\\')[-1].split('_')[0]
-
-    try:
-        excel_file = pd.ExcelFile(path_file)
-        logger.info(f'Файл {path_file} прочитан успешно.')
-
-        sheet_names = excel_file.sheet_names
-        for s in sheet_names:
-            if 'Платное хранение' in s:
-                name_sheets.append(s)
-        result_data = []
-
-        for sheet in name_sheets:
-            if sheet in sheet_names:
-                df = pd.read_excel(path_file, sheet_name=sheet, header=None)
-
-                header_row = 0
-                for i, row in df.iterrows():
-                    if any(cell in headers for cell in row if pd.notna(cell)):
-                        header_row = i
-                        break
-
-                if header_row:
-                    df = pd.read_excel(path_file, sheet_name=sheet, header=header_row)
-                    df = df.fillna('')
-
-                    for idx, row in df.iterrows():
-                        try:
-                            row_data = {}
-                            for metric, value in headers_dict.items():
-                                row_data[metric] = {}
-                                for header in value.keys():
-                                    if header in df.columns:
-                                        row_data[metric][header] = row[header]
-                                    else:
-                                        if header == 'Стоимость услуги (':
-                                            for column in df.columns:
-                                                if header in column:
-                                                    row_data[metric][header] = row[column]
-
-                            client_id = convert_id(next((v for v in row_data.get('client_id', {}).values() if v), None))
-                            posting_number = convert_id(next((v for v in row_data.get('posting_number', {}).values() if v), None))
-                            operation_date = next((v for v in row_data.get('operation_date', {}).values() if v), None)
-                            cost = next((v for v in row_data.get('cost', {}).values() if v), None)
-                            service = next((v for v in row_data.get('service', {}).values() if v), None)
-                            vendor_code = next((v for v in row_data.get('vendor_code', {}).values() if v), None)
-                            operation_type = sheet if 'Платное хранение' not in sheet else 'Платное хранение'
-
-                            operation_date = datetime.strptime(operation_date, '%Y-%m-%d %H:%M:%S').date()
-                            cost = round(float(cost), 2)
-
-                            entry = DataYaReport(client_id=client_id,
-                                                 campaign_id=campaign_id,
-                                                 date=operation_date,
-                                                 posting_number=posting_number,
-                                                 operation_type=operation_type,
-                                                 vendor_code=vendor_code,
-                                                 service=service,
-                                                 cost=cost)
-                            result_data.append(entry)
-                        except Exception:
-                            continue
-            else:
-                logger.error(f'Лист "{sheet}" не найден в файле.')
-
-        aggregate = {}
-        for row in result_data:
-            key = (
-                row.client_id,
-                row.campaign_id,
-                row.date,
-                row.posting_number,
-                row.operation_type,
-                row.vendor_code,
-                row.service
-            )
-            if key in aggregate:
-                aggregate[key] += row.cost
-            else:
-                aggregate[key] = row.cost
-        result_data = []
-        for key, cost in aggregate.items():
-            client_id, campaign_id, operation_date, posting_number, operation_type, vendor_code, service = key
-            result_data.append(DataYaReport(client_id=client_id,
-                                            campaign_id=campaign_id,
-                                            date=operation_date,
-                                            posting_number=posting_number,
-                                            operation_type=operation_type,
-                                            vendor_code=vendor_code,
-                                            service=service,
-                                            cost=cost))
-        return result_data
-    except Exception as e:
-        logger.error(f'Ошибка при чтении файла {path_file}: {e}')
-
-
-async def main_yandex_report(retries: int = 6) -> None:
+    async def poll(report_id: str) -> str:
+        nonlocal retry
+        answer_report_info = await api_user.get_reports_info(report_id=report_id)
+        if answer_report_info and answer_report_info.result:
+            if answer_report_info.result.status == 'DONE':
+                links[report_id] = answer_report_info.result.file
+                if links[report_id] is not None:
+                    logger.info(f"Отчёт: {links[report_id]}")
+                else:
+                    logger.info(f"{substatus.get(answer_report_info.result.subStatus, None)}")
+                return REPORT_READY
+            elif answer_report_info.result.status == 'FAILED':
+                logger.error(f"Ошибка формирования отчёта: FAILED")
+                return REPORT_FAILED
+            return REPORT_PENDING
+        retry -= 1
+        if not retry:
+            logger.error(f"Ошибка формирования отчёта: пустой "
+                         f"{'result' if answer_report_info else 'answer_report_info'}")
+            return REPORT_FAILED
+        return REPORT_PENDING
+
+    async def download(report_id: str) -> None:
+        if links.get(report_id) is None:
+            return
+        path_file = await download_file(api_user=api_user, url=links[report_id],
+                                        file_name=f'{campaign.campaign_id}_{date_to}')
+        if path_file is None:
+            return
+        # Файл разбирается по листам, пачки записываются в базу по мере разбора
+        async for list_reports in iter_yandex_report(path_file=path_file, campaign_id=campaign.campaign_id):
+            await db_conn.aio.add_ya_report(list_reports=list_reports)
+
+    return ReportJob(name=f"{client.name_company} / {campaign.name}", create=create, poll=poll, download=download,
+                     first_delay=10)
+
+
+async def main_yandex_report(retries: int = 6, raise_errors: bool = False) -> None:
     """
         Основная функция для обновления записей в базе данных.
 
@@ -274,32 +138,42 @@ async def main_yandex_report(retries: int = 6) -> None:
 
         api_key_set = {client.api_key for client in clients}
 
+        date_now = date.today()
+
+        cabinets = []
         for api_key in api_key_set:
             list_campaigns = await get_campaign_ids(api_key=api_key)
             db_conn.add_ya_campaigns(list_campaigns=list_campaigns)
-
-            date_now = date.today()
-
             for campaign in sorted(list_campaigns, key=lambda x: x.client_id):
-
-                client = db_conn.get_client(client_id=campaign.client_id)
-
-                logger.info(f"За дату {date_now - timedelta(days=1)}")
-                logger.info(f"Добавление в базу данных компании '{client.name_company}' магазина '{campaign.name}'")
-                path_file = await report_generate(client_id=client.client_id,
-                                                  campaign_id=campaign.campaign_id,
-                                                  api_key=client.api_key,
-                                                  date_now=date_now)
-                if path_file is not None:
-                    list_reports = await add_yandex_report_entry(path_file=path_file)
-                    db_conn.add_ya_report(list_reports=list_reports)
+                cabinets.append((db_conn.get_client(client_id=campaign.client_id), campaign))
+
+        logger.info(f"За дату {date_now - timedelta(days=1)}")
+
+        # Отчёты всех магазинов создаются сразу и загружаются по готовности
+        async with AsyncExitStack() as stack:
+            api_users = {}
+            jobs = []
+            for client, campaign in cabinets:
+                if client.api_key not in api_users:
+                    api_users[client.api_key] = await stack.enter_async_context(YandexApi(api_key=client.api_key))
+                jobs.append(united_services_report(db_conn=db_conn,
+                                                   api_user=api_users[client.api_key],
+                                                   client=client,
+                                                   campaign=campaign,
+                                                   date_now=date_now))
+            results = await run_reports(jobs)
+            raise_on_failure(results)
     except OperationalError:
         logger.error(f'Не доступна база данных. Осталось попыток подключения: {retries - 1}')
         if retries > 0:
             await asyncio.sleep(10)
-            await main_yandex_report(retries=retries - 1)
+            await main_yandex_report(retries=retries - 1, raise_errors=raise_errors)
+        elif raise_errors:
+            raise
     except Exception as e:
         logger.error(f'{e}')
+        if raise_errors:
+            raise
 
 
 if __name__ == "__main__":
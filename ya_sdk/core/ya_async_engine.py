@@ -1,7 +1,7 @@
-import asyncio
-import aiohttp
 import logging
 
+from base_sdk import AsyncTransport, ConnectorConfig, RetryPolicy
+
 logger = logging.getLogger(__name__)
 
 
@@ -13,65 +13,30 @@ async def transform_params(params) -> dict:
     return new_params
 
 
-class YandexAsyncEngine:
-    def __init__(self, api_key: str = ''):
-        self._base_url = 'https://api.partner.market.yandex.ru'
+class YandexAsyncEngine(AsyncTransport):
+    marketplace = 'yandex'
+
+    def __init__(self, api_key: str = '', connector_config: ConnectorConfig = None, retry_policy: RetryPolicy = None):
+        super().__init__(base_url='https://api.partner.market.yandex.ru', connector_config=connector_config,
+                         retry_policy=retry_policy, limit_key=api_key)
         self.__headers = {
             'Authorization': api_key
         }
 
-    async def get(self, url: str, params: dict) -> dict:
-        url = await self._get_url(url)
-        response = await self._perform_get_request(url, params)
+    async def get(self, url: str, params: dict, raw: bool = False) -> dict:
+        params = await transform_params(params)
+        response = await self.request('GET', url, params=params, raw=raw)
 
         return response
 
-    async def post(self, url: str, json: dict, params: dict) -> dict:
-        url = await self._get_url(url)
-        response = await self._perform_post_request(url, json, params)
+    async def post(self, url: str, json: dict, params: dict, raw: bool = False) -> dict:
+        if json is not None:
+            json = await transform_params(json)
+        if params is not None:
+            params = await transform_params(params)
+        response = await self.request('POST', url, params=params, json=json, raw=raw)
 
         return response
 
-    async def _get_url(self, url: str):
-        if url.startswith("/"):
-            return self._base_url + url
-        else:
-            return f"{self._base_url}/{url}"
-
-    async def _perform_get_request(self, url, params, retry: int = 6):
-        async with await self._get_session() as session:
-            while retry != 0:
-                params = await transform_params(params)
-                async with session.get(url, params=params) as response:
-                    if response.status != 200:
-                        logger.info(f"Получен ответ от {url} ({response.status})")
-                        logger.error(f"Попытка повторного запроса. Осталось попыток: {retry - 1}")
-                        await asyncio.sleep(60)
-                        retry -= 1
-                        continue
-                    return await response.json(content_type=None)
-            raise Exception
-
-    async def _perform_post_request(self, url, json=None, params=None, retry: int = 6):
-        async with await self._get_session() as session:
-            while retry != 0:
-                if json is not None:
-                    json = await transform_params(json)
-                if params is not None:
-                    params = await transform_params(params)
-                async with session.post(url, json=json, params=params) as response:
-                    if response.status != 200:
-                        logger.info(f"Получен ответ от {url} ({response.status})")
-                        logger.error(f"Попытка повторного запроса. Осталось попыток: {retry - 1}")
-                        await asyncio.sleep(60)
-                        retry -= 1
-                        continue
-                    return await response.json()
-            raise Exception
-
-    async def _get_session(self):
-        session = aiohttp.ClientSession()
-
-        session.headers["Authorization"] = 'Bearer ' + self.__headers['Authorization']
-
-        return session
+    async def _get_headers(self, file: bool = False) -> dict:
+        return {'Authorization': 'Bearer ' + self.__headers['Authorization']}
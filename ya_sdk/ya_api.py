@@ -1,15 +1,19 @@
-from typing import Union
+from typing import Any, AsyncIterator, Optional, Union
 
+from base_sdk import PAGE_CONCURRENCY, PREFETCH_PAGES, iter_cursor_pages, iter_items, iter_numbered_pages, \
+    split_params, gather_params, merge_responses
+
+from .entities import *
 from .requests import *
 from .response import *
-from .core import YandexAsyncEngine
+from .core import YandexAsyncEngine, ConnectorConfig
 from .ya_endpoints_list import YandexAPIFactory
 
 
 class YandexApi:
 
-    def __init__(self, api_key: str):
-        self._engine = YandexAsyncEngine(api_key=api_key)
+    def __init__(self, api_key: str, connector_config: ConnectorConfig = None):
+        self._engine = YandexAsyncEngine(api_key=api_key, connector_config=connector_config)
         self._api_factory = YandexAPIFactory(self._engine)
 
         self._campaigns_api = self._api_factory.get_api(CampaignsResponse)
@@ -21,6 +25,29 @@ class YandexApi:
         self._campaigns_offers_stocks_api = self._api_factory.get_api(CampaignsOffersStocksResponse)
         self._warehouses_api = self._api_factory.get_api(WarehousesResponse)
 
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def close(self) -> None:
+        """Закрытие сессии кабинета."""
+        await self._engine.close()
+
+    async def download_file(self, url: str, path: str) -> str:
+        """
+            Потоковая загрузка сформированного отчёта.
+
+            Args:
+                url (str): Ссылка на файл отчёта.
+                path (str): Путь сохранения файла.
+
+            Returns:
+                str: Путь к сохранённому файлу.
+        """
+        return await self._engine.download(url=url, path=path)
+
     async def get_campaigns(self, page: int = 1, page_size: int = None) -> CampaignsResponse:
         request = CampaignsRequest(page=page, pageSize=page_size)
         answer: CampaignsResponse = await self._campaigns_api.get(request)
@@ -67,6 +94,44 @@ class YandexApi:
 
         return answer
 
+    def iter_campaigns(self, page_size: int = None,
+                       concurrency: int = PAGE_CONCURRENCY) -> AsyncIterator[CampaignDTO]:
+        """
+            Магазины пользователя по одному, со всех страниц.
+
+            Args:
+                page_size (int, optional): Размер страницы.
+                concurrency (int, optional): Количество одновременных запросов страниц.
+
+            Yields:
+                CampaignDTO: Магазин.
+        """
+        pages = iter_numbered_pages(fetch=lambda page: self.get_campaigns(page=page, page_size=page_size),
+                                    page_count=lambda answer: answer.pager.pagesCount if answer and answer.pager else 1,
+                                    concurrency=concurrency)
+        return iter_items(pages, lambda answer: answer.campaigns if answer else None)
+
+    def iter_campaigns_orders(self, campaign_id: Union[str, int], page_size: int = 50,
+                              concurrency: int = PAGE_CONCURRENCY, **filters) -> AsyncIterator[OrderDTO]:
+        """
+            Заказы магазина по одному, со всех страниц (см. `get_campaigns_orders`).
+
+            Args:
+                campaign_id (str | int): ID магазина.
+                page_size (int, optional): Размер страницы.
+                concurrency (int, optional): Количество одновременных запросов страниц.
+                **filters: Фильтры `get_campaigns_orders`.
+
+            Yields:
+                OrderDTO: Заказ.
+        """
+        pages = iter_numbered_pages(
+            fetch=lambda page: self.get_campaigns_orders(campaign_id=campaign_id, page=page, page_size=page_size,
+                                                         **filters),
+            page_count=lambda answer: answer.pager.pagesCount if answer and answer.pager else 1,
+            concurrency=concurrency)
+        return iter_items(pages, lambda answer: answer.orders if answer else None)
+
     async def get_campaigns_stats_orders(self,
                                          campaign_id: Union[str, int],
                                          page_token: str = None,
@@ -78,20 +143,57 @@ class YandexApi:
                                          orders: list[int] = None,
                                          statuses: list[str] = None,
                                          has_cis: bool = False) -> CampaignsStatsOrdersResponse:
-        query = CampaignsStatsOrdersQueryRequest(page_token=page_token, limit=limit)
-        body = CampaignsStatsOrdersBodyRequest(dateFrom=date_from,
-                                               dateTo=date_to,
-                                               updateFrom=update_from,
-                                               updateTo=update_to,
-                                               orders=orders,
-                                               statuses=statuses,
-                                               hasCis=has_cis)
-        answer: CampaignsStatsOrdersResponse = await self._campaigns_stats_orders_api.post(body=body,
-                                                                                           query=query,
-                                                                                           format_dict={'campaignId': campaign_id})
+        """
+            Детальная информация по заказам.
+
+            Список `orders` может быть любой длины: если он превышает ограничение endpoint'а,
+            запрос разбивается на части, каждая часть запрашивается одной страницей, части
+            выполняются одновременно, а заказы объединяются в ответе без продолжения по `page_token`.
+        """
+        parts = split_params(self._campaigns_stats_orders_api.batch_limit, orders=orders)
+
+        async def fetch(orders: list[int]) -> CampaignsStatsOrdersResponse:
+            page_limit = limit if len(parts) == 1 else max(limit, len(orders))
+            query = CampaignsStatsOrdersQueryRequest(page_token=page_token, limit=page_limit)
+            body = CampaignsStatsOrdersBodyRequest(dateFrom=date_from,
+                                                   dateTo=date_to,
+                                                   updateFrom=update_from,
+                                                   updateTo=update_to,
+                                                   orders=orders,
+                                                   statuses=statuses,
+                                                   hasCis=has_cis)
+            return await self._campaigns_stats_orders_api.post(body=body,
+                                                               query=query,
+                                                               format_dict={'campaignId': campaign_id})
+
+        answer: CampaignsStatsOrdersResponse = merge_responses(await gather_params(fetch, parts), 'result.orders')
+        if len(parts) > 1 and answer and answer.result:
+            answer = answer.model_copy(update={'result': answer.result.model_copy(update={'paging': None})})
 
         return answer
 
+    def iter_campaigns_stats_orders(self, campaign_id: Union[str, int], limit: int = 200,
+                                    prefetch: int = PREFETCH_PAGES, **filters) -> AsyncIterator[OrdersStatsOrderDTO]:
+        """
+            Детальная информация по заказам по одному, со всех страниц по `page_token`
+            (см. `get_campaigns_stats_orders`).
+
+            Args:
+                campaign_id (str | int): ID магазина.
+                limit (int, optional): Количество заказов на странице.
+                prefetch (int, optional): Количество страниц, загружаемых заранее.
+                **filters: Фильтры `get_campaigns_stats_orders`.
+
+            Yields:
+                OrdersStatsOrderDTO: Заказ.
+        """
+        pages = iter_cursor_pages(
+            fetch=lambda page_token: self.get_campaigns_stats_orders(campaign_id=campaign_id, page_token=page_token,
+                                                                     limit=limit, **filters),
+            next_cursor=lambda answer, _: _next_page_token(answer.result),
+            prefetch=prefetch)
+        return iter_items(pages, lambda answer: answer.result.orders if answer.result else None)
+
     async def get_reports_united_marketplace_services_generate(self,
                                                                business_id: int,
                                                                campaign_ids: list[int],
@@ -153,8 +255,39 @@ class YandexApi:
 
         return answer
 
+    def iter_campaigns_offers_stocks(self, campaign_id: Union[str, int], archived: bool = None,
+                                     offer_ids: list[str] = None, with_turnover: bool = False, limit: int = 100,
+                                     prefetch: int = PREFETCH_PAGES) -> AsyncIterator[WarehouseOffersDTO]:
+        """
+            Остатки по складам магазина, со всех страниц по `page_token` (см. `get_campaigns_offers_stocks`).
+
+            Args:
+                campaign_id (str | int): ID магазина.
+                archived (bool, optional): Фильтр по нахождению в архиве.
+                offer_ids (list[str], optional): Фильтр по ваших SKU товаров.
+                with_turnover (bool, optional): Возвращать ли информацию по оборачиваемости.
+                limit (int, optional): Количество товаров на странице.
+                prefetch (int, optional): Количество страниц, загружаемых заранее.
+
+            Yields:
+                WarehouseOffersDTO: Остатки одного склада на странице.
+        """
+        pages = iter_cursor_pages(
+            fetch=lambda page_token: self.get_campaigns_offers_stocks(campaign_id=campaign_id, archived=archived,
+                                                                      offer_ids=offer_ids,
+                                                                      with_turnover=with_turnover,
+                                                                      page_token=page_token, limit=limit),
+            next_cursor=lambda answer, _: _next_page_token(answer.result),
+            prefetch=prefetch)
+        return iter_items(pages, lambda answer: answer.result.warehouses if answer.result else None)
+
     async def get_warehouses(self) -> WarehousesResponse:
         request = WarehousesRequest()
         answer: WarehousesResponse = await self._warehouses_api.get(request)
 
         return answer
+
+
+def _next_page_token(result: Any) -> Optional[str]:
+    paging = getattr(result, 'paging', None) if result else None
+    return getattr(paging, 'nextPageToken', None) or None
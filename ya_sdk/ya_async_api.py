@@ -1,21 +1,25 @@
 from .core import YandexAsyncEngine
 from typing import Type
+from base_sdk import RawResponse
 from .response import BaseResponse
 
 
 class YandexAsyncApi:
 
-    def __init__(self, engine: YandexAsyncEngine, url: str, response_type: Type[BaseResponse]):
+    def __init__(self, engine: YandexAsyncEngine, url: str, response_type: Type[BaseResponse],
+                 batch_limit: int = None):
         self._engine = engine
         self._url = url
         self._response_type = response_type
+        # Максимальное количество значений списочного параметра в одном запросе
+        self.batch_limit = batch_limit
 
     async def get(self, request, format_dict: dict = None):
         parameters = request.dict(by_alias=True)
         url = self._url
         if format_dict:
             url = url.format(**format_dict)
-        response = await self._engine.get(url, parameters)
+        response = await self._engine.get(url, parameters, raw=True)
         data = await self._parse_response(response)
         return data
 
@@ -27,7 +31,7 @@ class YandexAsyncApi:
         url = self._url
         if format_dict:
             url = url.format(**format_dict)
-        response = await self._engine.post(url, json=body, params=query)
+        response = await self._engine.post(url, json=body, params=query, raw=True)
         data = await self._parse_response(response)
         return data
 
@@ -39,7 +43,11 @@ class YandexAsyncApi:
             parameters = params.dict(by_alias=True)
         return parameters
 
-    async def _parse_response(self, response: dict or list):
+    async def _parse_response(self, response: RawResponse or dict):
+        if isinstance(response, RawResponse):
+            if not response.has_key('error'):
+                return response.validate(self._response_type)
+            response = response.json()
         if response.get("error"):
             raise Exception(response.get("errorText"))
 
@@ -49,4 +57,4 @@ class YandexAsyncApi:
     async def _parse_response_object(self, response: dict):
         if response.get("error"):
             raise Exception(response.get("errorText"))
-        return self._response_type.parse_obj(response)
+        return self._response_type.model_validate(response)
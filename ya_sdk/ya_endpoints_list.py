@@ -1,5 +1,6 @@
 from .response import *
 from typing import Type
+from base_sdk import RateLimit
 from .ya_async_api import YandexAsyncApi
 from .core import YandexAsyncEngine
 
@@ -16,10 +17,21 @@ class YandexAPIFactory:
         WarehousesResponse: 'warehouses'
     }
 
+    rate_limits: dict[Type[BaseResponse], RateLimit] = {
+        ReportsUnitedMarketplaceServicesGenerateResponse: RateLimit(100, 60),
+        ReportsInfoResponse: RateLimit(100, 60),
+    }
+
+    batch_limits: dict[Type[BaseResponse], int] = {
+        CampaignsStatsOrdersResponse: 200,
+    }
+
     def __init__(self, engine: YandexAsyncEngine):
         self._engine = engine
+        self._engine.set_rate_limits({YandexAPIFactory.api_list[response_type]: limit
+                                      for response_type, limit in YandexAPIFactory.rate_limits.items()})
 
     def get_api(self, response_type: Type[BaseResponse]):
         url = YandexAPIFactory.api_list.get(response_type)
-        api = YandexAsyncApi(self._engine, url, response_type)
+        api = YandexAsyncApi(self._engine, url, response_type, YandexAPIFactory.batch_limits.get(response_type))
         return api
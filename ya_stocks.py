@@ -8,7 +8,8 @@ from datetime import datetime
 from sqlalchemy.exc import OperationalError
 
 from ya_sdk.ya_api import YandexApi
-from database import YaDbConnection
+from runners import run_cabinets, raise_on_failure
+from database import YaDbConnection, Client
 from data_classes import DataYaCampaigns, DataYaStock
 
 nest_asyncio.apply()
@@ -19,10 +20,8 @@ logger = logging.getLogger(__name__)
 
 async def get_campaign_ids(api_key: str) -> list[DataYaCampaigns]:
     list_campaigns = []
-    api_user = YandexApi(api_key=api_key)
-    answer = await api_user.get_campaigns()
-    if answer:
-        for campaign in answer.campaigns:
+    async with YandexApi(api_key=api_key) as api_user:
+        async for campaign in api_user.iter_campaigns():
             list_campaigns.append(DataYaCampaigns(client_id=str(campaign.business.field_id),
                                                   campaign_id=str(campaign.field_id),
                                                   name=campaign.domain,
@@ -32,8 +31,8 @@ async def get_campaign_ids(api_key: str) -> list[DataYaCampaigns]:
 
 async def get_warehouses(api_key: str) -> dict:
     warehouses = {}
-    api_user = YandexApi(api_key=api_key)
-    answer = await api_user.get_warehouses()
+    async with YandexApi(api_key=api_key) as api_user:
+        answer = await api_user.get_warehouses()
     if answer:
         for warehouse in answer.result.warehouses:
             warehouses[warehouse.id_field] = warehouse.name
@@ -44,19 +43,10 @@ async def get_stocks(db_conn: YaDbConnection, client_id: str, campaign_id: str,
     list_stocks = []
 
     # Инициализация API-клиента Yandex
-    api_user = YandexApi(api_key=api_key)
-
-    for archived in [True, False]:
-        page_token = None
-        while True:
-            answer = await api_user.get_campaigns_offers_stocks(campaign_id=campaign_id,
-                                                                archived=archived,
-                                                                page_token=page_token,
-                                                                limit=100)
-            if not answer.result:
-                break
-
-            for warehouse in answer.result.warehouses:
+    async with YandexApi(api_key=api_key) as api_user:
+        for archived in [True, False]:
+            async for warehouse in api_user.iter_campaigns_offers_stocks(campaign_id=campaign_id, archived=archived,
+                                                                         limit=100):
                 warehouse_name = warehouses.get(warehouse.warehouseId)
                 if warehouse_name is None:
                     continue
@@ -77,10 +67,6 @@ async def get_stocks(db_conn: YaDbConnection, client_id: str, campaign_id: str,
                                                        warehouse=warehouse_name,
                                                        quantity=stock.count,
                                                        type=stock.type))
-            if not answer.result.paging.nextPageToken:
-                break
-
-            page_token = answer.result.paging.nextPageToken
 
     # # Агрегирование данных
     # aggregate = {}
@@ -130,10 +116,10 @@ async def get_stocks(db_conn: YaDbConnection, client_id: str, campaign_id: str,
     #         quantity_from_client=quantity_from_client)
     #     )
     logger.info(f"Количсетво строк: {len(list_stocks)}")
-    db_conn.add_ya_stock_entry(list_stocks=list_stocks)
+    await db_conn.aio.add_ya_stock_entry(list_stocks=list_stocks)
 
 
-async def main_wb_stock(retries: int = 6) -> None:
+async def main_wb_stock(retries: int = 6, raise_errors: bool = False) -> None:
     try:
         db_conn = YaDbConnection()
         db_conn.start_db()
@@ -142,25 +128,36 @@ async def main_wb_stock(retries: int = 6) -> None:
 
         warehouses = await get_warehouses(list(api_key_set)[0])
 
+        cabinets = []
         for api_key in api_key_set:
             list_campaigns = await get_campaign_ids(api_key=api_key)
             db_conn.add_ya_campaigns(list_campaigns=list_campaigns)
-
             for campaign in sorted(list_campaigns, key=lambda x: x.client_id):
-                client = db_conn.get_client(client_id=campaign.client_id)
-                logger.info(f"Добавление в базу данных компании '{client.name_company}' магазина '{campaign.name}'")
-                await get_stocks(db_conn=db_conn,
-                                 client_id=client.client_id,
-                                 campaign_id=campaign.campaign_id,
-                                 api_key=client.api_key,
-                                 warehouses=warehouses)
+                cabinets.append((db_conn.get_client(client_id=campaign.client_id), campaign))
+
+        async def job(db_conn: YaDbConnection, cabinet: tuple[Client, DataYaCampaigns]) -> None:
+            client, campaign = cabinet
+            logger.info(f"Добавление в базу данных компании '{client.name_company}' магазина '{campaign.name}'")
+            await get_stocks(db_conn=db_conn,
+                             client_id=client.client_id,
+                             campaign_id=campaign.campaign_id,
+                             api_key=client.api_key,
+                             warehouses=warehouses)
+
+        results = await run_cabinets(db_conn=db_conn, cabinets=cabinets, job=job,
+                                     name=lambda cabinet: f"{cabinet[0].name_company} / {cabinet[1].name}")
+        raise_on_failure(results)
     except OperationalError:
         logger.error(f'Не доступна база данных. Осталось попыток подключения: {retries - 1}')
         if retries > 0:
             await asyncio.sleep(10)
-            await main_wb_stock(retries=retries - 1)
+            await main_wb_stock(retries=retries - 1, raise_errors=raise_errors)
+        elif raise_errors:
+            raise
     except Exception as e:
         logger.error(f'{e}')
+        if raise_errors:
+            raise
 
 if __name__ == "__main__":
     loop = asyncio.get_event_loop()